@@ -1,24 +1,64 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, Query, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.api.upload import _stage_upload, _store_upload
+from app.models import UploadResponse
+from app.services.ingestion import ingestion_queue, remove_upload
 from app.services.vector_store import VectorStore
-from typing import List, Dict
+from app.utils.metadata import upload_name
+from typing import List, Dict, Optional
+from pathlib import Path
+import os
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Dict])
-async def list_documents():
-    # Group metadata by document ID to list unique files
-    docs = {}
-    
-    for meta in VectorStore.metadata:
-        doc_id = meta.get('id')
-        if doc_id not in docs:
-            docs[doc_id] = {
-                "id": doc_id,
-                "filename": meta.get('filename'),
-                "content_type": meta.get('content_type'),
-                "upload_time": meta.get('upload_time'),
-                "chunk_count": 0
-            }
-        docs[doc_id]["chunk_count"] += 1
-        
-    return list(docs.values())
+async def list_documents(
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    # Served from the document registry, so cost is O(#docs returned) rather than O(#chunks)
+    docs = VectorStore.metadata.list_documents(offset=offset, limit=limit)
+    response.headers["X-Total-Count"] = str(VectorStore.metadata.count_documents())
+    return docs
+
+@router.delete("/{doc_id}")
+async def delete_document(doc_id: str):
+    # Tombstones the chunks so they drop out of search at once; vectors are purged in the background
+    document = VectorStore.metadata.get_document(doc_id)
+    deleted = await run_in_threadpool(VectorStore.delete_document, doc_id)
+    if document is None or deleted is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    remove_upload(document["filename"])
+
+    return {"id": doc_id, "deleted_chunks": deleted}
+
+@router.put("/{doc_id}", response_model=UploadResponse, status_code=202)
+async def replace_document(doc_id: str, file: UploadFile = File(...)):
+    # Re-ingests under the same id; the old chunks are replaced once the new ones are indexed
+    if VectorStore.metadata.get_document(doc_id) is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    # New content gets its own path, so the old chunks keep citing the old bytes until they are replaced
+    staged_path, content_hash = await run_in_threadpool(_stage_upload, file)
+    # Same bytes and name would land on the other document's stored file, so both would cite one path
+    owner = ingestion_queue.content_owner(content_hash)
+    if owner is not None and owner != doc_id:
+        os.remove(staged_path)
+        raise HTTPException(status_code=409, detail=f"Identical content already belongs to document {owner}")
+    filename = upload_name(content_hash, Path(file.filename).name)
+    file_path = _store_upload(staged_path, filename)
+    job = ingestion_queue.submit(
+        file_path, filename, file.content_type,
+        content_hash=content_hash, replace_document_id=doc_id
+    )
+
+    return UploadResponse(
+        filename=filename,
+        content_type=file.content_type,
+        message="File uploaded and queued to replace the document",
+        document_id=job.document_id,
+        job_id=job.id,
+        status=job.status
+    )
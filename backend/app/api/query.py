@@ -1,24 +1,92 @@
-from fastapi import APIRouter, HTTPException
-from app.models import QueryRequest, QueryResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from contextlib import aclosing
+from app.config import settings
+from app.models import QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryResponse
 from app.services.generation import generation_service
+from app.services.retrieval import retrieval_service
+from app.utils.metrics import collect_stages, span
+import json
 import time
 
 router = APIRouter()
 
+def _filters(request):
+    return request.filters.model_dump(exclude_none=True) if request.filters else None
+
 @router.post("/", response_model=QueryResponse)
 async def query(request: QueryRequest):
     start_time = time.time()
     
     try:
-        result = await generation_service.generate_answer(request.query)
+        with collect_stages() as stages, span("query"):
+            result = await generation_service.generate_answer(
+                request.query, k=request.top_k, nprobe=request.nprobe, ef_search=request.ef_search,
+                filters=_filters(request)
+            )
         
         processing_time = time.time() - start_time
         
         return QueryResponse(
             answer=result['answer'],
             citations=result['citations'],
-            processing_time=processing_time
+            processing_time=processing_time,
+            context=result.get('context'),
+            cached=result.get('cached', False),
+            timings=stages if request.timings else None
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest):
+    # One embedding call and one index search for the whole batch; errors are reported per item
+    if len(request.queries) > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_QUERIES} queries per batch")
+
+    start_time = time.time()
+
+    try:
+        results = await generation_service.answer_batch(
+            request.queries,
+            k=request.top_k,
+            generate=request.generate,
+            max_concurrency=request.max_concurrency,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+            filters=_filters(request)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return BatchQueryResponse(results=results, processing_time=time.time() - start_time)
+
+@router.post("/stream")
+async def query_stream(request: QueryRequest, http_request: Request):
+    # Server-Sent Events: `citations` first, then `token` events, then `done`
+    async def event_source():
+        events = generation_service.stream_answer(
+            request.query, k=request.top_k, nprobe=request.nprobe, ef_search=request.ef_search,
+            filters=_filters(request)
+        )
+        async with aclosing(events):
+            async for event, data in events:
+                if await http_request.is_disconnected():
+                    break # Closing `events` cancels upstream generation
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache")
+async def cache_stats():
+    return {**retrieval_service.cache_stats(), "answers": generation_service.answer_cache.stats()}
+
+@router.get("/batching")
+async def batching_stats():
+    # Batch-size and queue-delay histograms of the query embedding micro-batcher
+    return retrieval_service.batching_stats()
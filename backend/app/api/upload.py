@@ -1,40 +1,66 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.models import UploadResponse
-from app.services.document_processor import document_processor
-from app.services.audio_processor import audio_processor
+from fastapi.concurrency import run_in_threadpool
+from app.models import UploadResponse, JobStatus
+from app.services.ingestion import ingestion_queue
 from app.config import settings
-import shutil
+from app.utils.metadata import upload_name
+import hashlib
+import uuid
 import os
 from pathlib import Path
 
 router = APIRouter()
 
-@router.post("/", response_model=UploadResponse)
+def _store_upload(staged_path: Path, filename: str) -> Path:
+    file_path = settings.UPLOAD_DIR / filename
+    file_path.parent.mkdir(exist_ok=True)
+    os.replace(staged_path, file_path)
+    return file_path
+
+def _stage_upload(file: UploadFile):
+    # Copy to a staging name while hashing, so an identical re-upload never touches the existing file
+    staged_path = settings.UPLOAD_DIR / f".staging-{uuid.uuid4().hex}"
+    digest = hashlib.sha256()
+    with open(staged_path, "wb") as buffer:
+        while True:
+            block = file.file.read(1024 * 1024)
+            if not block:
+                break
+            digest.update(block)
+            buffer.write(block)
+    return staged_path, digest.hexdigest()
+
+@router.post("/", response_model=UploadResponse, status_code=202)
 async def upload_file(file: UploadFile = File(...)):
-    filename = file.filename
     content_type = file.content_type
-    
-    # Save file temporarily
-    file_path = settings.UPLOAD_DIR / filename
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    try:
-        doc_id = None
-        if content_type.startswith("audio/"):
-            doc_id = await audio_processor.process_audio(file_path, filename)
-        else:
-            # Assume document/image
-            doc_id = await document_processor.process_file(file, file_path)
-            
-        return UploadResponse(
-            filename=filename,
-            content_type=content_type,
-            message="File uploaded and processed successfully",
-            document_id=doc_id
-        )
-        
-    except Exception as e:
-        # Check if file exists and remove it if processing failed? 
-        # For debug, maybe keep it. But in prod, clean up.
-        raise HTTPException(status_code=500, detail=str(e))
+
+    # Save file, off the event loop so large uploads don't stall queries
+    staged_path, content_hash = await run_in_threadpool(_stage_upload, file)
+    filename = upload_name(content_hash, Path(file.filename).name)
+
+    job = ingestion_queue.find_duplicate(content_hash, filename, content_type)
+    if job is not None:
+        os.remove(staged_path)
+        message = "Identical file already uploaded; reusing existing document"
+    else:
+        file_path = _store_upload(staged_path, filename)
+        # Processing (OCR, transcription, embedding) runs on the ingestion worker pools
+        job = ingestion_queue.submit(file_path, filename, content_type, content_hash=content_hash)
+        message = "File uploaded and queued for processing"
+
+    return UploadResponse(
+        filename=filename,
+        content_type=content_type,
+        message=message,
+        document_id=job.document_id,
+        job_id=job.id,
+        status=job.status,
+        duplicate=job.duplicate
+    )
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -16,10 +16,105 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     IMAGE_EMBEDDING_MODEL: str = "clip-ViT-B-32"
     GENERATION_MODEL: str = "gemini-flash-latest"
+    GENERATION_BACKEND: str = "gemini" # "fake" = deterministic in-process stub, "http" = stub server
+    FAKE_LLM_LATENCY: float = 0.0 # Seconds before the stub's first token
+    FAKE_LLM_TOKEN_DELAY: float = 0.0 # Seconds between the stub's tokens
+    GENERATION_STUB_URL: str = "http://127.0.0.1:9000/generate" # Used when GENERATION_BACKEND = "http"
+
+    # Upstream LLM limits; match these to the API quota
+    GENERATION_MAX_CONCURRENCY: int = 4
+    GENERATION_RATE_PER_MINUTE: float = 60 # 0 = no client-side rate limit
+    GENERATION_BURST: int = 5
+    GENERATION_MAX_RETRIES: int = 4 # Retries on 429 / ResourceExhausted
+    GENERATION_BACKOFF_BASE: float = 1.0 # Seconds; doubles per retry, with full jitter
+    GENERATION_BACKOFF_MAX: float = 30.0
+
+    # Prompt context: retrieved chunks are merged, deduplicated and fitted to a token budget
+    CONTEXT_MAX_TOKENS: int = 2048 # Tokens of passage text per prompt; 0 = no limit
+    CONTEXT_DEDUP_THRESHOLD: float = 0.8 # Drop a passage once this share of its word 3-grams is already in the prompt; 0 = off
+    CONTEXT_MIN_PASSAGE_TOKENS: int = 32 # Cut a passage to fit only if at least this many tokens of budget remain
+
+    # Semantic answer cache: paraphrased questions that retrieve the same chunks reuse one generated answer
+    ANSWER_CACHE_SIZE: int = 1024 # Answers kept (LRU); 0 = off
+    ANSWER_CACHE_MIN_SIMILARITY: float = 0.85 # Cosine similarity of query embeddings needed to reuse an answer
+
+    # POST /query/batch
+    BATCH_MAX_QUERIES: int = 1000
+    BATCH_GENERATION_CONCURRENCY: int = 4 # Answers generated in parallel per batch (still bounded by the client)
     
+    # Startup
+    WARMUP_ON_STARTUP: bool = False # Load models in the background at startup instead of on first use
+
     # Processing
-    CHUNK_SIZE: int = 500
-    CHUNK_OVERLAP: int = 50
+    CHUNK_SIZE: int = 128 # Tokens of the embedding model's tokenizer; capped at its input window
+    CHUNK_OVERLAP: int = 16 # Tokens
+
+    # Ingestion workers, per file kind so long Whisper jobs cannot starve document jobs
+    DOCUMENT_INGEST_WORKERS: int = 2
+    AUDIO_INGEST_WORKERS: int = 1
+    INGEST_BATCH_SIZE: int = 256 # Chunks per embedding call and per index append
+    INGEST_QUEUE_DEPTH: int = 2 # Batches buffered between extraction, embedding and indexing
+    JOB_HISTORY_LIMIT: int = 1000 # Finished jobs kept for status lookups
+
+    # Bulk directory ingestion (bulk_ingest.py): extraction on process pools, one index append per batch
+    BULK_DOCUMENT_WORKERS: int = 0 # 0 = CPU count, capped by OCR_WORKER_MEMORY_MB
+    BULK_AUDIO_WORKERS: int = 0 # 0 = CPU count, capped by WHISPER_WORKER_MEMORY_MB
+    BULK_BATCH_CHUNKS: int = 4096 # Chunks from any number of files embedded and appended together
+
+    # OCR
+    OCR_DPI: int = 300
+    OCR_LANG: str = "eng" # Tesseract language(s), e.g. "eng+deu"
+    OCR_WORKERS: int = 0 # 0 = CPU count, capped by available memory
+    OCR_WORKER_MEMORY_MB: int = 400 # Budget per OCR process (rendered page + Tesseract)
+    OCR_MAX_PENDING_PAGES: int = 32 # Pages OCR may run ahead of chunking/embedding
+
+    # Audio transcription
+    WHISPER_MODEL: str = "small" # tiny, base, small, medium, large-v3, ... (or a local checkpoint path)
+    WHISPER_DEVICE: str = "" # "" = CUDA when available, else CPU
+    WHISPER_LANGUAGE: str = "" # "" = detect per window
+    WHISPER_BEAM_SIZE: int = 0 # 0 = greedy decoding
+    WHISPER_CONDITION_ON_PREVIOUS_TEXT: bool = True
+    AUDIO_WINDOW_SECONDS: float = 300 # Long recordings are split on silence into windows of about this length
+    AUDIO_SILENCE_SEARCH_SECONDS: float = 15 # How far from the nominal cut to look for a pause
+    AUDIO_TRANSCRIBE_WORKERS: int = 0 # Windows transcribed in parallel; 0 = CPU count, capped by memory
+    WHISPER_WORKER_MEMORY_MB: int = 2000 # Budget per transcription process (model + decoding)
+    AUDIO_CHUNK_SECONDS: float = 30 # Adjacent segments are merged into chunks of about this length
+
+    # Vector store persistence
+    SEGMENT_COMPACTION_THRESHOLD: int = 8 # Merge on-disk segments once this many of similar size sit side by side
+    TOMBSTONE_PURGE_RATIO: float = 0.2 # Rebuild without deleted vectors once they are this share of the index
+    SNAPSHOT_DELTA_ROWS: int = 50_000 # Rows each process holds privately before they are folded into a shared snapshot
+    INDEX_MMAP: bool = True # Memory-map snapshots so worker processes share one copy of the index
+    INDEX_RELOAD_INTERVAL: float = 2.0 # Seconds between checks for changes made by other processes; 0 = off
+
+    # Query-side caches (sizes in entries, TTLs in seconds)
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096
+    QUERY_EMBEDDING_CACHE_TTL: float = 3600
+    RETRIEVAL_CACHE_SIZE: int = 1024
+    RETRIEVAL_CACHE_TTL: float = 300
+
+    # Query embedding micro-batching across concurrent requests
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Vector index: "flat", "ivf_flat", "ivf_pq" or "hnsw"
+    INDEX_TYPE: str = "flat"
+    VECTOR_STORAGE: str = "float32" # "fp16" / "sq8" = 2x / 4x smaller; "pq" = PQ_M bytes per vector
+    VECTOR_METRIC: str = "l2" # "cosine" = inner product over normalised vectors
+    L2_MAX_DISTANCE: float = 1.2 # Hits farther than this (squared L2) are dropped
+    COSINE_MIN_SIMILARITY: float = 0.4 # Hits less similar than this are dropped; 0.4 = 1.2 L2 on unit vectors
+    ANN_BUILD_THRESHOLD: int = 100_000 # Switch from flat to INDEX_TYPE (and sq8/pq storage) past this many vectors
+    ANN_REBUILD_GROWTH: float = 2.0 # Retrain once the corpus grows by this factor
+    IVF_NLIST: int = 0 # 0 = derive from corpus size
+    IVF_NPROBE: int = 16
+    PQ_M: int = 48 # Sub-quantizers (bytes per vector) for PQ storage and IVF-PQ; must divide the embedding dimension
+    HNSW_M: int = 32
+    HNSW_EF_SEARCH: int = 64
+    FILTER_EXACT_SEARCH_MAX: int = 50_000 # Filtered queries over at most this many chunks scan just those vectors
+
+    # Two-level retrieval: pick the best-matching documents first, then search only their chunks
+    TWO_LEVEL_TOP_DOCUMENTS: int = 0 # Documents (M) searched per query; 0 = search every chunk
+    DOCUMENT_SECTION_CHUNKS: int = 64 # Consecutive chunks summarised by one document-level vector
     
     class Config:
         env_file = ".env"
@@ -1,5 +1,7 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import logging
@@ -7,19 +9,54 @@ import logging
 from app.config import settings
 from app.api import upload, query, documents
 from app.services.vector_store import VectorStore
+from app.services.ingestion import ingestion_queue
+from app.services.document_processor import document_processor
+from app.services.audio_processor import audio_processor
+from app.services.embeddings import embeddings_service
+from app.services.generation import generation_service
+from app.utils.metrics import registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Readiness, as opposed to liveness: flips once the index is loaded and (optionally) models are warm
+readiness = {"index": False, "models": not settings.WARMUP_ON_STARTUP}
+startup_errors = {} # Component -> why it failed to become ready; it stays unready until a restart
+
+def warm_up():
+    # Loads the embedding model and the generation backend so the first query doesn't pay for it
+    embeddings_service.encode_query("warm-up")
+    generation_service.client.backend
+    readiness["models"] = True
+    logger.info("Models warmed up")
+
+def _warm_up_done(task: asyncio.Task):
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error("Model warm-up failed", exc_info=error)
+        startup_errors["models"] = f"{type(error).__name__}: {error}"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Load FAISS index
     logger.info("Loading FAISS index...")
     VectorStore.load_index()
+    readiness["index"] = True
+
+    warmup_task = None
+    if settings.WARMUP_ON_STARTUP:
+        # In the background: /health answers immediately, /health/ready waits for this
+        warmup_task = asyncio.create_task(asyncio.to_thread(warm_up))
+        warmup_task.add_done_callback(_warm_up_done)
     yield
     # Shutdown
     logger.info("Shutting down...")
+    ingestion_queue.shutdown()
+    document_processor.shutdown()
+    audio_processor.shutdown()
 
 app = FastAPI(
     title="Multimodal RAG System",
@@ -44,7 +81,20 @@ app.include_router(documents.router, prefix="/documents", tags=["Documents"])
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "model": settings.GENERATION_MODEL}
+    return {"status": "ok", "model": settings.GENERATION_MODEL, "index": VectorStore.index_info()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    ready = all(readiness.values())
+    content = {"status": "ready" if ready else "failed" if startup_errors else "starting", **readiness}
+    if startup_errors:
+        content["errors"] = startup_errors
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition format: stage latency histograms, counters and index/queue gauges
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 # Mount Frontend
 # Mount Frontend
@@ -1,5 +1,5 @@
-from typing import List, Optional, Literal
-from pydantic import BaseModel, UUID4
+from typing import Dict, List, Optional, Literal
+from pydantic import BaseModel, Field, UUID4
 from datetime import datetime
 
 class UploadResponse(BaseModel):
@@ -7,6 +7,25 @@ class UploadResponse(BaseModel):
     content_type: str
     message: str
     document_id: UUID4
+    job_id: str
+    status: str
+    duplicate: bool = False
+
+class JobStatus(BaseModel):
+    id: str
+    filename: str
+    content_type: str
+    kind: Literal["document", "audio"]
+    status: Literal["queued", "running", "completed", "failed"] = "queued"
+    stage: Optional[str] = None
+    progress: float = 0.0
+    document_id: Optional[UUID4] = None
+    content_hash: Optional[str] = None
+    duplicate: bool = False # True when an identical file was already ingested
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 class DocumentInfo(BaseModel):
     id: UUID4
@@ -22,11 +41,56 @@ class Citation(BaseModel):
     snippet: str
     score: float
 
+class SearchFilters(BaseModel):
+    # All given filters must match; applied inside the index search, not after it
+    doc_id: Optional[str] = None
+    filename: Optional[str] = None
+    content_type: Optional[str] = None # "text" or "transcript"
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
 class QueryRequest(BaseModel):
     query: str
-    top_k: int = 5
+    top_k: int = Field(5, ge=1, le=100)
+    filters: Optional[SearchFilters] = None
+    nprobe: Optional[int] = None # IVF lists to probe; overrides settings.IVF_NPROBE
+    ef_search: Optional[int] = None # HNSW search depth; overrides settings.HNSW_EF_SEARCH
+    timings: bool = False # Return seconds per pipeline stage with the answer
+
+class ContextStats(BaseModel):
+    # How the retrieved chunks were turned into prompt context
+    chunks: int
+    passages: int
+    merged: int # Chunks folded into an adjacent one
+    duplicates: int
+    over_budget: int # Passages cut or skipped to fit CONTEXT_MAX_TOKENS
+    tokens: int
+    raw_tokens: int # Tokens had every chunk been sent whole
+    tokens_saved: int
 
 class QueryResponse(BaseModel):
     answer: str
     citations: List[Citation]
     processing_time: float
+    context: Optional[ContextStats] = None
+    cached: bool = False # Served from the semantic answer cache
+    timings: Optional[Dict[str, float]] = None # Stages nest: retrieve covers embed_query and vector_search
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    top_k: int = Field(3, ge=1, le=100)
+    filters: Optional[SearchFilters] = None # Applied to every query in the batch
+    generate: bool = False # False = retrieval only (citations, no answer)
+    max_concurrency: Optional[int] = None # Parallel generations; defaults to settings.BATCH_GENERATION_CONCURRENCY
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+
+class BatchQueryItem(BaseModel):
+    query: str
+    answer: Optional[str] = None
+    citations: List[Citation] = []
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItem]
+    processing_time: float
@@ -0,0 +1,213 @@
+import math
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+STORAGE_TYPES = ("float32", "fp16", "sq8", "pq")
+METRICS = ("l2", "cosine")
+
+_SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def _nlist_for(n_vectors: int, configured: int) -> int:
+    if configured:
+        return configured
+    # Rule of thumb from the FAISS wiki: ~4*sqrt(N) lists, but keep enough points per list to train
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def faiss_metric(metric: str) -> int:
+    # Cosine is inner product over L2-normalised vectors; callers normalise before add and search
+    if metric == "l2":
+        return faiss.METRIC_L2
+    if metric == "cosine":
+        return faiss.METRIC_INNER_PRODUCT
+    raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+
+
+def flat_index(dimension: int, metric: str = "l2") -> faiss.Index:
+    return faiss.IndexFlatIP(dimension) if metric == "cosine" else faiss.IndexFlatL2(dimension)
+
+
+def requires_training(index_type: str, storage: str) -> bool:
+    """Whether the configured index can only be built once there are vectors to train it on."""
+    return index_type != "flat" or storage in ("sq8", "pq")
+
+
+def build_index(index_type: str, dimension: int, n_vectors: int, nlist: int = 0,
+                pq_m: int = 48, hnsw_m: int = 32, storage: str = "float32", metric: str = "l2") -> faiss.Index:
+    """
+    Creates an empty (untrained) index of the requested type sized for `n_vectors`.
+    `storage` picks how vectors are encoded: raw float32, fp16 or 8-bit scalar quantization
+    (2x / 4x smaller), or product quantization with `pq_m` bytes per vector.
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown storage '{storage}', expected one of {STORAGE_TYPES}")
+    faiss_metric_type = faiss_metric(metric)
+
+    if index_type == "flat":
+        if storage in _SCALAR_QUANTIZERS:
+            return faiss.IndexScalarQuantizer(dimension, _SCALAR_QUANTIZERS[storage], faiss_metric_type)
+        if storage == "pq":
+            return faiss.IndexPQ(dimension, pq_m, 8, faiss_metric_type)
+        return flat_index(dimension, metric)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        quantizer = flat_index(dimension, metric)
+        nlist = _nlist_for(n_vectors, nlist)
+        if index_type == "ivf_pq" or storage == "pq":
+            return faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, 8, faiss_metric_type)
+        if storage in _SCALAR_QUANTIZERS:
+            return faiss.IndexIVFScalarQuantizer(
+                quantizer, dimension, nlist, _SCALAR_QUANTIZERS[storage], faiss_metric_type
+            )
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric_type)
+    if index_type == "hnsw":
+        if storage in _SCALAR_QUANTIZERS:
+            return faiss.IndexHNSWSQ(dimension, _SCALAR_QUANTIZERS[storage], hnsw_m, faiss_metric_type)
+        if storage == "pq":
+            return faiss.IndexHNSWPQ(dimension, pq_m, hnsw_m, 8, faiss_metric_type)
+        return faiss.IndexHNSWFlat(dimension, hnsw_m, faiss_metric_type)
+    raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+
+def train_and_fill(index: faiss.Index, vectors: np.ndarray, ids: Optional[np.ndarray] = None) -> faiss.Index:
+    if not index.is_trained:
+        index.train(vectors)
+    if ids is None:
+        index.add(vectors)
+    else:
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """The index behind an IndexIDMap wrapper (or `index` itself)."""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    index = base_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                  selector: Optional[faiss.IDSelector] = None):
+    """
+    Per-query search parameters. Passed to `index.search(..., params=...)` so concurrent
+    queries with different knobs never mutate the shared index. `selector` restricts the
+    search to a subset of ids.
+    """
+    kwargs = {"sel": selector} if selector is not None else {}
+    index = base_index(index)
+    if isinstance(index, faiss.IndexIVF) and nprobe:
+        return faiss.SearchParametersIVF(nprobe=nprobe, **kwargs)
+    if isinstance(index, faiss.IndexHNSW) and ef_search:
+        return faiss.SearchParametersHNSW(efSearch=ef_search, **kwargs)
+    if kwargs:
+        return faiss.SearchParameters(**kwargs)
+    return None
+
+
+def id_selector(ids: np.ndarray) -> faiss.IDSelector:
+    """Selector for a sorted id array; a contiguous run (one document) becomes a cheap range check."""
+    if len(ids) and ids[-1] - ids[0] + 1 == len(ids):
+        return faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1)
+    return faiss.IDSelectorBatch(ids)
+
+
+def recall_report(vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                  index_types=("ivf_flat", "ivf_pq", "hnsw"),
+                  nprobes=(1, 4, 16, 64), ef_searches=(16, 64, 256)) -> List[Dict]:
+    """Measures recall@k and per-query latency of each ANN configuration against exact search."""
+    dimension = vectors.shape[1]
+    exact = train_and_fill(faiss.IndexFlatL2(dimension), vectors)
+
+    start = time.perf_counter()
+    _, truth = exact.search(queries, k)
+    rows = [{
+        "index_type": "flat",
+        "param": None,
+        "recall": 1.0,
+        "latency_ms": (time.perf_counter() - start) * 1000 / len(queries),
+    }]
+
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = train_and_fill(build_index(index_type, dimension, len(vectors)), vectors)
+        build_s = time.perf_counter() - start
+
+        if index_type == "hnsw":
+            settings_to_try = [(ef, search_params(index, ef_search=ef)) for ef in ef_searches]
+        else:
+            settings_to_try = [(nprobe, search_params(index, nprobe=nprobe)) for nprobe in nprobes]
+
+        for param, params in settings_to_try:
+            start = time.perf_counter()
+            _, found = index.search(queries, k, params=params)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+            rows.append({
+                "index_type": index_type,
+                "param": param,
+                "recall": hits / (len(queries) * k),
+                "latency_ms": latency_ms,
+                "build_s": build_s,
+            })
+
+    return rows
+
+
+def storage_report(vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                   storages=STORAGE_TYPES, metrics=METRICS, pq_m: int = 48) -> List[Dict]:
+    """
+    Measures index size, recall@k against exact float32 search and per-query latency of each
+    vector storage mode, under each metric (vectors are normalised for cosine).
+    """
+    rows = []
+    for metric in metrics:
+        corpus, probes = vectors, queries
+        if metric == "cosine":
+            corpus, probes = vectors.copy(), queries.copy()
+            faiss.normalize_L2(corpus)
+            faiss.normalize_L2(probes)
+        _, truth = train_and_fill(flat_index(vectors.shape[1], metric), corpus).search(probes, k)
+
+        for storage in storages:
+            start = time.perf_counter()
+            index = train_and_fill(
+                build_index("flat", vectors.shape[1], len(vectors), pq_m=pq_m, storage=storage, metric=metric), corpus
+            )
+            build_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, found = index.search(probes, k)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(probes)
+
+            hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(probes)))
+            size = len(faiss.serialize_index(index))
+            rows.append({
+                "metric": metric,
+                "storage": storage,
+                "bytes_per_vector": size / len(vectors),
+                "size_mb": size / 1e6,
+                "recall": hits / (len(probes) * k),
+                "latency_ms": latency_ms,
+                "build_s": build_s,
+            })
+
+    return rows
@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set
+
+import faiss
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Reuses generated answers across paraphrases of the same question.
+
+    An answer is served when the new query's embedding is within `min_similarity` (cosine)
+    of a cached query's and retrieval returned exactly the same chunks, so the prompt would
+    carry the same context. Chunk ids are never reused, which keeps an entry from matching
+    once any chunk it was built from is deleted or replaced, in any process; entries citing
+    a document deleted in this process are also dropped at once. LRU-evicted at `maxsize`.
+    """
+
+    def __init__(self, maxsize: int, min_similarity: float, candidates: int = 8):
+        self.maxsize = maxsize
+        self.min_similarity = min_similarity
+        self.candidates = candidates # Nearest cached queries checked for a matching chunk set
+        self.index = None # Inner product over normalised query embeddings; created on first put
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict() # id -> {"chunks", "documents", "result"}
+        self.by_document: Dict[str, Set[int]] = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _normalize(self, embedding) -> np.ndarray:
+        vector = np.array(embedding, dtype='float32').reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _match(self, vector: np.ndarray, chunks: frozenset) -> Optional[int]:
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        similarities, ids = self.index.search(vector, min(self.candidates, self.index.ntotal))
+        for similarity, entry_id in zip(similarities[0], ids[0]):
+            if entry_id == -1 or similarity < self.min_similarity:
+                break
+            if self.entries[int(entry_id)]["chunks"] == chunks:
+                return int(entry_id)
+        return None
+
+    def get(self, embedding, chunk_ids: Iterable[int]) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        vector = self._normalize(embedding)
+        with self.lock:
+            entry_id = self._match(vector, frozenset(chunk_ids))
+            if entry_id is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(entry_id)
+            self.hits += 1
+            return self.entries[entry_id]["result"]
+
+    def put(self, embedding, chunk_ids: Iterable[int], doc_ids: Iterable[str], result: Dict):
+        if not self.enabled:
+            return
+        vector = self._normalize(embedding)
+        chunks = frozenset(chunk_ids)
+        with self.lock:
+            if self._match(vector, chunks) is not None:
+                return # A concurrent request for the same question got here first
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            entry_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+            documents = {str(doc_id) for doc_id in doc_ids}
+            self.entries[entry_id] = {"chunks": chunks, "documents": documents, "result": result}
+            for doc_id in documents:
+                self.by_document.setdefault(doc_id, set()).add(entry_id)
+            while len(self.entries) > self.maxsize:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        self.index.remove_ids(np.array([entry_id], dtype='int64'))
+        for doc_id in entry["documents"]:
+            ids = self.by_document.get(doc_id)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self.by_document[doc_id]
+
+    def invalidate_documents(self, doc_ids: Iterable[str]):
+        with self.lock:
+            for doc_id in doc_ids:
+                for entry_id in list(self.by_document.get(str(doc_id), ())):
+                    self._remove(entry_id)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -1,65 +1,134 @@
-import whisper
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Callable, Dict, List, Optional
 from app.config import settings
-from app.utils.chunking import chunk_text
 from app.services.embeddings import embeddings_service
-from app.services.vector_store import VectorStore
-from app.utils.metadata import create_metadata, generate_document_id
+from app.services.ingest_pipeline import index_chunks
+from app.utils.metadata import generate_document_id
+from app.utils.metrics import registry, timed
+from app.utils.ocr import default_worker_count
+from app.utils.transcription import SAMPLE_RATE, init_worker, merge_segments, split_on_silence, transcribe, transcribe_window
+
+AUDIO_SECONDS = registry.counter("evidentia_audio_seconds_total", "Seconds of audio transcribed")
+AUDIO_WINDOWS = registry.counter("evidentia_audio_windows_total", "Silence-split windows transcribed")
+AUDIO_SEGMENTS = registry.counter("evidentia_audio_segments_total", "Whisper segments produced")
 
 class AudioProcessor:
     def __init__(self):
         self.model = None
+        self._load_lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
 
     def load_model(self):
-        if not self.model:
-            # Load model only when needed to save startup time/memory
-            self.model = whisper.load_model("small")
-
-    async def process_audio(self, file_path: Path, filename: str):
-        self.load_model()
-        
-        # Transcribe
-        result = self.model.transcribe(str(file_path))
-        full_text = result["text"]
-        segments = result["segments"]
-        
-        doc_id = generate_document_id()
-        
-        # We can index segments directly or chunk the full text.
-        # Prompt says: "Transcript chunks indexed as text with timestamps"
-        # Segments have timestamps. Let's use segments but maybe combine small ones?
-        # For simplicity, let's use the segments provided by Whisper as chunks if they are reasonable length,
-        # or chunk the full text and map back to timestamps (harder).
-        # Better: Index segments.
-        
-        texts = []
-        metas = []
-        
-        for i, segment in enumerate(segments):
-            text = segment["text"].strip()
-            if not text:
-                continue
-                
-            start = segment["start"]
-            end = segment["end"]
-            timestamp = f"{int(start//60):02d}:{int(start%60):02d}-{int(end//60):02d}:{int(end%60):02d}"
-            
-            texts.append(text)
-            
-            meta = create_metadata(
-                doc_id=str(doc_id),
-                filename=filename,
-                content_type="transcript",
-                timestamp=timestamp,
-                chunk_id=i
-            )
-            meta['text'] = text
-            metas.append(meta)
-            
-        if texts:
-            embeddings = embeddings_service.encode_text(texts)
-            VectorStore.add_texts(embeddings, metas)
-            
+        # Load model only when needed to save startup time/memory; whisper imports torch
+        with self._load_lock:
+            if not self.model:
+                import whisper
+                self.model = whisper.load_model(settings.WHISPER_MODEL, device=settings.WHISPER_DEVICE or None)
+
+    @property
+    def workers(self) -> int:
+        return settings.AUDIO_TRANSCRIBE_WORKERS or default_worker_count(settings.WHISPER_WORKER_MEMORY_MB)
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Created on first long recording; each worker loads its own copy of the model
+        with self._pool_lock:
+            if self._pool is None:
+                workers = self.workers
+                self._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    # Forking a process that has already initialised torch can deadlock
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(settings.WHISPER_MODEL, settings.WHISPER_DEVICE, max(1, (os.cpu_count() or 1) // workers)),
+                )
+            return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def decode_options(self) -> Dict:
+        options = {"condition_on_previous_text": settings.WHISPER_CONDITION_ON_PREVIOUS_TEXT}
+        if settings.WHISPER_LANGUAGE:
+            options["language"] = settings.WHISPER_LANGUAGE
+        if settings.WHISPER_BEAM_SIZE:
+            options["beam_size"] = settings.WHISPER_BEAM_SIZE
+        return options
+
+    @timed("transcribe")
+    def transcribe(self, file_path: Path, progress: Optional[Callable[[str, float], None]] = None) -> List[Dict]:
+        """Returns the transcript as {text, start, end} segments, timed from the start of the file."""
+        import whisper
+        progress = progress or (lambda stage, fraction: None)
+        audio = whisper.load_audio(str(file_path))
+        windows = split_on_silence(audio, settings.AUDIO_WINDOW_SECONDS, settings.AUDIO_SILENCE_SEARCH_SECONDS)
+        AUDIO_SECONDS.inc(len(audio) / SAMPLE_RATE)
+        AUDIO_WINDOWS.inc(len(windows))
+        options = self.decode_options()
+
+        segments = []
+        if len(windows) == 1 or self.workers <= 1:
+            progress("loading_model", 0.0)
+            self.load_model()
+            for i, (start, end) in enumerate(windows):
+                progress("transcribing", i / len(windows))
+                segments.extend(transcribe(self.model, audio[start:end], start / SAMPLE_RATE, options))
+            return segments
+
+        # Windows are cut in pauses, so they transcribe independently; results are stitched in order
+        progress("transcribing", 0.0)
+        futures = [
+            self.pool.submit(transcribe_window, audio[start:end], start / SAMPLE_RATE, options)
+            for start, end in windows
+        ]
+        try:
+            for i, future in enumerate(futures):
+                segments.extend(future.result())
+                progress("transcribing", (i + 1) / len(windows))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return segments
+
+    @timed("ingest_audio")
+    def process_audio(self, file_path: Path, filename: str,
+                      doc_id=None, progress: Optional[Callable[[str, float], None]] = None):
+        # Synchronous on purpose: runs on an ingestion worker thread, never on the event loop
+        progress = progress or (lambda stage, fraction: None)
+        chunks = self.extract_chunks(file_path, progress)
+
+        doc_id = doc_id or generate_document_id()
+
+        progress("indexing", 0.0)
+        index_chunks(chunks, doc_id, filename, "transcript")
+
         return doc_id
 
+    def extract_chunks(self, file_path: Path, progress: Optional[Callable[[str, float], None]] = None) -> List[Dict]:
+        """Transcribes the file into {"text", "timestamp"} chunks, without embedding them."""
+        segments = self.transcribe(file_path, progress)
+        AUDIO_SEGMENTS.inc(len(segments))
+
+        # Whisper segments are a sentence or so each; merged chunks embed better and keep the index small
+        chunks = merge_segments(
+            segments, settings.AUDIO_CHUNK_SECONDS,
+            min(settings.CHUNK_SIZE, embeddings_service.max_tokens),
+            lambda text: len(embeddings_service.token_offsets(text)),
+        )
+        return list(self._segment_chunks(chunks))
+
+    def _segment_chunks(self, chunks):
+        for chunk in chunks:
+            start = chunk["start"]
+            end = chunk["end"]
+            timestamp = f"{int(start//60):02d}:{int(start%60):02d}-{int(end//60):02d}:{int(end%60):02d}"
+            yield {"text": chunk["text"], "timestamp": timestamp}
+
 audio_processor = AudioProcessor()
@@ -0,0 +1,368 @@
+import hashlib
+import json
+import mimetypes
+import multiprocessing
+import os
+import queue
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.metadata import generate_document_id, upload_name
+from app.utils.ocr import default_worker_count
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def content_type_of(path: Path) -> Optional[str]:
+    """The upload content type for a file the ingesters handle, else None."""
+    content_type, _ = mimetypes.guess_type(path.name)
+    if content_type in ("application/pdf", DOCX):
+        return content_type
+    if content_type and content_type.split("/")[0] in ("image", "audio"):
+        return content_type
+    return None
+
+
+def _kind(content_type: str) -> str:
+    return "audio" if content_type.startswith("audio/") else "document"
+
+
+_chunk_queue = None # In pool processes: where extract_file streams chunks to the parent
+_stop = None # In pool processes: set by the parent when it gives up, so no worker waits on a full queue
+
+
+def _init_worker(kind: str, threads: int, chunk_queue, stop):
+    # Parallelism comes from the pool itself, so nothing inside a worker starts pools of its own
+    global _chunk_queue, _stop
+    from app.services.document_processor import document_processor
+    document_processor.inline_ocr = True
+    settings.AUDIO_TRANSCRIBE_WORKERS = 1
+    _chunk_queue, _stop = chunk_queue, stop
+    if kind == "audio" and threads:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def _send(message) -> bool:
+    while not _stop.is_set():
+        try:
+            _chunk_queue.put(message, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_file(task: int, path: str, content_type: str):
+    """
+    Runs in a pool process. Streams the file's chunks to the parent in batches of
+    INGEST_BATCH_SIZE as (task, chunks) messages, then (task, None) once done, so no
+    process ever holds a whole large file's chunks.
+    """
+    from app.services.audio_processor import audio_processor
+    from app.services.document_processor import document_processor
+    from app.utils.pipeline import batched
+
+    if _kind(content_type) == "audio":
+        chunks = audio_processor.extract_chunks(Path(path))
+    else:
+        chunks = document_processor.extract_chunks(Path(path), content_type)
+    for batch in batched(chunks, settings.INGEST_BATCH_SIZE):
+        if not _send((task, batch)):
+            return
+    _send((task, None))
+
+
+class _File:
+    """A file being extracted: its chunks are appended as they arrive, then it is checkpointed."""
+
+    def __init__(self, future, relative: str, path: Path, content_type: str, stat: os.stat_result,
+                 content_hash: str):
+        self.future = future
+        self.relative = relative
+        self.path = path
+        self.content_type = content_type
+        self.stat = stat
+        self.content_hash = content_hash
+        self.doc_id = None
+        self.duplicate = False
+        self.chunks = 0 # Received so far; numbers the next chunk
+        self.ids: List[np.ndarray] = [] # FAISS ids appended so far, deleted again if the file fails
+        self.ended = False # Every chunk received
+
+
+class Checkpoint:
+    """
+    Files already ingested by earlier runs over the same directory, keyed by relative path
+    with their size and mtime, so a file changed since is ingested again. Saved atomically
+    after every committed batch.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.done: Dict[str, List[int]] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.done = json.load(f)["done"]
+
+    def is_done(self, relative: str, stat: os.stat_result) -> bool:
+        return self.done.get(relative) == [stat.st_size, stat.st_mtime_ns]
+
+    def mark(self, relative: str, stat: os.stat_result):
+        self.done[relative] = [stat.st_size, stat.st_mtime_ns]
+
+    def save(self):
+        temp = self.path.with_suffix(".tmp")
+        with open(temp, "w") as f:
+            json.dump({"done": self.done}, f)
+        os.replace(temp, self.path)
+
+
+class BulkIngest:
+    """
+    Ingests every supported file under a directory.
+
+    Files are hashed as they are claimed, and only the first file with given content is
+    extracted. Extraction (parsing, OCR, transcription) runs on process pools, one per file
+    kind, with no more than two files queued per worker. Workers stream chunks back in small batches
+    over a bounded queue; the main process embeds the chunks of many files together and
+    appends each batch of about `batch_chunks` to the index in one write. A file is recorded
+    in the checkpoint once all its chunks are appended; if its extraction fails, or the run
+    is interrupted first, the chunks it already has in the index are deleted again.
+    """
+
+    def __init__(self, root: Path, checkpoint: Path, document_workers: int = 0, audio_workers: int = 0,
+                 batch_chunks: int = 0, copy_files: bool = True):
+        self.root = Path(root).resolve()
+        self.checkpoint = Checkpoint(checkpoint)
+        self.workers = {
+            "document": document_workers or settings.BULK_DOCUMENT_WORKERS
+                        or default_worker_count(settings.OCR_WORKER_MEMORY_MB),
+            "audio": audio_workers or settings.BULK_AUDIO_WORKERS
+                     or default_worker_count(settings.WHISPER_WORKER_MEMORY_MB),
+        }
+        self.batch_chunks = batch_chunks or settings.BULK_BATCH_CHUNKS
+        self.copy_files = copy_files # Into UPLOAD_DIR, as /upload does, so /uploads serves the originals
+        self.seen_hashes = set() # Content claimed by this run; later identical files are never extracted
+        self.waiting: Dict[str, List[_File]] = {} # Content hash -> identical files held until its first file finishes
+        self.stats = {"files": 0, "skipped": 0, "duplicates": 0, "failed": 0, "chunks": 0, "batches": 0}
+        self.failures: Dict[str, str] = {}
+        self.started = None
+        self.in_flight: Dict[int, _File] = {} # By task number
+        self.pending: List[Tuple[_File, List[Dict]]] = [] # Chunk metas received but not yet appended
+        self.finished: List[_File] = [] # Every chunk received; checkpointed with the next batch
+
+    def files(self) -> Iterator[Tuple[str, Path, str, os.stat_result]]:
+        """Yields (relative path, path, content type, stat) for files not yet ingested, in path order."""
+        for directory, subdirs, filenames in os.walk(self.root):
+            subdirs.sort()
+            for filename in sorted(filenames):
+                path = Path(directory) / filename
+                content_type = content_type_of(path)
+                if content_type is None:
+                    continue
+                relative = path.relative_to(self.root).as_posix()
+                stat = path.stat()
+                if self.checkpoint.is_done(relative, stat):
+                    self.stats["skipped"] += 1
+                    continue
+                yield relative, path, content_type, stat
+
+    def _pool(self, kind: str, context, chunk_queue, stop) -> ProcessPoolExecutor:
+        workers = self.workers[kind]
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(kind, max(1, (os.cpu_count() or 1) // workers), chunk_queue, stop),
+        )
+
+    def run(self, report: Callable[[Dict], None] = lambda stats: None) -> Dict:
+        """Ingests the directory; `report` is called with the running stats after every batch."""
+        from app.services.vector_store import VectorStore
+        VectorStore.load_index()
+
+        self.started = time.perf_counter()
+        # Forking a process that has already initialised torch can deadlock
+        context = multiprocessing.get_context("spawn")
+        chunk_queue = context.Queue(maxsize=settings.INGEST_QUEUE_DEPTH * sum(self.workers.values()))
+        stop = context.Event()
+        pools = {kind: self._pool(kind, context, chunk_queue, stop) for kind in self.workers}
+
+        files = self.files()
+        try:
+            for task, (relative, path, content_type, stat) in enumerate(files):
+                file = _File(None, relative, path, content_type, stat, _file_hash(path))
+                if not self._claim(file):
+                    continue
+                kind = _kind(content_type)
+                while sum(1 for f in self.in_flight.values() if _kind(f.content_type) == kind) >= 2 * self.workers[kind]:
+                    self._poll(chunk_queue, report)
+                file.future = pools[kind].submit(extract_file, task, str(path), content_type)
+                self.in_flight[task] = file
+            while self.in_flight:
+                self._poll(chunk_queue, report)
+            if self.pending or self.finished:
+                self._commit()
+                report(self.progress())
+        except BaseException:
+            # Files not checkpointed are ingested again by the next run; drop what they already appended
+            self._discard([*self.in_flight.values(), *self.finished])
+            raise
+        finally:
+            stop.set()
+            files.close()
+            for pool in pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        # Let a snapshot rebuild the appends started finish, rather than abandon it at exit
+        for thread in (VectorStore._rebuild_thread, VectorStore._compaction_thread):
+            if thread is not None:
+                thread.join()
+        return self.progress()
+
+    def _claim(self, file: _File) -> bool:
+        """Whether `file` needs extracting: not if identical content is already indexed or claimed by this run."""
+        from app.services.vector_store import VectorStore
+
+        if file.content_hash in self.waiting:
+            self.waiting[file.content_hash].append(file)
+            return False
+        if file.content_hash in self.seen_hashes or VectorStore.metadata.find_by_hash(file.content_hash) is not None:
+            self._skip_duplicate(file)
+            return False
+        self.seen_hashes.add(file.content_hash)
+        self.waiting[file.content_hash] = []
+        return True
+
+    def _skip_duplicate(self, file: _File):
+        # Checkpointed with the next batch, so resumed runs don't hash it again
+        file.duplicate = file.ended = True
+        self.finished.append(file)
+
+    def _poll(self, chunk_queue, report: Callable[[Dict], None]):
+        # Chunks first: a worker waiting on a full queue never finishes its file
+        try:
+            task, chunks = chunk_queue.get(timeout=0.05)
+        except queue.Empty:
+            pass
+        else:
+            self._receive(task, chunks)
+
+        for task, file in list(self.in_flight.items()):
+            if not file.future.done():
+                continue
+            error = file.future.exception()
+            if error is not None:
+                del self.in_flight[task]
+                self._fail(file, error)
+            elif file.ended: # The end message may still be on its way after the result
+                del self.in_flight[task]
+                self.finished.append(file)
+                for duplicate in self.waiting.pop(file.content_hash, []):
+                    self._skip_duplicate(duplicate)
+
+        # Files skipped as duplicates count too, so a resumed run still checkpoints as it goes
+        if sum(len(metas) for _, metas in self.pending) >= self.batch_chunks or len(self.finished) >= self.batch_chunks:
+            self._commit()
+            report(self.progress())
+
+    def _receive(self, task: int, chunks: Optional[List[Dict]]):
+        from app.services.ingest_pipeline import chunk_metas
+
+        file = self.in_flight.get(task)
+        if file is None:
+            return # Its extraction has already failed
+        if chunks is None:
+            file.ended = True
+            return
+        if file.doc_id is None:
+            file.doc_id = generate_document_id()
+        # Stored and cited by content and relative path, so files that share a name in different folders stay apart
+        metas = chunk_metas(
+            chunks, file.doc_id, upload_name(file.content_hash, file.relative),
+            "transcript" if _kind(file.content_type) == "audio" else "text", file.chunks
+        )
+        file.chunks += len(metas)
+        self.pending.append((file, metas))
+
+    def _fail(self, file: _File, error: BaseException):
+        self.stats["failed"] += 1
+        self.failures[file.relative] = str(error) # Not checkpointed, so the next run retries it
+        self._discard([file])
+        # Identical files would fail the same way; none is checkpointed, so the next run retries them all
+        self.seen_hashes.discard(file.content_hash)
+        for duplicate in self.waiting.pop(file.content_hash, []):
+            self._fail(duplicate, error)
+
+    def _discard(self, files: List[_File]):
+        from app.services.vector_store import VectorStore
+
+        self.pending = [(file, metas) for file, metas in self.pending if file not in files]
+        appended = [ids for file in files for ids in file.ids]
+        if appended:
+            VectorStore.delete_chunks(np.concatenate(appended))
+
+    def _commit(self):
+        from app.services.embeddings import embeddings_service
+        from app.services.ingest_pipeline import CHUNKS_INDEXED
+        from app.services.vector_store import VectorStore
+
+        metas = [meta for _, file_metas in self.pending for meta in file_metas]
+        if metas:
+            embeddings = embeddings_service.encode_documents([meta["text"] for meta in metas])
+            ids = VectorStore.add_texts(embeddings, metas)
+            CHUNKS_INDEXED.inc(len(metas))
+            offset = 0
+            for file, file_metas in self.pending:
+                file.ids.append(ids[offset:offset + len(file_metas)])
+                offset += len(file_metas)
+        self.pending = []
+
+        # Every chunk of these files is in the index now
+        for file in self.finished:
+            if file.duplicate:
+                self.stats["duplicates"] += 1
+            elif file.doc_id is not None:
+                VectorStore.metadata.set_content_hash(str(file.doc_id), file.content_hash)
+                if self.copy_files:
+                    _copy(file.path, settings.UPLOAD_DIR / upload_name(file.content_hash, file.relative))
+            self.checkpoint.mark(file.relative, file.stat)
+        self.checkpoint.save()
+        self.stats["files"] += len(self.finished)
+        self.stats["chunks"] += len(metas)
+        self.stats["batches"] += 1
+        self.finished = []
+
+    def progress(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            **self.stats,
+            "elapsed_s": elapsed,
+            "files_per_s": self.stats["files"] / elapsed if elapsed else 0.0,
+            "chunks_per_s": self.stats["chunks"] / elapsed if elapsed else 0.0,
+        }
+
+
+def _copy(source: Path, target: Path):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staged = target.with_name(f".staging-{target.name}")
+    try:
+        os.link(source, staged) # Free when the archive is on the same filesystem
+    except OSError:
+        shutil.copy2(source, staged)
+    os.replace(staged, target)
@@ -0,0 +1,110 @@
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+# Sections fetched per document wanted, so documents with many matching sections don't crowd out the rest
+SECTION_OVERFETCH = 4
+
+
+def section_sums(doc_ids: Sequence[str], chunk_ids: Sequence[int], vectors: np.ndarray,
+                 section_chunks: int) -> Dict[Tuple[str, int], Tuple[int, np.ndarray]]:
+    """
+    Groups chunks into sections of `section_chunks` consecutive chunk ids per document and
+    returns {(doc_id, section): (chunk count, float64 sum of their unit vectors)}.
+    """
+    units = np.asarray(vectors, dtype=np.float64)
+    units = units / np.maximum(np.linalg.norm(units, axis=1, keepdims=True), 1e-12)
+    sums = {}
+    for doc_id, chunk_id, vector in zip(doc_ids, chunk_ids, units):
+        key = (str(doc_id), int(chunk_id or 0) // section_chunks)
+        count, total = sums.get(key, (0, 0.0))
+        sums[key] = (count + 1, total + vector)
+    return sums
+
+
+class DocumentIndex:
+    """
+    The coarse level of two-level retrieval: one vector per document section, the unit-length
+    centroid of its chunks. A short document is a single centroid; a long one keeps a vector
+    per part, so a passage deep inside it still pulls the document in.
+
+    The sums live in the metadata store, written in the same transaction as the chunks they
+    cover; each process mirrors them here by applying the rows changed since its last refresh.
+    """
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.reset()
+
+    def reset(self):
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        self.owners: Dict[int, str] = {} # Section row id -> doc id
+        self.sections: Dict[str, int] = {} # Doc id -> sections indexed
+        self.chunk_id_cache: Dict[str, np.ndarray] = {} # Doc id -> its chunks' FAISS ids, filled on first use
+        self.seq = 0 # Last metadata seq applied
+        self.lock = threading.Lock()
+
+    @property
+    def document_count(self) -> int:
+        return len(self.sections)
+
+    def refresh(self, metadata) -> int:
+        """Applies the section rows changed since the last refresh; returns how many there were."""
+        rows = metadata.section_vectors(self.seq)
+        if not rows:
+            return 0
+        latest = {row["id"]: row for row in rows} # A section changed twice counts once, as it is now
+        with self.lock:
+            # Adding or deleting a chunk always rewrites its document's sections, so this drops every stale entry
+            for row in latest.values():
+                self.chunk_id_cache.pop(row["doc_id"], None)
+            stale = [row_id for row_id in latest if row_id in self.owners]
+            if stale:
+                self.index.remove_ids(np.array(stale, dtype='int64'))
+                for row_id in stale:
+                    doc_id = self.owners.pop(row_id)
+                    self.sections[doc_id] -= 1
+                    if not self.sections[doc_id]:
+                        del self.sections[doc_id]
+
+            live = {row_id: row for row_id, row in latest.items() if row["count"]}
+            if live:
+                vectors = np.stack([
+                    np.frombuffer(row["vector"], dtype=np.float64) / row["count"] for row in live.values()
+                ]).astype('float32')
+                faiss.normalize_L2(vectors)
+                self.index.add_with_ids(vectors, np.fromiter(live, dtype='int64', count=len(live)))
+                for row_id, row in live.items():
+                    self.owners[row_id] = row["doc_id"]
+                    self.sections[row["doc_id"]] = self.sections.get(row["doc_id"], 0) + 1
+            self.seq = rows[-1]["seq"]
+        return len(rows)
+
+    def chunk_ids(self, doc_ids: Sequence[str], metadata) -> np.ndarray:
+        """Sorted FAISS ids of the chunks of `doc_ids`."""
+        with self.lock:
+            cached = {doc_id: self.chunk_id_cache.get(doc_id) for doc_id in doc_ids}
+            seq = self.seq
+        missing = [doc_id for doc_id, ids in cached.items() if ids is None]
+        if missing:
+            fetched = metadata.chunk_ids_by_document(missing)
+            with self.lock:
+                for doc_id in missing:
+                    cached[doc_id] = fetched.get(doc_id, np.empty(0, dtype='int64'))
+                    if self.seq == seq: # A refresh meanwhile may have made the fetch stale; use it but don't keep it
+                        self.chunk_id_cache[doc_id] = cached[doc_id]
+        parts = [ids for ids in cached.values() if ids is not None and len(ids)]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype='int64')
+
+    def search(self, vectors: np.ndarray, top_documents: int) -> List[List[str]]:
+        """The `top_documents` documents whose best section is closest to each query, best first."""
+        queries = np.array(vectors, dtype='float32') # Copy: normalize_L2 works in place
+        faiss.normalize_L2(queries)
+        with self.lock:
+            if self.index.ntotal == 0:
+                return [[] for _ in queries]
+            _, ids = self.index.search(queries, min(self.index.ntotal, top_documents * SECTION_OVERFETCH))
+            owners = [[self.owners[int(row_id)] for row_id in row if row_id != -1] for row in ids]
+        return [list(dict.fromkeys(row))[:top_documents] for row in owners]
@@ -1,102 +1,120 @@
 import os
 import io
-import fitz # PyMuPDF, usually faster/better than pdfplumber for some things but prompt asked for pdfplumber? 
+import threading
 # Prompt: "Implement PDF text extraction (PyPDF2/pdfplumber)"
-# I'll use pdfplumber as requested.
-import pdfplumber
-import docx
+# I'll use pdfplumber as requested (see app.utils.ocr).
 import pytesseract
 from PIL import Image
-from fastapi import UploadFile
+from contextlib import closing
 from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
 
 from app.config import settings
 from app.services.embeddings import embeddings_service
-from app.services.vector_store import VectorStore
-from app.utils.chunking import chunk_text
-from app.utils.metadata import create_metadata, generate_document_id
+from app.services.ingest_pipeline import index_chunks
+from app.utils.chunking import chunk_tokens, chunk_stream
+from app.utils.docx_text import iter_docx_paragraphs
+from app.utils.ocr import iter_pdf_pages, create_ocr_pool
+from app.utils.metadata import generate_document_id
+from app.utils.metrics import registry, span, timed
+
+PAGES = {
+    kind: registry.counter("evidentia_pages_processed_total", "Pages extracted; a DOCX or image counts as one", kind=kind)
+    for kind in ("pdf", "docx", "image")
+}
 
 class DocumentProcessor:
-    
-    async def process_file(self, file: UploadFile, file_path: Path):
-        content_type = file.content_type
-        filename = file.filename
-        doc_id = generate_document_id()
-        
-        text_chunks = []
+    def __init__(self):
+        self._ocr_pool = None
+        self._ocr_pool_lock = threading.Lock()
+        self.inline_ocr = False # Scanned pages OCR'd on the calling thread, for callers already one per core
+
+    @property
+    def ocr_pool(self):
+        # Created on first scanned PDF; shared by all ingestion threads
+        with self._ocr_pool_lock:
+            if self._ocr_pool is None:
+                self._ocr_pool = create_ocr_pool(settings.OCR_WORKERS, settings.OCR_WORKER_MEMORY_MB)
+            return self._ocr_pool
+
+    @timed("chunk")
+    def _chunk(self, text: str):
+        # Sized in the embedding model's own tokens, so no chunk is silently truncated
+        return chunk_tokens(
+            text,
+            chunk_size=min(settings.CHUNK_SIZE, embeddings_service.max_tokens),
+            overlap=settings.CHUNK_OVERLAP,
+            token_offsets=embeddings_service.token_offsets
+        )
+
+    def shutdown(self):
+        if self._ocr_pool is not None:
+            self._ocr_pool.shutdown(wait=False, cancel_futures=True)
+
+    @timed("ingest_document")
+    def process_file(self, file_path: Path, filename: str, content_type: str,
+                     doc_id=None, progress: Optional[Callable[[str, float], None]] = None):
+        # Synchronous on purpose: runs on an ingestion worker thread, never on the event loop
+        doc_id = doc_id or generate_document_id()
+        progress = progress or (lambda stage, fraction: None)
         
+        progress("extracting", 0.0)
+        chunks = self.extract_chunks(file_path, content_type, progress)
+            
+        # Embed and Store, batch by batch while extraction is still running
+        index_chunks(chunks, doc_id, filename, "text") # or ocr
+            
+        return doc_id
+
+    def extract_chunks(self, file_path: Path, content_type: str,
+                       progress: Optional[Callable[[str, float], None]] = None) -> Iterator[Dict]:
+        """Yields the file's chunks as {"text", "page"} dicts, without embedding them."""
+        progress = progress or (lambda stage, fraction: None)
         if content_type == "application/pdf":
-            text_chunks = self._process_pdf(file_path)
+            return self._process_pdf(file_path, progress)
         elif content_type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
-            text_chunks = self._process_docx(file_path)
+            return self._process_docx(file_path)
         elif content_type.startswith("image/"):
-            text_chunks = self._process_image(file_path)
+            return self._process_image(file_path)
         # Audio handled separate
-            
-        # Embed and Store
-        if text_chunks:
-            # Generate Embeddings
-            texts = [chunk['text'] for chunk in text_chunks]
-            embeddings = embeddings_service.encode_text(texts)
-            
-            # Prepare Metadata
-            metas = []
-            for i, chunk in enumerate(text_chunks):
-                meta = create_metadata(
-                    doc_id=str(doc_id),
-                    filename=filename,
-                    content_type="text", # or ocr
-                    page=chunk.get('page'),
-                    chunk_id=i
-                )
-                meta['text'] = chunk['text'] # Store text in metadata for retrieval context
-                metas.append(meta)
-                
-            VectorStore.add_texts(embeddings, metas)
-            
-        return doc_id
+        return iter(())
 
-    def _process_pdf(self, file_path: Path):
-        chunks = []
-        with pdfplumber.open(file_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                if not text:
-                    # Run OCR if no text found using pytesseract on page image
-                    # Convert page to image
-                    im = page.to_image(resolution=300)
-                    text = pytesseract.image_to_string(im.original)
-                
+    def _process_pdf(self, file_path: Path, progress: Callable[[str, float], None]) -> Iterator[Dict]:
+        # Pages without a text layer are rendered and OCR'd in parallel on the process pool
+        pages = iter_pdf_pages(
+            file_path,
+            dpi=settings.OCR_DPI,
+            lang=settings.OCR_LANG,
+            executor=None if self.inline_ocr else self.ocr_pool,
+            progress=lambda done, total: progress("extracting", done / total),
+            max_pending=settings.OCR_MAX_PENDING_PAGES
+        )
+        with closing(pages):
+            for page_number, text in pages:
+                PAGES["pdf"].inc()
                 if text:
-                    page_chunks = chunk_text(text)
-                    for chunk in page_chunks:
-                        chunks.append({"text": chunk, "page": i + 1})
-        return chunks
+                    for chunk in self._chunk(text):
+                        yield {"text": chunk, "page": page_number}
 
-    def _process_docx(self, file_path: Path):
-        chunks = []
-        doc = docx.Document(file_path)
-        full_text = "\n".join([para.text for para in doc.paragraphs])
-        text_chunks = chunk_text(full_text)
-        for chunk in text_chunks:
-             chunks.append({"text": chunk, "page": 1}) # DOCX doesn't have pages in same way
-        return chunks
+    def _process_docx(self, file_path: Path) -> Iterator[Dict]:
+        PAGES["docx"].inc()
+        for chunk in chunk_stream(iter_docx_paragraphs(file_path), self._chunk):
+            yield {"text": chunk, "page": 1} # DOCX doesn't have pages in same way
 
-    def _process_image(self, file_path: Path):
+    def _process_image(self, file_path: Path) -> Iterator[Dict]:
         # OCR
         image = Image.open(file_path)
-        text = pytesseract.image_to_string(image)
-        chunks = []
+        with span("ocr"):
+            text = pytesseract.image_to_string(image, lang=settings.OCR_LANG)
+        PAGES["image"].inc()
         if text:
-            text_chunks = chunk_text(text)
-            for chunk in text_chunks:
-                chunks.append({"text": chunk, "page": 1})
+            for chunk in self._chunk(text):
+                yield {"text": chunk, "page": 1}
         
         # TODO: Also could embed image directly using CLIP if we want image retrieval
         # Prompt says: "Images indexed as: OCR extracted text (primary), Optional image embeddings"
         # Since I'm using text-based RAG mainly, OCR is key. 
         # But if we want image match? 
         # For now, OCR is sufficient for "Unified Semantic Search" via text query.
-        return chunks
 
 document_processor = DocumentProcessor()
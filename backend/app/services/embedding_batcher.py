@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, List
+
+from app.utils.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_DELAY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250)
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve(setter, value):
+    try:
+        setter(value)
+    except InvalidStateError: # Already resolved or cancelled; nobody is waiting on it
+        pass
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces single-text encodes from concurrent requests into batched model calls.
+
+    Callers get a Future immediately. A dedicated thread takes the first waiting text,
+    keeps collecting until `max_batch_size` texts or `max_wait_ms` after that first text,
+    runs one `encode_batch` call and resolves every caller's future from the result.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], List], max_batch_size: int, max_wait_ms: float):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: "queue.Queue" = queue.Queue()
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delay_ms = Histogram(QUEUE_DELAY_BUCKETS_MS)
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        future = Future()
+        self.queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _ensure_started(self):
+        if self.thread is None or not self.thread.is_alive():
+            with self.start_lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self.thread.start()
+
+    def _collect(self) -> list:
+        batch = [self.queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Drain whatever is already queued even once the deadline has passed
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                self._process(self._collect())
+            except Exception:
+                logger.exception("Embedding batch failed")
+
+    def _process(self, batch: list):
+        started = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.queue_delay_ms.observe((started - enqueued) * 1000)
+
+        # Callers that gave up (a disconnected client cancels its wrapped future) aren't encoded
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            embeddings = self.encode_batch([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                _resolve(future.set_exception, e)
+            return
+        for (_, future, _), embedding in zip(batch, embeddings):
+            _resolve(future.set_result, embedding)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": self.queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_delay_ms": self.queue_delay_ms.snapshot(),
+        }
@@ -1,22 +1,145 @@
-from sentence_transformers import SentenceTransformer
-from PIL import Image
+import asyncio
+import json
+import threading
+from pathlib import Path
+import numpy as np
 from app.config import settings
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache, text_hash
+from app.utils.cache import TTLCache
+from app.utils.metrics import registry, timed
 
 class EmbeddingService:
     def __init__(self):
-        self.text_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        # Models load on first use: importing this module must stay cheap (workers, --reload)
+        self._text_model = None
+        self._image_model = None
+        self._tokenizer = None
+        self._max_tokens = None
+        self._load_lock = threading.Lock()
+        self.cache = EmbeddingCache(settings.METADATA_DIR / "embedding_cache.db")
+        self.query_cache = TTLCache(settings.QUERY_EMBEDDING_CACHE_SIZE, settings.QUERY_EMBEDDING_CACHE_TTL)
+        # Query encodes from concurrent requests share one model call per micro-batch
+        self.batcher = EmbeddingBatcher(
+            self.encode_text, settings.EMBEDDING_BATCH_MAX_SIZE, settings.EMBEDDING_BATCH_MAX_WAIT_MS
+        )
+
+    def _load(self, model_name: str):
+        from sentence_transformers import SentenceTransformer # Pulls in torch; deferred on purpose
+        return SentenceTransformer(model_name)
+
+    @property
+    def text_model(self):
+        if self._text_model is None:
+            with self._load_lock:
+                if self._text_model is None:
+                    self._text_model = self._load(settings.EMBEDDING_MODEL)
+        return self._text_model
+
+    @property
+    def image_model(self):
         # CLIP model for images. Utilizing sentence-transformers support.
         # "clip-ViT-B-32" is a valid model name in sentence-transformers
-        self.image_model = SentenceTransformer(settings.IMAGE_EMBEDDING_MODEL)
+        if self._image_model is None:
+            with self._load_lock:
+                if self._image_model is None:
+                    self._image_model = self._load(settings.IMAGE_EMBEDDING_MODEL)
+        return self._image_model
+
+    @property
+    def loaded(self) -> bool:
+        return self._text_model is not None
+
+    @property
+    def tokenizer(self):
+        # Chunking needs only the tokenizer, so processes that never embed (bulk ingest workers) skip the model and torch
+        if self._text_model is not None:
+            return self._text_model.tokenizer
+        if self._tokenizer is None:
+            with self._load_lock:
+                if self._tokenizer is None:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL)
+        return self._tokenizer
+
+    def token_offsets(self, text: str) -> list[tuple[int, int]]:
+        """Character spans of the text model's tokens in `text`, without special tokens."""
+        encoding = self.tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+        )
+        return encoding["offset_mapping"]
+
+    def _configured_max_seq_length(self):
+        # sentence-transformers keeps the model's input window next to its weights
+        try:
+            path = Path(settings.EMBEDDING_MODEL) / "sentence_bert_config.json"
+            if not path.exists():
+                from huggingface_hub import hf_hub_download
+                path = hf_hub_download(settings.EMBEDDING_MODEL, "sentence_bert_config.json")
+            with open(path, encoding="utf-8") as f:
+                return json.load(f).get("max_seq_length")
+        except Exception:
+            return None
 
-    def encode_text(self, texts: list[str]) -> list[list[float]]:
-        embeddings = self.text_model.encode(texts)
-        return embeddings.tolist()
+    @property
+    def max_tokens(self) -> int:
+        # Longest input the text model embeds without truncating, leaving room for [CLS]/[SEP]
+        if self._max_tokens is None:
+            if self._text_model is not None:
+                max_seq_length = self._text_model.max_seq_length
+            else:
+                max_seq_length = self._configured_max_seq_length() or self.text_model.max_seq_length
+            self._max_tokens = max_seq_length - 2
+        return self._max_tokens
+
+    @timed("embed_text")
+    def encode_text(self, texts: list[str]) -> np.ndarray:
+        # One contiguous float32 row per text, straight from the model; no per-float Python objects
+        return self.text_model.encode(texts, convert_to_numpy=True)
+
+    @timed("embed_query")
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embeds a single query; repeated queries are served from an in-memory LRU."""
+        embedding = self.query_cache.get(query)
+        if embedding is None:
+            embedding = self.batcher.submit(query).result()
+            self.query_cache.put(query, embedding)
+        return embedding
+
+    @timed("embed_query")
+    async def encode_query_async(self, query: str) -> np.ndarray:
+        """encode_query for the event loop: waits on the micro-batch without holding a thread."""
+        embedding = self.query_cache.get(query)
+        if embedding is None:
+            embedding = await asyncio.wrap_future(self.batcher.submit(query))
+            self.query_cache.put(query, embedding)
+        return embedding
+
+    @timed("embed_documents")
+    def encode_documents(self, texts: list[str]) -> np.ndarray:
+        """Like encode_text, but chunks already embedded by this model come from the persistent cache."""
+        if not texts:
+            return np.empty((0, 0), dtype='float32')
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(settings.EMBEDDING_MODEL, list(set(hashes)))
+
+        # Dedupe within the batch too: repeated boilerplate chunks are encoded once
+        missing = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+        if missing:
+            encoded = self.text_model.encode(list(missing.values()))
+            fresh = dict(zip(missing.keys(), encoded))
+            self.cache.put_many(settings.EMBEDDING_MODEL, fresh)
+            vectors.update(fresh)
+
+        return np.stack([vectors[h] for h in hashes]).astype('float32', copy=False)
     
-    def encode_image(self, image_path: str) -> list[float]:
+    def encode_image(self, image_path: str) -> np.ndarray:
+        from PIL import Image
         image = Image.open(image_path)
-        embedding = self.image_model.encode(image)
-        return embedding.tolist()
+        return self.image_model.encode(image, convert_to_numpy=True)
 
 # Global instance
 embeddings_service = EmbeddingService()
+
+registry.gauge("evidentia_embedding_batch_pending", "Query texts waiting for the next embedding micro-batch",
+               embeddings_service.batcher.queue.qsize)
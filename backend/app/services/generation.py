@@ -1,73 +1,220 @@
-import google.generativeai as genai
+import asyncio
+from contextlib import aclosing
 from app.config import settings
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.embeddings import embeddings_service
 from app.services.retrieval import retrieval_service
+from app.services.vector_store import VectorStore
+from app.services.generation_client import GenerationClient
+from app.utils.context import build_context
+from app.utils.metrics import registry, span
 
-# Configure Gemini
-genai.configure(api_key=settings.GEMINI_API_KEY)
+NO_RESULTS_ANSWER = "I could not find any relevant information in the uploaded documents."
+
+# Built once; every prompt starts with these same instructions and differs only after them
+PROMPT_HEADER = """
+You are an intelligent assistant for a RAG system. Answer the user's question based ONLY on the provided context.
+If the answer is not in the context, say "I cannot answer this based on the provided documents."
+Cite your sources using square brackets like [1], [2] at the end of sentences where facts are used.
+Do not hallucinate.
+
+Context:
+"""
+
+CONTEXT_TOKENS = {
+    kind: registry.counter(
+        "evidentia_context_tokens_total", "Passage tokens sent in prompts, or saved by merging, dedup and the budget", kind=kind
+    )
+    for kind in ("sent", "saved")
+}
 
 class GenerationService:
     def __init__(self):
-        self.model = genai.GenerativeModel(settings.GENERATION_MODEL)
+        # Gemini by default; settings.GENERATION_BACKEND swaps in a local stub
+        self.client = GenerationClient()
+        self.answer_cache = SemanticAnswerCache(settings.ANSWER_CACHE_SIZE, settings.ANSWER_CACHE_MIN_SIMILARITY)
+        VectorStore.delete_listeners.append(self.answer_cache.invalidate_documents)
 
-    async def generate_answer(self, query: str):
-        # Retrieve context
-        docs = retrieval_service.retrieve(query)
-        
-        if not docs:
-            return {
-                "answer": "I could not find any relevant information in the uploaded documents.",
-                "citations": []
-            }
-        
-        # Assemble Context
-        context_str = ""
-        citations = []
-        
-        for i, doc in enumerate(docs):
-            ref_num = i + 1
+    def _citation(self, doc):
+        return {
+            "source_file": doc['source'],
+            "page": doc.get('page'),
+            "timestamp": doc.get('timestamp'),
+            "snippet": doc['content'][:100] + "...",
+            "score": doc['score']
+        }
+
+    def _assemble_context(self, docs):
+        # Adjacent chunks merged, near-duplicates dropped, the rest fitted to CONTEXT_MAX_TOKENS
+        passages, stats = build_context(
+            docs, embeddings_service.token_offsets, settings.CONTEXT_MAX_TOKENS,
+            settings.CONTEXT_DEDUP_THRESHOLD, settings.CONTEXT_MIN_PASSAGE_TOKENS
+        )
+        CONTEXT_TOKENS["sent"].inc(stats["tokens"])
+        CONTEXT_TOKENS["saved"].inc(stats["tokens_saved"])
+
+        parts = []
+        for ref_num, doc in enumerate(passages, 1):
             source_info = f"{doc['source']}"
             if doc.get('page'):
                 source_info += f", page {doc['page']}"
             if doc.get('timestamp'):
                 source_info += f", {doc['timestamp']}"
-            
-            context_str += f"Source [{ref_num}]: {doc['content']}\nReference: {source_info}\n\n"
-            
-            citations.append({
-                "source_file": doc['source'],
-                "page": doc.get('page'),
-                "timestamp": doc.get('timestamp'),
-                "snippet": doc['content'][:100] + "...",
-                "score": doc['score']
-            })
-            
-        # Construct Prompt
-        prompt = f"""
-You are an intelligent assistant for a RAG system. Answer the user's question based ONLY on the provided context.
-If the answer is not in the context, say "I cannot answer this based on the provided documents."
-Cite your sources using square brackets like [1], [2] at the end of sentences where facts are used.
-Do not hallucinate.
+            parts.append(f"Source [{ref_num}]: {doc['content']}\nReference: {source_info}\n\n")
 
-Context:
-{context_str}
+        return "".join(parts), [self._citation(doc) for doc in passages], stats
+
+    def _build_prompt(self, query: str, context_str: str) -> str:
+        return f"{PROMPT_HEADER}{context_str}\n\nUser Question: {query}\nAnswer:\n"
+
+    def _error_answer(self, e: Exception) -> str:
+        if "429" in str(e) or "ResourceExhausted" in str(e):
+            return "I apologize, but I have hit the usage limit for the Gemini API (Quota Exceeded). Please try again in a minute."
+        return f"I encountered an error while generating the answer: {str(e)}"
+
+    async def _cache_key(self, query: str, docs):
+        """(query embedding, chunk ids) for the answer cache, or None when it can't apply."""
+        chunk_ids = [doc.get('faiss_id') for doc in docs]
+        if not docs or not self.answer_cache.enabled or None in chunk_ids:
+            return None
+        # Retrieval just embedded the same text, so this is a query-cache hit
+        return await embeddings_service.encode_query_async(query.strip()), chunk_ids
+
+    def _cache_answer(self, cache_key, docs, result):
+        if cache_key is not None:
+            self.answer_cache.put(*cache_key, {doc['doc_id'] for doc in docs}, result)
+
+    async def generate_answer(self, query: str, k: int = 3, nprobe: int = None, ef_search: int = None,
+                              filters=None):
+        # Retrieve context
+        docs = await retrieval_service.aretrieve(query, k, nprobe=nprobe, ef_search=ef_search, filters=filters)
+
+        # Paraphrases of an answered question that retrieve the same chunks skip generation
+        cache_key = await self._cache_key(query, docs)
+        if cache_key is not None:
+            cached = self.answer_cache.get(*cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        result = await self._answer_from_docs(query, docs)
+        if not result.pop("failed", False):
+            self._cache_answer(cache_key, docs, result)
+        return result
+
+    async def _answer_from_docs(self, query: str, docs):
+        if not docs:
+            return {
+                "answer": NO_RESULTS_ANSWER,
+                "citations": []
+            }
+
+        with span("prompt_assembly"):
+            # Assemble Context
+            context_str, citations, stats = self._assemble_context(docs)
+
+            # Construct Prompt
+            prompt = self._build_prompt(query, context_str)
 
-User Question: {query}
-Answer:
-"""
-        
         # Generate
+        failed = False
         try:
-            response = self.model.generate_content(prompt)
-            answer = response.text
+            with span("llm"):
+                answer = await self.client.generate(prompt)
         except Exception as e:
-            if "429" in str(e) or "ResourceExhausted" in str(e):
-                 answer = "I apologize, but I have hit the usage limit for the Gemini API (Quota Exceeded). Please try again in a minute."
-            else:
-                 answer = f"I encountered an error while generating the answer: {str(e)}"
-        
+            answer = self._error_answer(e)
+            failed = True # Never cached
+
         return {
             "answer": answer,
-            "citations": citations
+            "citations": citations,
+            "context": stats,
+            "failed": failed
         }
 
+    async def answer_batch(self, queries, k: int = 3, generate: bool = False, max_concurrency: int = None,
+                           nprobe: int = None, ef_search: int = None, filters=None):
+        """
+        Answers many queries with one embedding call and one index search. With `generate`,
+        answers are produced with at most `max_concurrency` in flight. Returns one dict per
+        query, in order; a failing query gets an "error" instead of failing the batch.
+        """
+        results = [{"query": query, "answer": None, "citations": [], "error": None} for query in queries]
+        valid = [i for i, query in enumerate(queries) if query.strip()]
+        for i in set(range(len(queries))) - set(valid):
+            results[i]["error"] = "Query is empty"
+
+        if not valid:
+            return results
+
+        all_docs = await asyncio.to_thread(
+            retrieval_service.retrieve_batch, [queries[i] for i in valid], k, nprobe, ef_search, filters
+        )
+
+        if not generate:
+            for i, docs in zip(valid, all_docs):
+                results[i]["citations"] = [self._citation(doc) for doc in docs]
+            return results
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or settings.BATCH_GENERATION_CONCURRENCY))
+
+        async def answer(i, docs):
+            async with semaphore:
+                return await self._answer_from_docs(queries[i], docs)
+
+        answers = await asyncio.gather(
+            *(answer(i, docs) for i, docs in zip(valid, all_docs)), return_exceptions=True
+        )
+        for i, answer in zip(valid, answers):
+            if isinstance(answer, Exception):
+                results[i]["error"] = str(answer)
+            else:
+                answer.pop("failed", None)
+                results[i].update(answer)
+        return results
+
+    async def stream_answer(self, query: str, k: int = 3, nprobe: int = None, ef_search: int = None,
+                            filters=None):
+        """
+        Yields (event, data) pairs: "citations" as soon as retrieval finishes, then one "token"
+        per streamed chunk, then "done". Closing the generator stops upstream generation.
+        """
+        docs = await retrieval_service.aretrieve(query, k, nprobe=nprobe, ef_search=ef_search, filters=filters)
+
+        if not docs:
+            yield "citations", []
+            yield "token", NO_RESULTS_ANSWER
+            yield "done", {}
+            return
+
+        cache_key = await self._cache_key(query, docs)
+        cached = self.answer_cache.get(*cache_key) if cache_key is not None else None
+        if cached is not None:
+            yield "citations", cached["citations"]
+            yield "token", cached["answer"]
+            yield "done", {"context": cached["context"], "cached": True}
+            return
+
+        with span("prompt_assembly"):
+            context_str, citations, stats = self._assemble_context(docs)
+            prompt = self._build_prompt(query, context_str)
+        yield "citations", citations
+
+        tokens = []
+        failed = False
+        try:
+            # A client disconnect closes this generator, and aclosing passes that on to stop upstream generation
+            async with aclosing(self.client.stream(prompt)) as stream:
+                async for token in stream:
+                    tokens.append(token)
+                    yield "token", token
+        except Exception as e:
+            failed = True
+            yield "token", self._error_answer(e)
+        if not failed:
+            self._cache_answer(cache_key, docs, {"answer": "".join(tokens), "citations": citations, "context": stats})
+        yield "done", {"context": stats}
+
 generation_service = GenerationService()
+
+registry.gauge("evidentia_llm_inflight", "Distinct generation calls in flight upstream",
+               lambda: len(generation_service.client.inflight))
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from app.config import settings
+from app.services.llm_backends import create_backend
+
+
+def is_rate_limited(e: Exception) -> bool:
+    # google.api_core raises ResourceExhausted for HTTP 429; match by name to avoid importing the SDK
+    return type(e).__name__ == "ResourceExhausted" or "429" in str(e) or "ResourceExhausted" in str(e)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return # Unlimited
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class GenerationClient:
+    """
+    Event-loop-friendly front for a generation backend.
+
+    - calls never block the loop (native async where the backend has it)
+    - at most GENERATION_MAX_CONCURRENCY calls upstream at once, paced by a token bucket
+    - rate-limit errors are retried with exponential backoff and full jitter (streams: until the first token)
+    - identical prompts already in flight share one upstream call
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self.semaphore = None
+        self.bucket = None
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"calls": 0, "coalesced": 0, "retries": 0, "rate_limited": 0}
+
+    @property
+    def backend(self):
+        # Created on first use so importing the app never touches the LLM SDK
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    def _ensure_primitives(self):
+        # asyncio primitives bind to the running loop, so they are created on first use
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(settings.GENERATION_MAX_CONCURRENCY)
+            self.bucket = TokenBucket(settings.GENERATION_RATE_PER_MINUTE / 60.0, settings.GENERATION_BURST)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one concurrency slot, after waiting for a rate-limit token."""
+        self._ensure_primitives()
+        async with self.semaphore:
+            await self.bucket.acquire()
+            yield
+
+    async def generate(self, prompt: str) -> str:
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        task = self.inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._generate_with_retries(prompt))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # Shield so one caller disconnecting doesn't cancel the call for everyone sharing it
+        return await asyncio.shield(task)
+
+    async def _generate_with_retries(self, prompt: str) -> str:
+        attempt = 0
+        while True:
+            try:
+                async with self.slot():
+                    self.counters["calls"] += 1
+                    return await self.backend.agenerate(prompt)
+            except Exception as e:
+                if not await self._backoff(e, attempt):
+                    raise
+                attempt += 1
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Yields the answer's tokens as the backend streams them, holding a slot throughout.
+        A rate-limit error before the first token is retried like generate(); after it, errors
+        propagate. Closing the generator stops upstream generation.
+        """
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self.slot():
+                    self.counters["calls"] += 1
+                    async with aclosing(self._drain(prompt)) as tokens:
+                        async for token in tokens:
+                            started = True
+                            yield token
+                return
+            except Exception as e:
+                if started or not await self._backoff(e, attempt):
+                    raise
+                attempt += 1
+
+    async def _drain(self, prompt: str) -> AsyncIterator[str]:
+        # The SDK stream is a blocking iterator, so drain it on a worker thread into an asyncio queue
+        backend = self.backend
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def emit(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                cancelled.set() # Event loop is gone
+
+        def produce():
+            try:
+                for token in backend.stream(prompt):
+                    if cancelled.is_set():
+                        break
+                    emit((token, None))
+            except Exception as e:
+                emit((None, e))
+            finally:
+                emit(None)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while (item := await queue.get()) is not None:
+                token, error = item
+                if error is not None:
+                    raise error
+                yield token
+        finally:
+            cancelled.set()
+
+    async def _backoff(self, e: Exception, attempt: int) -> bool:
+        """Sleeps before retrying a rate-limited call; False when `e` should propagate instead."""
+        if not is_rate_limited(e):
+            return False
+        self.counters["rate_limited"] += 1
+        if attempt >= settings.GENERATION_MAX_RETRIES:
+            return False
+        delay = min(settings.GENERATION_BACKOFF_MAX, settings.GENERATION_BACKOFF_BASE * 2 ** attempt)
+        self.counters["retries"] += 1
+        await asyncio.sleep(random.uniform(0, delay))
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "inflight": len(self.inflight)}
@@ -0,0 +1,67 @@
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.embeddings import embeddings_service
+from app.services.vector_store import VectorStore
+from app.utils.metadata import create_metadata
+from app.utils.metrics import registry
+from app.utils.pipeline import batched, pipelined
+
+CHUNKS_INDEXED = registry.counter("evidentia_chunks_indexed_total", "Chunks embedded and appended to the index")
+
+
+def _embed(batches: Iterator[List[Dict]]) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+    with closing(batches):
+        for batch in batches:
+            yield batch, embeddings_service.encode_documents([chunk["text"] for chunk in batch])
+
+
+def chunk_metas(chunks: Iterable[Dict], doc_id, filename: str, content_type: str, first_chunk_id: int = 0) -> List[Dict]:
+    """Index metadata for chunk dicts of one document, numbered from `first_chunk_id`."""
+    metas = []
+    for chunk_id, chunk in enumerate(chunks, first_chunk_id):
+        meta = create_metadata(
+            doc_id=str(doc_id),
+            filename=filename,
+            content_type=content_type,
+            page=chunk.get("page"),
+            timestamp=chunk.get("timestamp"),
+            chunk_id=chunk_id
+        )
+        meta['text'] = chunk["text"] # Store text in metadata for retrieval context
+        metas.append(meta)
+    return metas
+
+
+def index_chunks(chunks: Iterable[Dict], doc_id, filename: str, content_type: str) -> int:
+    """
+    Embeds and indexes a stream of chunk dicts ({"text", "page"/"timestamp"}) in batches of
+    INGEST_BATCH_SIZE; returns how many were indexed.
+
+    Extraction (pulling `chunks`), embedding and index appends each run on their own thread,
+    joined by queues of INGEST_QUEUE_DEPTH batches, so they overlap and memory stays bounded
+    by a few batches whatever the file size. If a stage fails, the chunks already appended
+    are deleted again so a document is never left half indexed.
+    """
+    depth = settings.INGEST_QUEUE_DEPTH
+    batches = pipelined(batched(chunks, settings.INGEST_BATCH_SIZE), depth, name="ingest-extract")
+    embedded = pipelined(_embed(batches), depth, name="ingest-embed")
+
+    added = []
+    chunk_id = 0
+    with closing(embedded):
+        try:
+            for batch, embeddings in embedded:
+                metas = chunk_metas(batch, doc_id, filename, content_type, chunk_id)
+                chunk_id += len(metas)
+                added.append(VectorStore.add_texts(embeddings, metas))
+                CHUNKS_INDEXED.inc(len(metas))
+        except BaseException:
+            if added:
+                VectorStore.delete_chunks(np.concatenate(added))
+            raise
+
+    return chunk_id
@@ -0,0 +1,178 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config import settings
+from app.models import JobStatus
+from app.services.audio_processor import audio_processor
+from app.services.document_processor import document_processor
+from app.services.vector_store import VectorStore
+from app.utils.metadata import generate_document_id
+from app.utils.metrics import registry
+
+
+class IngestionQueue:
+    """
+    Runs uploads on bounded worker pools, one pool per file kind.
+
+    Threads rather than processes: the embedding model, Whisper model and vector store are
+    per-process singletons, and the heavy work (torch, Tesseract, FAISS) releases the GIL.
+    """
+
+    def __init__(self):
+        self.jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+        self.inflight: Dict[str, JobStatus] = {} # content hash -> queued/running job
+        self.lock = threading.Lock()
+        self.executors = {
+            "document": ThreadPoolExecutor(settings.DOCUMENT_INGEST_WORKERS, thread_name_prefix="ingest-document"),
+            "audio": ThreadPoolExecutor(settings.AUDIO_INGEST_WORKERS, thread_name_prefix="ingest-audio"),
+        }
+
+    def find_duplicate(self, content_hash: str, filename: str, content_type: str) -> Optional[JobStatus]:
+        """Returns the job that already covers identical file content, if any."""
+        with self.lock:
+            if content_hash in self.inflight:
+                return self.inflight[content_hash]
+
+        existing = VectorStore.metadata.find_by_hash(content_hash)
+        if existing is None:
+            return None
+
+        # Record a finished job so clients can poll it like any other upload
+        now = datetime.utcnow()
+        job = JobStatus(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            content_type=content_type,
+            kind="audio" if content_type.startswith("audio/") else "document",
+            status="completed",
+            stage="duplicate",
+            progress=1.0,
+            document_id=existing["id"],
+            content_hash=content_hash,
+            duplicate=True,
+            created_at=now,
+            started_at=now,
+            finished_at=now,
+        )
+        with self.lock:
+            self.jobs[job.id] = job
+            self._trim_history()
+        return job
+
+    def content_owner(self, content_hash: str) -> Optional[str]:
+        """Id of the document that holds, or is being given, this exact content."""
+        with self.lock:
+            job = self.inflight.get(content_hash)
+        if job is not None:
+            return job.document_id
+        existing = VectorStore.metadata.find_by_hash(content_hash)
+        return existing["id"] if existing else None
+
+    def submit(self, file_path: Path, filename: str, content_type: str,
+               content_hash: Optional[str] = None, replace_document_id: Optional[str] = None) -> JobStatus:
+        """Queues an ingest. With `replace_document_id`, the new content replaces that document's chunks."""
+        kind = "audio" if content_type.startswith("audio/") else "document"
+        job = JobStatus(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            content_type=content_type,
+            kind=kind,
+            document_id=replace_document_id or generate_document_id(),
+            content_hash=content_hash,
+            created_at=datetime.utcnow(),
+        )
+        with self.lock:
+            self.jobs[job.id] = job
+            if content_hash:
+                self.inflight[content_hash] = job
+            self._trim_history()
+
+        self.executors[kind].submit(self._run, job, file_path, replace_document_id is not None)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self.lock:
+            depth = {kind: 0 for kind in self.executors}
+            for job in self.jobs.values():
+                if job.status in ("queued", "running"):
+                    depth[job.kind] += 1
+            return depth
+
+    def _trim_history(self):
+        # Only finished jobs are evicted; in-flight ones must stay visible to pollers
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ("completed", "failed")]
+        for job_id in finished[:max(0, len(self.jobs) - settings.JOB_HISTORY_LIMIT)]:
+            del self.jobs[job_id]
+
+    def _run(self, job: JobStatus, file_path: Path, replace: bool = False):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        # The old chunks stay searchable until the new ones are indexed
+        old_chunk_ids = VectorStore.metadata.chunk_ids(job.document_id) if replace else None
+        old_document = VectorStore.metadata.get_document(job.document_id) if replace else None
+
+        def progress(stage: str, fraction: float):
+            job.stage = stage
+            job.progress = fraction
+
+        try:
+            if job.kind == "audio":
+                audio_processor.process_audio(file_path, job.filename, doc_id=job.document_id, progress=progress)
+            else:
+                document_processor.process_file(
+                    file_path, job.filename, job.content_type, doc_id=job.document_id, progress=progress
+                )
+            if old_chunk_ids is not None and len(old_chunk_ids):
+                VectorStore.delete_chunks(old_chunk_ids)
+            if old_document is not None and old_document["filename"] != job.filename:
+                remove_upload(old_document["filename"])
+            if job.content_hash:
+                VectorStore.metadata.set_content_hash(job.document_id, job.content_hash)
+            job.status = "completed"
+            job.stage = "done"
+            job.progress = 1.0
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            # Nothing cites the stored upload now, unless a replacement re-sent the document's current bytes
+            if old_document is None or old_document["filename"] != job.filename:
+                remove_upload(job.filename)
+        finally:
+            job.finished_at = datetime.utcnow()
+            with self.lock:
+                self.inflight.pop(job.content_hash, None)
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def remove_upload(filename: str):
+    """Removes a stored upload, and the directories it leaves empty, unless a document still cites it."""
+    if VectorStore.metadata.has_filename(filename):
+        return
+    file_path = settings.UPLOAD_DIR / filename
+    if file_path.exists():
+        os.remove(file_path)
+    for directory in file_path.parents: # Bulk-ingested files keep their folders below the content directory
+        if directory == settings.UPLOAD_DIR:
+            break
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break # Not empty, or already gone
+
+
+ingestion_queue = IngestionQueue()
+
+registry.gauge("evidentia_ingest_queue_depth", "Ingestion jobs queued or running", ingestion_queue.queue_depth, label="kind")
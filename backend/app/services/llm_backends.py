@@ -0,0 +1,98 @@
+import asyncio
+import re
+import time
+from typing import Iterator
+
+from app.config import settings
+
+
+class GeminiBackend:
+    def __init__(self, model_name: str):
+        import google.generativeai as genai
+
+        # Configure Gemini
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    async def agenerate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend:
+    """
+    Deterministic local stand-in for Gemini, for tests and benchmarks.
+
+    `latency` is the delay before the first token, `token_delay` the delay between tokens.
+    """
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+
+    def _answer(self, prompt: str) -> str:
+        match = re.search(r"User Question: (.*)\n", prompt)
+        question = match.group(1).strip() if match else ""
+        sources = sorted(set(re.findall(r"Source \[(\d+)\]", prompt)), key=int)
+        refs = "".join(f"[{n}]" for n in sources) or "[1]"
+        return f"Based on the provided documents, here is what they say about \"{question}\" {refs}."
+
+    def generate(self, prompt: str) -> str:
+        tokens = list(self.stream(prompt))
+        return "".join(tokens)
+
+    async def agenerate(self, prompt: str) -> str:
+        answer = self._answer(prompt)
+        await asyncio.sleep(self.latency + self.token_delay * (len(answer.split(" ")) - 1))
+        return answer
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        time.sleep(self.latency)
+        for i, word in enumerate(self._answer(prompt).split(" ")):
+            if i:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+class HttpBackend:
+    """
+    Posts prompts to an HTTP endpoint that answers `{"text": ...}`, e.g. the local
+    stub in benchmarks/stub_llm_server.py. Lets the client be load-tested end to end,
+    including real 429 responses.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def generate(self, prompt: str) -> str:
+        response = self.session.post(self.url, json={"prompt": prompt}, timeout=self.timeout)
+        if response.status_code == 429:
+            raise RuntimeError("429 ResourceExhausted: stub rate limit")
+        response.raise_for_status()
+        return response.json()["text"]
+
+    async def agenerate(self, prompt: str) -> str:
+        return await asyncio.to_thread(self.generate, prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        yield self.generate(prompt)
+
+
+def create_backend():
+    if settings.GENERATION_BACKEND == "fake":
+        return FakeBackend(settings.FAKE_LLM_LATENCY, settings.FAKE_LLM_TOKEN_DELAY)
+    if settings.GENERATION_BACKEND == "http":
+        return HttpBackend(settings.GENERATION_STUB_URL)
+    return GeminiBackend(settings.GENERATION_MODEL)
@@ -0,0 +1,383 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    content_type TEXT,
+    upload_time TEXT,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    faiss_id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL REFERENCES documents(id),
+    chunk_id INTEGER,
+    page INTEGER,
+    timestamp TEXT,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id);
+CREATE TABLE IF NOT EXISTS tombstones (
+    faiss_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS document_sections (
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    section INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    vector BLOB,
+    seq INTEGER NOT NULL,
+    UNIQUE (doc_id, section)
+);
+CREATE INDEX IF NOT EXISTS idx_sections_seq ON document_sections(seq);
+"""
+
+# Filter name -> SQL condition on the documents table (see `filter_ids`)
+DOCUMENT_FILTERS = {
+    "doc_id": "d.id = ?",
+    # Stored name, the path within its content directory, or just the file's own name
+    "filename": "? IN (d.filename, substr(d.filename, instr(d.filename, '/') + 1), basename(d.filename))",
+    "content_type": "d.content_type = ?",
+    "uploaded_after": "d.upload_time >= ?",
+    "uploaded_before": "d.upload_time < ?",
+}
+
+
+def _upload_time_param(value) -> str:
+    # upload_time is stored as naive UTC ISO-8601, which sorts correctly as text
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+    return str(value)
+
+def _basename(filename: Optional[str]) -> Optional[str]:
+    # Bulk-ingested files keep their folders, e.g. "<hash>/sub/dir/file.pdf"
+    return filename.rsplit("/", 1)[-1] if filename else filename
+
+def _batches(values: List, size: int = 500) -> Iterator[List]:
+    # Stay well under SQLite's bound-parameter limit (999 before 3.32, 32766 since)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+# Columns added after the first release of the schema, applied with ALTER TABLE on open
+MIGRATIONS = {
+    "documents": {"content_hash": "TEXT"},
+}
+
+
+class MetadataStore:
+    """
+    SQLite-backed chunk and document metadata.
+
+    Chunks are keyed by their FAISS id, so search hits resolve with a primary-key lookup and
+    only the matched chunks' text is ever read. Document-level fields are stored once in the
+    `documents` table, which doubles as the registry behind `/documents`. Deleted chunks leave
+    their FAISS id in `tombstones` until the vector store has dropped the vectors.
+
+    `document_sections` holds, per document section, the count and float64 sum of its chunks'
+    unit vectors (see document_index). Every change gets a new `seq`; a removed section keeps
+    its row with count 0, so processes mirroring the table see removals too.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function("basename", 1, _basename, deterministic=True)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash)")
+
+    def _migrate(self):
+        for table, columns in MIGRATIONS.items():
+            existing = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def add_chunks(self, first_faiss_id: int, metas: List[Dict], sections: Optional[Dict] = None):
+        """
+        Registers `metas` under consecutive FAISS ids starting at `first_faiss_id`, and adds
+        `sections` ({(doc_id, section): (count, vector sum)}) to the section sums in the same transaction.
+        """
+        with self.lock, self.conn:
+            for offset, meta in enumerate(metas):
+                # Upsert so re-ingesting a document under its old id refreshes its fields
+                self.conn.execute(
+                    "INSERT INTO documents (id, filename, content_type, upload_time) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET filename = excluded.filename, "
+                    "content_type = excluded.content_type, upload_time = excluded.upload_time",
+                    (meta.get('id'), meta.get('filename'), meta.get('content_type'), meta.get('upload_time'))
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO chunks (faiss_id, doc_id, chunk_id, page, timestamp, text) VALUES (?, ?, ?, ?, ?, ?)",
+                    (first_faiss_id + offset, meta.get('id'), meta.get('chunk_id'), meta.get('page'),
+                     meta.get('timestamp'), meta.get('text', ''))
+                )
+            self._refresh_counts({meta.get('id') for meta in metas})
+            if sections:
+                self._add_sections(sections)
+
+    def _next_seq(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM document_sections").fetchone()[0]
+
+    def _add_sections(self, sections: Dict):
+        seq = self._next_seq()
+        for (doc_id, section), (count, total) in sections.items():
+            row = self.conn.execute(
+                "SELECT count, vector FROM document_sections WHERE doc_id = ? AND section = ?", (doc_id, section)
+            ).fetchone()
+            if row is not None and row["count"]:
+                count += row["count"]
+                total = total + np.frombuffer(row["vector"], dtype=np.float64)
+            self._put_section(doc_id, section, count, total, seq)
+
+    def _put_section(self, doc_id: str, section: int, count: int, total, seq: int):
+        self.conn.execute(
+            "INSERT INTO document_sections (doc_id, section, count, vector, seq) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(doc_id, section) DO UPDATE SET count = excluded.count, vector = excluded.vector, seq = excluded.seq",
+            (doc_id, section, count, np.asarray(total, dtype=np.float64).tobytes() if count else None, seq)
+        )
+
+    def _replace_sections(self, doc_ids: Iterable[str], sections: Dict):
+        seq = self._next_seq()
+        for doc_id in doc_ids:
+            self.conn.execute(
+                "UPDATE document_sections SET count = 0, vector = NULL, seq = ? WHERE doc_id = ? AND count > 0",
+                (seq, str(doc_id))
+            )
+        for (doc_id, section), (count, total) in sections.items():
+            self._put_section(doc_id, section, count, total, seq)
+
+    def add_sections(self, sections: Dict):
+        with self.lock, self.conn:
+            self._add_sections(sections)
+
+    def replace_sections(self, doc_ids: Iterable[str], sections: Dict):
+        """Sets the section sums of `doc_ids` to `sections`; their sections missing from it are removed."""
+        with self.lock, self.conn:
+            self._replace_sections(doc_ids, sections)
+
+    def has_sections(self) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM document_sections LIMIT 1").fetchone() is not None
+
+    def section_vectors(self, since_seq: int = 0) -> List[Dict]:
+        """Section rows changed after `since_seq`, in seq order, as {id, doc_id, count, vector, seq}."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, doc_id, count, vector, seq FROM document_sections WHERE seq > ? ORDER BY seq",
+                (since_seq,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _refresh_counts(self, doc_ids: Iterable[str]):
+        for doc_id in doc_ids:
+            self.conn.execute(
+                "UPDATE documents SET chunk_count = (SELECT COUNT(*) FROM chunks WHERE doc_id = ?) WHERE id = ?",
+                (doc_id, doc_id)
+            )
+
+    def truncate(self, next_id: int) -> List[str]:
+        """
+        Drops chunk rows with ids from `next_id` on, i.e. rows whose vectors never made it to
+        disk; returns the documents touched, whose section sums still count those rows.
+        """
+        with self.lock, self.conn:
+            doc_ids = [row["doc_id"] for row in self.conn.execute(
+                "SELECT DISTINCT doc_id FROM chunks WHERE faiss_id >= ?", (next_id,)
+            )]
+            if not doc_ids:
+                return []
+            self.conn.execute("DELETE FROM chunks WHERE faiss_id >= ?", (next_id,))
+            self._refresh_counts(doc_ids)
+            self.conn.execute("DELETE FROM documents WHERE chunk_count = 0")
+        return doc_ids
+
+    def chunk_ids(self, doc_id: str) -> np.ndarray:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT faiss_id FROM chunks WHERE doc_id = ? ORDER BY faiss_id", (str(doc_id),)
+            ).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def chunk_ids_by_document(self, doc_ids: Iterable[str]) -> Dict[str, np.ndarray]:
+        """{doc_id: sorted FAISS ids of its chunks} for those of `doc_ids` that have any."""
+        doc_ids = [str(doc_id) for doc_id in doc_ids]
+        if not doc_ids:
+            return {}
+        rows = []
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.row_factory = None # Plain tuples: this runs per query and can return thousands of rows
+            for batch in _batches(doc_ids):
+                rows.extend(cursor.execute(
+                    f"SELECT doc_id, faiss_id FROM chunks WHERE doc_id IN ({','.join('?' * len(batch))}) "
+                    "ORDER BY doc_id, faiss_id",
+                    batch
+                ))
+        grouped = {}
+        for doc_id, faiss_id in rows:
+            grouped.setdefault(doc_id, []).append(faiss_id)
+        return {doc_id: np.array(ids, dtype=np.int64) for doc_id, ids in grouped.items()}
+
+    def chunk_positions(self, doc_ids: Optional[Iterable[str]] = None, min_id: int = 0,
+                        stop_id: Optional[int] = None) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """(faiss ids, doc ids, chunk ids) of the chunks of `doc_ids` (default all) with ids in [min_id, stop_id), by id."""
+        conditions, params = ["faiss_id >= ?"], [int(min_id)]
+        if stop_id is not None:
+            conditions.append("faiss_id < ?")
+            params.append(int(stop_id))
+        where = " AND ".join(conditions)
+        if doc_ids is None:
+            queries = [(where, params)]
+        else:
+            doc_ids = [str(doc_id) for doc_id in doc_ids]
+            queries = [(f"{where} AND doc_id IN ({','.join('?' * len(batch))})", params + batch) for batch in _batches(doc_ids)]
+        rows = []
+        with self.lock:
+            for query_where, query_params in queries:
+                rows.extend(self.conn.execute(
+                    f"SELECT faiss_id, doc_id, chunk_id FROM chunks WHERE {query_where} ORDER BY faiss_id", query_params
+                ))
+        if len(queries) > 1:
+            rows.sort(key=lambda row: row[0])
+        return (np.array([row[0] for row in rows], dtype=np.int64), [row[1] for row in rows],
+                np.array([row[2] or 0 for row in rows], dtype=np.int64))
+
+    def delete_chunks(self, faiss_ids: Iterable[int], sections: Optional[Dict] = None) -> List[str]:
+        """
+        Removes the chunks and records their ids as tombstones, in one transaction; returns the
+        documents touched. With `sections`, those documents' section sums are replaced by it.
+        """
+        faiss_ids = [(int(i),) for i in faiss_ids]
+        if not faiss_ids:
+            return []
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS doomed (faiss_id INTEGER PRIMARY KEY)")
+            self.conn.execute("DELETE FROM doomed")
+            self.conn.executemany("INSERT OR IGNORE INTO doomed VALUES (?)", faiss_ids)
+            doc_ids = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT doc_id FROM chunks WHERE faiss_id IN (SELECT faiss_id FROM doomed)"
+            )]
+            self.conn.execute("INSERT OR IGNORE INTO tombstones SELECT faiss_id FROM doomed")
+            self.conn.execute("DELETE FROM chunks WHERE faiss_id IN (SELECT faiss_id FROM doomed)")
+            self._refresh_counts(doc_ids)
+            self.conn.execute("DELETE FROM documents WHERE chunk_count = 0")
+            if sections is not None:
+                self._replace_sections(doc_ids, sections)
+        return doc_ids
+
+    def tombstone_ids(self) -> np.ndarray:
+        with self.lock:
+            rows = self.conn.execute("SELECT faiss_id FROM tombstones ORDER BY faiss_id").fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def clear_tombstones(self, faiss_ids: Iterable[int]):
+        """Forgets tombstones whose vectors are gone from disk."""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM tombstones WHERE faiss_id = ?", [(int(i),) for i in faiss_ids])
+
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, filename, content_type, upload_time, chunk_count FROM documents WHERE id = ?",
+                (str(doc_id),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def has_filename(self, filename: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM documents WHERE filename = ?", (filename,)).fetchone() is not None
+
+    def get_chunks(self, faiss_ids: List[int]) -> Dict[int, Dict]:
+        """Resolves FAISS ids to metadata dicts shaped like `create_metadata` output plus 'text'."""
+        if not faiss_ids:
+            return {}
+        rows = []
+        with self.lock:
+            for batch in _batches([int(i) for i in faiss_ids]):
+                rows.extend(self.conn.execute(
+                    f"""SELECT c.faiss_id, c.doc_id, c.chunk_id, c.page, c.timestamp, c.text,
+                               d.filename, d.content_type, d.upload_time
+                        FROM chunks c JOIN documents d ON d.id = c.doc_id
+                        WHERE c.faiss_id IN ({','.join('?' * len(batch))})""",
+                    batch
+                ))
+
+        return {
+            row["faiss_id"]: {
+                "faiss_id": row["faiss_id"],
+                "id": row["doc_id"],
+                "filename": row["filename"],
+                "content_type": row["content_type"],
+                "page": row["page"],
+                "timestamp": row["timestamp"],
+                "chunk_id": row["chunk_id"],
+                "upload_time": row["upload_time"],
+                "text": row["text"],
+            }
+            for row in rows
+        }
+
+    def filter_ids(self, filters: Dict) -> np.ndarray:
+        """
+        Sorted FAISS ids of the chunks whose document matches every filter in `filters`
+        (keys from DOCUMENT_FILTERS; None values are ignored).
+        """
+        conditions, params = [], []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in DOCUMENT_FILTERS:
+                raise ValueError(f"Unknown filter '{name}', expected one of {tuple(DOCUMENT_FILTERS)}")
+            conditions.append(DOCUMENT_FILTERS[name])
+            params.append(_upload_time_param(value) if name.startswith("uploaded_") else str(value))
+
+        where = " AND ".join(conditions) or "1"
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT c.faiss_id FROM documents d JOIN chunks c ON c.doc_id = d.id WHERE {where} ORDER BY c.faiss_id",
+                params
+            ).fetchall()
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+    def set_content_hash(self, doc_id: str, content_hash: str):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE documents SET content_hash = ? WHERE id = ?", (content_hash, str(doc_id)))
+
+    def find_by_hash(self, content_hash: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, filename, content_type, upload_time, chunk_count FROM documents WHERE content_hash = ?",
+                (content_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_documents(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, filename, content_type, upload_time, chunk_count FROM documents "
+                "ORDER BY rowid LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_documents(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def count_chunks(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
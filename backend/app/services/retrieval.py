@@ -1,28 +1,102 @@
+import asyncio
 from app.services.embeddings import embeddings_service
 from app.services.vector_store import VectorStore
 from app.models import Citation
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import timed
+from typing import Dict, List
 
 class RetrievalService:
-    def retrieve(self, query: str, k: int = 3):
+    def __init__(self):
+        # Keyed on the index version too, so any add to the store invalidates stale results
+        self.result_cache = TTLCache(settings.RETRIEVAL_CACHE_SIZE, settings.RETRIEVAL_CACHE_TTL)
+
+    def _cache_key(self, query, k, nprobe, ef_search, filters, version=None):
+        filter_key = tuple(sorted((name, str(value)) for name, value in (filters or {}).items() if value is not None))
+        return (query, k, nprobe, ef_search, filter_key, VectorStore.version if version is None else version)
+
+    @timed("retrieve")
+    def retrieve(self, query: str, k: int = 3, nprobe: int = None, ef_search: int = None, filters: Dict = None):
+        query = query.strip()
+        cache_key = self._cache_key(query, k, nprobe, ef_search, filters)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         # Embed query
-        query_embedding = embeddings_service.encode_text([query])[0]
-        
+        query_embedding = embeddings_service.encode_query(query)
+        return self._search(cache_key, query_embedding, k, nprobe, ef_search, filters)
+
+    @timed("retrieve")
+    async def aretrieve(self, query: str, k: int = 3, nprobe: int = None, ef_search: int = None, filters: Dict = None):
+        """retrieve() for the event loop: the query joins a cross-request embedding micro-batch."""
+        query = query.strip()
+        cache_key = self._cache_key(query, k, nprobe, ef_search, filters)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        query_embedding = await embeddings_service.encode_query_async(query)
+        return await asyncio.to_thread(self._search, cache_key, query_embedding, k, nprobe, ef_search, filters)
+
+    @timed("retrieve")
+    def retrieve_batch(self, queries: List[str], k: int = 3, nprobe: int = None, ef_search: int = None,
+                       filters: Dict = None):
+        """
+        retrieve() for many queries: cache misses are embedded with one encode call and
+        searched with one matrix search. Returns one list of docs per query, in order.
+        """
+        queries = [query.strip() for query in queries]
+        version = VectorStore.version
+        keys = {query: self._cache_key(query, k, nprobe, ef_search, filters, version) for query in queries}
+        results = [self.result_cache.get(keys[query]) for query in queries]
+
+        misses = list(dict.fromkeys(query for query, cached in zip(queries, results) if cached is None))
+        if misses:
+            embeddings = embeddings_service.encode_text(misses)
+            found = VectorStore.search_batch(embeddings, k, nprobe=nprobe, ef_search=ef_search, filters=filters)
+            fresh = {}
+            for query, hits in zip(misses, found):
+                fresh[query] = self._format(hits)
+                self.result_cache.put(keys[query], fresh[query])
+            results = [cached if cached is not None else fresh[query] for query, cached in zip(queries, results)]
+
+        return [list(docs) for docs in results]
+
+    def _search(self, cache_key, query_embedding, k, nprobe, ef_search, filters=None):
         # Search Vector Store
-        results = VectorStore.search(query_embedding, k)
-        
+        results = VectorStore.search(query_embedding, k, nprobe=nprobe, ef_search=ef_search, filters=filters)
+        retrieved_docs = self._format(results)
+        self.result_cache.put(cache_key, retrieved_docs)
+        return list(retrieved_docs)
+
+    def _format(self, results):
         # Format results
         retrieved_docs = []
         for metadata, score in results:
-            # Filter somewhat irrelevant results (L2 distance > 1.2 is usually quite far)
-            if score < 1.2:
+            # Filter somewhat irrelevant results; the cutoff depends on the metric
+            if VectorStore.is_relevant(score):
                 retrieved_docs.append({
                     "content": metadata.get('text', ''),
                     "source": metadata.get('filename'),
                     "page": metadata.get('page'),
                     "timestamp": metadata.get('timestamp'),
-                    "score": score
+                    "score": score,
+                    "doc_id": metadata.get('id'), # With chunk_id, lets adjacent chunks be merged in the prompt
+                    "chunk_id": metadata.get('chunk_id'),
+                    "faiss_id": metadata.get('faiss_id') # Never reused, so it identifies this exact chunk
                 })
             
         return retrieved_docs
 
+    def batching_stats(self):
+        return embeddings_service.batcher.stats()
+
+    def cache_stats(self):
+        return {
+            "query_embeddings": embeddings_service.query_cache.stats(),
+            "retrieval_results": self.result_cache.stats(),
+        }
+
 retrieval_service = RetrievalService()
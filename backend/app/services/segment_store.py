@@ -0,0 +1,357 @@
+import io
+import json
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.file_lock import FileLock
+
+MANIFEST_NAME = "manifest.json"
+MERGE_FLOOR_ROWS = 1024 # Segments smaller than this all count as the smallest size tier
+COPY_BLOCK_ROWS = 65_536 # Rows copied at a time when rewriting segments
+
+
+def _atomic_write(path: Path, data: bytes):
+    # Write to a temp file and rename over the target so readers never see a partial file
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SegmentStore:
+    """
+    Append-only on-disk layout for the vector store.
+
+    Every upload is written as an immutable segment of vectors and their FAISS ids, then
+    recorded in a small JSON manifest. The manifest is the commit point: a segment that is
+    not listed in it is ignored on load and removed as garbage. Ids are stable (the manifest
+    hands out `next_id`) and increase along the segment list, so dropping deleted rows never
+    renumbers the rest. Chunk metadata lives in the MetadataStore, keyed by FAISS id.
+
+    Several processes may share the directory. Every manifest change happens inside
+    `writing()`, which holds a file lock and first re-reads the manifest, so writers in
+    different processes take turns and never hand out the same ids. Compactions and index
+    rebuilds additionally hold `maintenance_lock`, so only one process rewrites segments at a
+    time. Readers take no lock; they poll `refresh()` and see the `generation` number change.
+    """
+
+    def __init__(self, directory: Path, merge_factor: int = 8):
+        self.directory = Path(directory)
+        self.merge_factor = max(2, merge_factor) # Similar-sized segments merged together
+        self.lock = threading.Lock()
+        self.file_lock = FileLock(self.directory / "write.lock")
+        self.maintenance_lock = FileLock(self.directory / "maintenance.lock")
+        self.manifest = {"generation": 0, "next_segment": 1, "next_id": 0, "segments": [], "snapshot": None}
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST_NAME
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    @property
+    def next_id(self) -> int:
+        return self.manifest["next_id"]
+
+    @property
+    def generation(self) -> int:
+        return self.manifest["generation"]
+
+    @property
+    def snapshot(self) -> Optional[Dict]:
+        """The published index file covering ids below its `next_id`, if any."""
+        return self.manifest.get("snapshot")
+
+    def snapshot_path(self, name: str) -> Path:
+        return self.directory / name
+
+    def _vectors_path(self, name: str) -> Path:
+        return self.directory / f"{name}.npy"
+
+    def _ids_path(self, name: str) -> Path:
+        return self.directory / f"{name}.ids.npy"
+
+    def _legacy_meta_path(self, name: str) -> Path:
+        # Segments used to carry a pickled metadata list alongside the vectors
+        return self.directory / f"{name}.meta.pkl"
+
+    def _write_manifest(self):
+        self.manifest["generation"] += 1
+        _atomic_write(self.manifest_path, json.dumps(self.manifest, indent=2).encode("utf-8"))
+
+    def _next_segment_name(self) -> str:
+        name = f"seg-{self.manifest['next_segment']:08d}"
+        self.manifest["next_segment"] += 1
+        return name
+
+    def _write_array(self, path: Path, array: np.ndarray):
+        buffer = io.BytesIO()
+        np.save(buffer, array)
+        _atomic_write(path, buffer.getvalue())
+
+    def _write_segment(self, name: str, ids: np.ndarray, vectors: np.ndarray) -> Dict:
+        self._write_array(self._ids_path(name), ids.astype("int64"))
+        self._write_array(self._vectors_path(name), vectors)
+        segment = {"name": name, "count": int(vectors.shape[0])}
+        if len(ids):
+            segment["max_id"] = int(ids[-1]) # Lets readers skip segments they already have
+        return segment
+
+    def _read_ids(self, name: str) -> np.ndarray:
+        return np.load(self._ids_path(name))
+
+    def _read_legacy_metadata(self, name: str) -> Optional[List[Dict]]:
+        path = self._legacy_meta_path(name)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def _remove_segment_files(self, name: str):
+        for path in (self._vectors_path(name), self._ids_path(name), self._legacy_meta_path(name)):
+            if path.exists():
+                os.remove(path)
+
+    def refresh(self) -> bool:
+        """Re-reads the manifest if another process (or thread) changed it; returns whether it did."""
+        if not self.exists():
+            return False
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        with self.lock:
+            # The read above is unlocked: a write from this process may have landed since, so never step back
+            if manifest["generation"] <= self.manifest["generation"]:
+                return False
+            manifest.setdefault("snapshot", None)
+            self.manifest = manifest
+            return True
+
+    @contextmanager
+    def writing(self):
+        """Holds the cross-process write lock over an up-to-date manifest. Re-entrant."""
+        with self.file_lock:
+            self.refresh()
+            yield
+
+    def open(self):
+        """Reads the manifest and removes anything it doesn't reference."""
+        with self.writing():
+            # A compaction in another process may have files in flight that aren't listed yet
+            if self.maintenance_lock.acquire(blocking=False):
+                try:
+                    self._collect_garbage()
+                finally:
+                    self.maintenance_lock.release()
+            self._migrate_ids()
+
+    def _migrate_ids(self):
+        # Segments written before stable ids were keyed by position across segments
+        if "next_id" in self.manifest:
+            return
+        position = 0
+        for segment in self.manifest["segments"]:
+            ids_path = self._ids_path(segment["name"])
+            if not ids_path.exists():
+                self._write_array(ids_path, np.arange(position, position + segment["count"], dtype="int64"))
+            position += segment["count"]
+        self.manifest["next_id"] = position
+        self._write_manifest()
+
+    def legacy_metadata(self) -> Iterator[Tuple[int, List[Dict]]]:
+        """Yields (first_id, metas) for segments that predate the MetadataStore."""
+        with self.lock:
+            segments = list(self.manifest["segments"])
+
+        for segment in segments:
+            metas = self._read_legacy_metadata(segment["name"])
+            if metas is not None:
+                yield int(self._read_ids(segment["name"])[0]), metas
+
+    def discard_legacy_metadata(self):
+        for path in self.directory.glob("seg-*.meta.pkl"):
+            os.remove(path)
+
+    def _collect_garbage(self):
+        # Drop segment files left behind by a crashed write or an interrupted compaction
+        live = {segment["name"] for segment in self.manifest["segments"]}
+        for path in self.directory.glob("seg-*"):
+            name = path.name.split(".", 1)[0]
+            if name not in live or path.name.endswith(".tmp"):
+                os.remove(path)
+        # Superseded index snapshots, and the per-type ones from before the manifest tracked them
+        snapshot = self.snapshot["name"] if self.snapshot else None
+        for path in [*self.directory.glob("index-*.faiss*"), *self.directory.glob("ann-*.faiss*")]:
+            if path.name != snapshot:
+                self._remove_file(path)
+
+    @staticmethod
+    def _remove_file(path: Path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except PermissionError:
+            pass # Still memory-mapped by a reader on Windows; collected on a later open
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray):
+        """Persists only the new rows; cost is independent of corpus size. `ids` must start at `next_id`."""
+        with self.writing(), self.lock:
+            segment = self._write_segment(self._next_segment_name(), ids, vectors)
+            self.manifest["segments"].append(segment)
+            self.manifest["next_id"] = max(self.manifest["next_id"], int(ids.max()) + 1)
+            self._write_manifest()
+
+    def touch(self):
+        """Bumps the generation so other processes re-read state kept outside the segments (deletes)."""
+        with self.writing(), self.lock:
+            self._write_manifest()
+
+    def set_snapshot(self, snapshot: Dict):
+        """Publishes a new index snapshot and removes the one it supersedes."""
+        with self.writing(), self.lock:
+            previous = self.snapshot
+            self.manifest["snapshot"] = snapshot
+            self._write_manifest()
+        # Readers that already mapped the old file keep their mapping until they swap
+        if previous and previous["name"] != snapshot["name"]:
+            self._remove_file(self.snapshot_path(previous["name"]))
+
+    def segment_count(self) -> int:
+        return len(self.manifest["segments"])
+
+    def read_rows(self, min_id: int = 0, stop_id: Optional[int] = None):
+        """
+        Returns (ids, vectors) of the committed rows with `min_id` <= id < `stop_id`, in id order.
+        Without the write or maintenance lock, a compaction may remove a listed segment
+        mid-read; that raises FileNotFoundError and the caller retries after `refresh()`.
+        """
+        with self.lock:
+            segments = list(self.manifest["segments"])
+
+        id_parts, vector_parts = [], []
+        for segment in segments:
+            if segment.get("max_id", min_id) < min_id:
+                continue
+            ids = self._read_ids(segment["name"])
+            begin = int(np.searchsorted(ids, min_id))
+            end = len(ids) if stop_id is None else int(np.searchsorted(ids, stop_id))
+            if begin >= end:
+                continue
+            vectors = np.load(self._vectors_path(segment["name"]), mmap_mode="r")
+            id_parts.append(ids[begin:end])
+            vector_parts.append(np.array(vectors[begin:end]))
+
+        if not vector_parts:
+            return np.empty(0, dtype="int64"), np.empty((0, 0), dtype="float32")
+        return np.concatenate(id_parts), np.concatenate(vector_parts)
+
+    def read_vectors(self, limit: int) -> np.ndarray:
+        """Returns the first `limit` committed vectors, in row order."""
+        return self.read_rows()[1][:limit]
+
+    def merge_runs(self) -> List[List[Dict]]:
+        """
+        Runs of adjacent segments due for merging: at least `merge_factor` in a row whose
+        sizes fall in the same power-of-`merge_factor` tier. Merging a run moves it up a
+        tier, so each row is rewritten about log(corpus) times rather than on every merge.
+        """
+        with self.lock:
+            segments = list(self.manifest["segments"])
+
+        def tier(segment: Dict) -> int:
+            return int(np.log(max(segment["count"], MERGE_FLOOR_ROWS) / MERGE_FLOOR_ROWS) // np.log(self.merge_factor))
+
+        runs, run = [], []
+        for segment in segments:
+            if run and tier(segment) != tier(run[0]):
+                if len(run) >= self.merge_factor:
+                    runs.append(run)
+                run = []
+            run.append(segment)
+        if len(run) >= self.merge_factor:
+            runs.append(run)
+        return runs
+
+    def compact(self, drop_ids: Optional[np.ndarray] = None) -> bool:
+        """
+        Merges runs of similar-sized segments (see `merge_runs`) until none is left. With
+        `drop_ids`, instead rewrites each segment holding any of those ids without them.
+        New appends, from any process, may continue while this runs. Returns False without
+        doing anything if another process is already compacting or rebuilding.
+        """
+        if not self.maintenance_lock.acquire(blocking=False):
+            return False
+        try:
+            self.refresh()
+            if drop_ids is not None:
+                with self.lock:
+                    segments = list(self.manifest["segments"])
+                for segment in segments:
+                    if np.isin(self._read_ids(segment["name"]), drop_ids).any():
+                        self._compact([segment], drop_ids)
+            else:
+                runs = self.merge_runs()
+                while runs:
+                    self._compact(runs[0])
+                    runs = self.merge_runs()
+            return True
+        finally:
+            self.maintenance_lock.release()
+
+    def _compact(self, to_merge: List[Dict], drop_ids: Optional[np.ndarray] = None):
+        """Writes `to_merge` (adjacent segments) as one, without `drop_ids`, and swaps it in for them."""
+        with self.writing(), self.lock:
+            merged_name = self._next_segment_name()
+            self._write_manifest() # Reserve the name so no other process reuses it
+
+        # Only ids are held in memory; vectors are copied block by block into a memory-mapped output
+        ids, keeps = [], []
+        for segment in to_merge:
+            segment_ids = self._read_ids(segment["name"])
+            keep = ~np.isin(segment_ids, drop_ids) if drop_ids is not None else np.ones(len(segment_ids), dtype=bool)
+            ids.append(segment_ids[keep])
+            keeps.append(keep)
+        ids = np.concatenate(ids)
+
+        merged = {"name": merged_name, "count": len(ids)}
+        if len(ids):
+            merged["max_id"] = int(ids[-1])
+            self._write_array(self._ids_path(merged_name), ids)
+            self._stream_vectors(self._vectors_path(merged_name), to_merge, keeps, len(ids))
+
+        with self.writing(), self.lock:
+            # Appends and other merges only add segments after these, so the run is still contiguous
+            names = [segment["name"] for segment in to_merge]
+            segments = self.manifest["segments"]
+            first = next(i for i, segment in enumerate(segments) if segment["name"] == names[0])
+            segments[first:first + len(names)] = [merged] if merged["count"] else []
+            self._write_manifest()
+            for segment in to_merge:
+                self._remove_segment_files(segment["name"])
+
+    def _stream_vectors(self, path: Path, segments: List[Dict], keeps: List[np.ndarray], count: int):
+        tmp_path = path.with_name(path.name + ".tmp")
+        out, position = None, 0
+        for segment, keep in zip(segments, keeps):
+            vectors = np.load(self._vectors_path(segment["name"]), mmap_mode="r")
+            if out is None:
+                out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=vectors.dtype, shape=(count, vectors.shape[1]))
+            for begin in range(0, len(vectors), COPY_BLOCK_ROWS):
+                block = vectors[begin:begin + COPY_BLOCK_ROWS][keep[begin:begin + COPY_BLOCK_ROWS]]
+                out[position:position + len(block)] = block
+                position += len(block)
+            del vectors
+        out.flush()
+        del out
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
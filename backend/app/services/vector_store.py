@@ -1,61 +1,581 @@
 import faiss
+import logging
 import numpy as np
 import pickle
 import os
-from typing import List, Dict, Tuple
+import threading
+import time
+import uuid
+from typing import Callable, List, Dict, Tuple, Optional
 from app.config import settings
+from app.services.segment_store import SegmentStore
+from app.services.metadata_store import MetadataStore
+from app.services.document_index import DocumentIndex, section_sums
+from app.services.ann_index import (
+    build_index, train_and_fill, index_type_of, search_params, id_selector, flat_index, requires_training
+)
+from app.utils.metrics import registry, timed
+from app.utils.rwlock import ReadWriteLock
+
+logger = logging.getLogger(__name__)
 
 class VectorStoreService:
+    """
+    Searchable vectors in two tiers: `index`, the snapshot published by the last rebuild
+    (memory-mapped, so every worker process shares one copy through the page cache), and
+    `delta`, a small private flat index of the rows committed since. Searches query both.
+
+    Any process may write; the segment store's file lock takes writers in turn. The other
+    processes see the manifest generation change within INDEX_RELOAD_INTERVAL and catch up:
+    new rows go into their delta, a newly published snapshot is swapped in.
+
+    `documents` is a coarse index of per-document section centroids, kept in step with every
+    add and delete. With TWO_LEVEL_TOP_DOCUMENTS set, a query first picks that many documents
+    from it and then searches only their chunks.
+    """
+
     def __init__(self):
-        self.index = None
-        self.metadata = [] # List of dicts, index-aligned with FAISS
+        self.index = None # Published snapshot; holds the ids below base_next_id
+        self.delta = None # Rows committed after the snapshot
+        self.base_next_id = 0
         self.dimension = 384 # Dimension for all-MiniLM-L6-v2
-        
+        self.segments = SegmentStore(settings.FAISS_INDEX_DIR, settings.SEGMENT_COMPACTION_THRESHOLD)
+        self.metadata = MetadataStore(settings.METADATA_DIR / "metadata.db") # Keyed by FAISS id
+        self.documents = DocumentIndex(self.dimension)
+        self.lock = threading.RLock() # Guards index mutation and the index swap
+        self.write_lock = threading.Lock() # Serialises this process's writers and reloads
+        self.search_lock = ReadWriteLock() # Searches read the tiers while appends grow the delta in place
+        self._compaction_thread = None
+        self._rebuild_thread = None
+        self._reload_thread = None
+        self._snapshot_name = None
+        self._generation = -1 # Manifest generation the tiers reflect
+        self._ann_trained_size = 0 # Rows when the current ANN index was built
+        self.next_id = 0 # Ids below this are searchable
+        self.tombstones = np.empty(0, dtype='int64') # Deleted ids whose vectors are still in the index
+        self._live_selector = None # Excludes tombstones from every search
+        self.version = 0 # Bumped on every change to searchable contents; used to invalidate caches
+        self.delete_listeners: List[Callable[[List[str]], None]] = [] # Called with the doc ids whose chunks this process deleted
+
     def create_index(self):
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.metadata = []
-        
+        # Always start flat; an ANN index is trained in the background once the corpus is large enough.
+        # Ids are stable FAISS ids rather than positions, so deletes never renumber anything.
+        self.index = faiss.IndexIDMap2(self._build_base(0, trained=False))
+        self.delta = faiss.IndexIDMap2(self._build_base(0, trained=False))
+        self.base_next_id = 0
+        self._snapshot_name = None
+        self._ann_trained_size = 0
+
+    @property
+    def ntotal(self) -> int:
+        if self.index is None:
+            return 0
+        return self.index.ntotal + self.delta.ntotal
+
+    @property
+    def _untrained_storage(self) -> str:
+        # fp16 needs no training, so it applies from the first vector
+        return "fp16" if settings.VECTOR_STORAGE == "fp16" else "float32"
+
+    def _build_base(self, n_vectors: int, trained: bool) -> faiss.Index:
+        """The configured index when `trained`, else the flat one used until there is enough data to train it."""
+        if trained:
+            return build_index(
+                settings.INDEX_TYPE, self.dimension, n_vectors,
+                nlist=settings.IVF_NLIST, pq_m=settings.PQ_M, hnsw_m=settings.HNSW_M,
+                storage=settings.VECTOR_STORAGE, metric=settings.VECTOR_METRIC
+            )
+        return build_index("flat", self.dimension, n_vectors, storage=self._untrained_storage, metric=settings.VECTOR_METRIC)
+
+    def _config_key(self, trained: bool) -> str:
+        # Recorded with each snapshot, so a changed configuration never loads a stale one
+        if trained:
+            return f"{settings.INDEX_TYPE}/{settings.VECTOR_STORAGE}/{settings.VECTOR_METRIC}"
+        return f"flat/{self._untrained_storage}/{settings.VECTOR_METRIC}"
+
+    @property
+    def _needs_training(self) -> bool:
+        return requires_training(settings.INDEX_TYPE, settings.VECTOR_STORAGE)
+
+    def _prepare(self, vectors) -> np.ndarray:
+        """
+        Vectors as the index takes them: one contiguous float32 array, unit length under
+        the cosine metric. Segments keep the model's raw vectors, so the metric can change
+        without re-embedding anything.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        if settings.VECTOR_METRIC == "cosine":
+            vectors = vectors.copy() # normalize_L2 works in place; never touch the caller's array
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def is_relevant(self, score: float) -> bool:
+        # L2 scores are distances (lower is closer); cosine scores are similarities (higher is closer)
+        if settings.VECTOR_METRIC == "cosine":
+            return score >= settings.COSINE_MIN_SIMILARITY
+        return score < settings.L2_MAX_DISTANCE
+
     def load_index(self):
+        self.create_index()
+
+        with self.write_lock, self.segments.writing():
+            if self.segments.exists():
+                self.segments.open()
+                for first_id, legacy_metas in self.segments.legacy_metadata():
+                    self.metadata.add_chunks(first_id, legacy_metas)
+                self.segments.discard_legacy_metadata()
+            else:
+                self._migrate_legacy_index()
+
+            # Metadata is committed before its vectors, so rows past the last segment are orphans.
+            # Only safe under the write lock: another process may be between the two commits.
+            orphaned = self.metadata.truncate(self.segments.next_id)
+            if orphaned:
+                self.metadata.replace_sections(orphaned, self._document_sections(orphaned))
+            if not self.metadata.has_sections() and self.metadata.count_chunks():
+                self._backfill_sections()
+            self.documents.reset()
+            self._sync(force=True)
+
+        self._maybe_rebuild()
+        self._maybe_purge()
+        self._start_reloader()
+
+    def _migrate_legacy_index(self):
+        # Older installs stored one monolithic index.faiss + metadata.pkl pair
         index_path = settings.FAISS_INDEX_DIR / "index.faiss"
         meta_path = settings.FAISS_INDEX_DIR / "metadata.pkl"
-        
+
         if os.path.exists(index_path) and os.path.exists(meta_path):
-            self.index = faiss.read_index(str(index_path))
+            legacy_index = faiss.read_index(str(index_path))
             with open(meta_path, "rb") as f:
-                self.metadata = pickle.load(f)
+                metas = pickle.load(f)
+            vectors = legacy_index.reconstruct_n(0, legacy_index.ntotal)
+            ids = np.arange(len(vectors), dtype='int64')
+            self.metadata.add_chunks(0, metas)
+            self.segments.append(ids, vectors)
+            os.remove(index_path)
+            os.remove(meta_path)
+
+    def _document_sections(self, doc_ids, exclude: np.ndarray = None) -> Dict:
+        """Section sums of `doc_ids` recomputed from their chunks on disk, leaving out `exclude`."""
+        faiss_ids, owners, chunk_ids = self.metadata.chunk_positions(doc_ids)
+        if exclude is not None:
+            keep = ~np.isin(faiss_ids, exclude)
+            faiss_ids, owners, chunk_ids = faiss_ids[keep], [o for o, k in zip(owners, keep) if k], chunk_ids[keep]
+        if len(faiss_ids) == 0:
+            return {}
+        row_ids, vectors = self.segments.read_rows(int(faiss_ids[0]), int(faiss_ids[-1]) + 1)
+        return section_sums(owners, chunk_ids, vectors[np.searchsorted(row_ids, faiss_ids)], settings.DOCUMENT_SECTION_CHUNKS)
+
+    def _backfill_sections(self, step: int = 100_000):
+        # Indexes written before the document level existed; section sums add up across id ranges
+        for start in range(0, self.segments.next_id, step):
+            faiss_ids, owners, chunk_ids = self.metadata.chunk_positions(min_id=start, stop_id=start + step)
+            if len(faiss_ids):
+                row_ids, vectors = self.segments.read_rows(start, start + step)
+                self.metadata.add_sections(section_sums(
+                    owners, chunk_ids, vectors[np.searchsorted(row_ids, faiss_ids)], settings.DOCUMENT_SECTION_CHUNKS
+                ))
+
+    def _usable_snapshot(self) -> Optional[Dict]:
+        snapshot = self.segments.snapshot
+        if snapshot and snapshot["config"] in (self._config_key(True), self._config_key(False)):
+            return snapshot
+        return None
+
+    def _open_snapshot(self, snapshot: Dict) -> faiss.Index:
+        path = str(self.segments.snapshot_path(snapshot["name"]))
+        if not settings.INDEX_MMAP:
+            return faiss.read_index(path)
+        # IVF maps its inverted lists; the other types map their flat code arrays
+        flag = faiss.IO_FLAG_MMAP if snapshot["config"].startswith("ivf") else faiss.IO_FLAG_MMAP_IFC
+        return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+
+    def _sync(self, force: bool = False) -> bool:
+        """
+        Catches up with the files on disk: maps a newly published snapshot and loads the rows
+        committed since into the delta. Call with write_lock held. Returns whether anything changed.
+        """
+        # Tombstones before the manifest: a purge clears them only after publishing the snapshot
+        # without their rows, so cleared tombstones are never paired with an older snapshot
+        tombstones = self.metadata.tombstone_ids()
+        self.segments.refresh()
+        with self.segments.lock:
+            generation, next_id, snapshot = self.segments.generation, self.segments.next_id, self._usable_snapshot()
+        if generation == self._generation and not force:
+            return False
+
+        name = snapshot["name"] if snapshot else None
+        if force or name != self._snapshot_name:
+            if snapshot:
+                index, base_next_id = self._open_snapshot(snapshot), snapshot["next_id"]
+            else:
+                index, base_next_id = faiss.IndexIDMap2(self._build_base(0, trained=False)), 0
+            # Built privately and swapped in whole; searches already under way finish on the old tiers
+            delta = faiss.IndexIDMap2(self._build_base(0, trained=False))
+            ids, vectors = self.segments.read_rows(min_id=base_next_id, stop_id=next_id)
+            if len(ids):
+                delta.add_with_ids(self._prepare(vectors), ids)
+            with self.lock:
+                self.index, self.delta, self.base_next_id = index, delta, base_next_id
+                self._snapshot_name = name
+                self._ann_trained_size = snapshot["trained_size"] if snapshot else 0
         else:
-            self.create_index()
-            
-    def save_index(self):
-        if self.index:
-            faiss.write_index(self.index, str(settings.FAISS_INDEX_DIR / "index.faiss"))
-            with open(settings.FAISS_INDEX_DIR / "metadata.pkl", "wb") as f:
-                pickle.dump(self.metadata, f)
-                
-    def add_texts(self, embeddings: List[List[float]], metas: List[Dict]):
+            ids, vectors = self.segments.read_rows(min_id=self.next_id, stop_id=next_id)
+            if len(ids):
+                prepared = self._prepare(vectors)
+                with self.lock, self.search_lock.writing():
+                    self.delta.add_with_ids(prepared, ids)
+
+        with self.lock:
+            self.next_id = next_id
+            self._set_tombstones(tombstones)
+            self._generation = generation
+            self.version += 1
+        self.documents.refresh(self.metadata)
+        return True
+
+    def _start_reloader(self):
+        if settings.INDEX_RELOAD_INTERVAL <= 0 or (self._reload_thread and self._reload_thread.is_alive()):
+            return
+        self._reload_thread = threading.Thread(target=self._reload_loop, name="index-reload", daemon=True)
+        self._reload_thread.start()
+
+    def _reload_loop(self):
+        # Picks up rows, deletes and snapshots committed by other worker processes
+        while True:
+            time.sleep(settings.INDEX_RELOAD_INTERVAL)
+            try:
+                with self.write_lock:
+                    changed = self._sync()
+            except Exception:
+                # E.g. a compaction removed a segment mid-read; the next round starts over
+                logger.warning("Index reload failed; retrying", exc_info=True)
+                continue
+            if changed:
+                self._maybe_rebuild()
+                self._maybe_purge()
+
+    @timed("index_write")
+    def add_texts(self, embeddings: np.ndarray, metas: List[Dict]) -> np.ndarray:
+        """Appends the vectors (one row per chunk) and their metadata; returns the FAISS ids they were assigned."""
         if self.index is None:
             self.create_index()
-            
-        if not embeddings:
+
+        if len(embeddings) == 0:
+            return np.empty(0, dtype='int64')
+
+        vectors = np.ascontiguousarray(embeddings, dtype='float32') # No copy when already float32
+        with self.write_lock, self.segments.writing():
+            # Other processes may have committed since our last reload; ids must continue from theirs
+            self._sync()
+            ids = np.arange(self.segments.next_id, self.segments.next_id + len(vectors), dtype='int64')
+            sections = section_sums(
+                [meta.get('id') for meta in metas], [meta.get('chunk_id') for meta in metas],
+                vectors, settings.DOCUMENT_SECTION_CHUNKS
+            )
+            # Persist first so a crash never leaves the in-memory index ahead of disk.
+            # Metadata goes before the segment: the manifest write is the commit point.
+            self.metadata.add_chunks(int(ids[0]), metas, sections)
+            self.segments.append(ids, vectors)
+            prepared = self._prepare(vectors) # Outside the locks, so searches wait only for the append itself
+            with self.lock:
+                with self.search_lock.writing():
+                    self.delta.add_with_ids(prepared, ids)
+                self.next_id = int(ids[-1]) + 1
+                self._generation = self.segments.generation
+                self.version += 1
+            self.documents.refresh(self.metadata)
+        self._maybe_compact()
+        self._maybe_rebuild()
+        return ids
+
+    def delete_document(self, doc_id: str) -> Optional[int]:
+        """
+        Deletes a document; returns how many chunks it had, or None if it doesn't exist.
+        Takes effect immediately via tombstones; the vectors are reclaimed by a later purge.
+        """
+        ids = self.metadata.chunk_ids(doc_id)
+        if len(ids) == 0:
+            return None
+        self.delete_chunks(ids)
+        return len(ids)
+
+    def delete_chunks(self, ids: np.ndarray):
+        ids = np.unique(np.asarray(ids, dtype='int64'))
+        if len(ids) == 0:
             return
-            
-        vectors = np.array(embeddings).astype('float32')
-        self.index.add(vectors)
-        self.metadata.extend(metas)
-        self.save_index()
-        
-    def search(self, query_embedding: List[float], k: int = 5) -> List[Tuple[Dict, float]]:
-        if self.index is None or self.index.ntotal == 0:
-            return []
-            
-        vector = np.array([query_embedding]).astype('float32')
-        distances, indices = self.index.search(vector, k)
-        
+        with self.write_lock, self.segments.writing():
+            self._sync()
+            # The touched documents' sections are recomputed without these chunks, in the same transaction
+            positions, owners, _ = self.metadata.chunk_positions(min_id=int(ids[0]), stop_id=int(ids[-1]) + 1)
+            touched = {owner for owner, doomed in zip(owners, np.isin(positions, ids)) if doomed}
+            doc_ids = self.metadata.delete_chunks(ids, self._document_sections(touched, exclude=ids))
+            self.segments.touch() # Other processes re-read the tombstones on their next reload
+            with self.lock:
+                self._set_tombstones(np.union1d(self.tombstones, ids))
+                self._generation = self.segments.generation
+                self.version += 1
+            self.documents.refresh(self.metadata)
+        for listener in self.delete_listeners:
+            listener(doc_ids)
+        self._maybe_purge()
+
+    def _set_tombstones(self, tombstones: np.ndarray):
+        self.tombstones = tombstones.astype('int64')
+        if len(self.tombstones):
+            # Keep the inner selector referenced: IDSelectorNot doesn't own it
+            inner = faiss.IDSelectorBatch(self.tombstones)
+            self._live_selector = (faiss.IDSelectorNot(inner), inner)
+        else:
+            self._live_selector = None
+
+    def _maybe_compact(self):
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        if not self.segments.merge_runs():
+            return
+        self._compaction_thread = threading.Thread(target=self.segments.compact, daemon=True)
+        self._compaction_thread.start()
+
+    def _rebuilding(self) -> bool:
+        return bool(self._rebuild_thread and self._rebuild_thread.is_alive())
+
+    def _retrain_due(self) -> bool:
+        if not self._needs_training:
+            return False
+        if self._ann_trained_size:
+            # IVF centroids go stale as the corpus grows, so retrain once it has grown enough
+            return self.ntotal >= self._ann_trained_size * settings.ANN_REBUILD_GROWTH
+        return self.ntotal >= settings.ANN_BUILD_THRESHOLD
+
+    def _purge_due(self) -> bool:
+        # Tombstoned vectors still cost search time and memory; reclaim them past a threshold
+        return bool(len(self.tombstones)) and len(self.tombstones) >= settings.TOMBSTONE_PURGE_RATIO * max(1, self.ntotal)
+
+    def _rebuild_due(self, purge: bool) -> bool:
+        if purge:
+            return self._purge_due()
+        return self._retrain_due() or self.delta.ntotal >= settings.SNAPSHOT_DELTA_ROWS
+
+    def _maybe_rebuild(self):
+        if self._rebuilding() or not self._rebuild_due(purge=False):
+            return
+        self._rebuild_thread = threading.Thread(target=self._rebuild, daemon=True)
+        self._rebuild_thread.start()
+
+    def _maybe_purge(self):
+        if self._rebuilding() or not self._purge_due():
+            return
+        self._rebuild_thread = threading.Thread(target=self._rebuild, kwargs={"purge": True}, daemon=True)
+        self._rebuild_thread.start()
+
+    def _rebuild(self, purge: bool = False):
+        """
+        Builds a new snapshot in the background and publishes it to every process. Trains the
+        configured index when due; otherwise folds the delta into a copy of the current
+        snapshot. With `purge`, first rewrites the segments without the tombstoned rows.
+        Only one process rebuilds at a time.
+        """
+        if not self.segments.maintenance_lock.acquire(blocking=False):
+            return # Another process is compacting or rebuilding; its snapshot reaches us on reload
+        try:
+            with self.write_lock:
+                self._sync()
+            if self._rebuild_due(purge): # Another process may have published one meanwhile
+                self._publish_snapshot(purge)
+            # Deletes may have piled up meanwhile. _maybe_purge would see this thread still
+            # rebuilding and do nothing, so purge here, for as long as each round makes progress.
+            tombstones = None
+            while self._purge_due() and len(self.tombstones) != tombstones:
+                tombstones = len(self.tombstones)
+                self._publish_snapshot(purge=True)
+        finally:
+            self.segments.maintenance_lock.release()
+
+    def _publish_snapshot(self, purge: bool):
+        if purge:
+            dead = self.metadata.tombstone_ids()
+            self.segments.compact(drop_ids=dead)
+
+        self.segments.refresh()
+        with self.segments.lock:
+            next_id, snapshot = self.segments.next_id, self._usable_snapshot()
+
+        if purge or snapshot is None or self._retrain_due():
+            ids, vectors = self.segments.read_rows(stop_id=next_id)
+            trained = self._needs_training and len(ids) >= settings.ANN_BUILD_THRESHOLD
+            base = self._build_base(len(ids), trained)
+            index = train_and_fill(faiss.IndexIDMap2(base), self._prepare(vectors), ids) if len(ids) else faiss.IndexIDMap2(base)
+            if isinstance(base, faiss.IndexIVF):
+                base.make_direct_map() # Lets filtered searches reconstruct a subset's vectors
+            trained_size = len(ids) if trained else 0
+        else:
+            # Nothing to (re)train: fold the rows since the last snapshot into a private copy of it
+            index = faiss.read_index(str(self.segments.snapshot_path(snapshot["name"])))
+            ids, vectors = self.segments.read_rows(min_id=snapshot["next_id"], stop_id=next_id)
+            if len(ids):
+                index.add_with_ids(self._prepare(vectors), ids)
+            trained_size = snapshot["trained_size"]
+        del vectors
+
+        name = f"index-{uuid.uuid4().hex[:12]}.faiss"
+        path = self.segments.snapshot_path(name)
+        tmp_path = path.with_name(name + ".tmp")
+        faiss.write_index(index, str(tmp_path))
+        os.replace(tmp_path, path)
+        del index # Every process, this one included, maps the published file instead
+
+        self.segments.set_snapshot({
+            "name": name,
+            "next_id": next_id,
+            "config": self._config_key(trained_size > 0),
+            "trained_size": trained_size,
+        })
+        if purge:
+            self.metadata.clear_tombstones(dead) # Their rows are in neither the segments nor the snapshot now
+
+        with self.write_lock:
+            self._sync()
+
+    def _tiers(self):
+        with self.lock:
+            return self.index, self.delta, self.base_next_id
+
+    def _merge(self, results: List[Tuple[np.ndarray, np.ndarray]], k: int):
+        """Combines per-tier (distances, ids) into one top-k per query, best first."""
+        if len(results) == 1:
+            return results[0]
+        distances = np.hstack([distances for distances, _ in results])
+        indices = np.hstack([indices for _, indices in results])
+        # Smallest L2 distance or largest inner product first; missing hits (-1) sort last
+        keys = -distances if settings.VECTOR_METRIC == "cosine" else distances
+        order = np.argsort(keys, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+    def _search_tiers(self, tiers, vectors: np.ndarray, k: int, nprobe, ef_search, selector):
         results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1 and idx < len(self.metadata):
-                results.append((self.metadata[idx], float(distances[0][i])))
-                
-        return results
+        for tier in tiers:
+            if tier.ntotal == 0:
+                continue
+            params = search_params(
+                tier,
+                nprobe=nprobe or settings.IVF_NPROBE,
+                ef_search=ef_search or settings.HNSW_EF_SEARCH,
+                selector=selector
+            )
+            with self.search_lock.reading():
+                results.append(tier.search(vectors, k, params=params))
+        return self._merge(results, k)
+
+    def search(self, query_embedding: np.ndarray, k: int = 5,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               filters: Optional[Dict] = None, top_documents: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        return self.search_batch(
+            [query_embedding], k, nprobe=nprobe, ef_search=ef_search, filters=filters, top_documents=top_documents
+        )[0]
+
+    @timed("vector_search")
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5,
+                     nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                     filters: Optional[Dict] = None, top_documents: Optional[int] = None) -> List[List[Tuple[Dict, float]]]:
+        """
+        Searches many queries (one row each) with one matrix search per tier and one metadata
+        lookup. Scores are L2 distances or cosine similarities, per VECTOR_METRIC. `filters`
+        (see MetadataStore.filter_ids) restricts every query to the matching chunks.
+        `top_documents` overrides TWO_LEVEL_TOP_DOCUMENTS (0 = search every chunk).
+        """
+        index, delta, base_next_id = self._tiers()
+        if index is None or index.ntotal + delta.ntotal == 0:
+            return [[] for _ in query_embeddings]
+
+        vectors = self._prepare(query_embeddings)
+        top_documents = settings.TWO_LEVEL_TOP_DOCUMENTS if top_documents is None else top_documents
+        if filters:
+            distances, indices = self._filtered_search(index, delta, base_next_id, vectors, k, nprobe, ef_search, filters)
+        elif top_documents and self.documents.document_count > top_documents:
+            distances, indices = self._two_level_search(index, delta, base_next_id, vectors, k, nprobe, ef_search, top_documents)
+        else:
+            live = self._live_selector # Skips deleted chunks until they are purged
+            distances, indices = self._search_tiers(
+                (index, delta), vectors, k, nprobe, ef_search, live[0] if live else None
+            )
+
+        # Only the hits are resolved, so chunk text is never loaded for the rest of the corpus
+        hits = self.metadata.get_chunks(list({int(idx) for idx in indices.ravel() if idx != -1}))
+
+        all_results = []
+        for row_distances, row_indices in zip(distances, indices):
+            results = []
+            for distance, idx in zip(row_distances, row_indices):
+                if int(idx) in hits:
+                    results.append((hits[int(idx)], float(distance)))
+            all_results.append(results)
+
+        return all_results
+
+    def _filtered_search(self, index, delta, base_next_id: int, vectors: np.ndarray, k: int,
+                         nprobe, ef_search, filters: Dict):
+        ids = self.metadata.filter_ids(filters)
+        return self._subset_search(index, delta, base_next_id, vectors, k, nprobe, ef_search, ids)
+
+    def _two_level_search(self, index, delta, base_next_id: int, vectors: np.ndarray, k: int,
+                          nprobe, ef_search, top_documents: int):
+        # Each query gets its own candidate documents, so the chunk-level searches run one query at a time
+        distances = np.full((len(vectors), k), -np.inf if settings.VECTOR_METRIC == "cosine" else np.inf, dtype='float32')
+        indices = np.full((len(vectors), k), -1, dtype='int64')
+        for row, (vector, doc_ids) in enumerate(zip(vectors, self.documents.search(vectors, top_documents))):
+            ids = self.documents.chunk_ids(doc_ids, self.metadata)
+            found_distances, found_indices = self._subset_search(
+                index, delta, base_next_id, vector[None], k, nprobe, ef_search, ids
+            )
+            width = found_indices.shape[1]
+            distances[row, :width], indices[row, :width] = found_distances[0], found_indices[0]
+        return distances, indices
+
+    def _subset_search(self, index, delta, base_next_id: int, vectors: np.ndarray, k: int,
+                       nprobe, ef_search, ids: np.ndarray):
+        """Searches only the chunks `ids` (sorted): exactly over their vectors when few, else with an id selector."""
+        ids = ids[ids < self.next_id] # Metadata is committed before its vectors are searchable
+        if len(ids) == 0:
+            return np.empty((len(vectors), 0), dtype='float32'), np.empty((len(vectors), 0), dtype='int64')
+
+        if len(ids) <= settings.FILTER_EXACT_SEARCH_MAX:
+            # Small subsets: exact search over just their vectors, so cost scales with the subset
+            try:
+                split = int(np.searchsorted(ids, base_next_id))
+                subset = flat_index(self.dimension, settings.VECTOR_METRIC)
+                with self.search_lock.reading():
+                    for tier, tier_ids in ((index, ids[:split]), (delta, ids[split:])):
+                        if len(tier_ids):
+                            subset.add(tier.reconstruct_batch(tier_ids))
+                distances, positions = subset.search(vectors, min(k, len(ids)))
+                return distances, np.where(positions == -1, -1, ids[positions])
+            except RuntimeError:
+                pass # Index can't reconstruct (e.g. IVF snapshot without a direct map)
+
+        return self._search_tiers((index, delta), vectors, k, nprobe, ef_search, id_selector(ids))
+
+    def index_info(self) -> Dict:
+        return {
+            "index_type": index_type_of(self.index) if self.index is not None else None,
+            "configured_type": settings.INDEX_TYPE,
+            "storage": settings.VECTOR_STORAGE,
+            "metric": settings.VECTOR_METRIC,
+            "ntotal": self.ntotal,
+            "delta": self.delta.ntotal if self.delta is not None else 0,
+            "snapshot": self._snapshot_name,
+            "generation": self._generation,
+            "building": self._rebuilding(),
+            "tombstones": len(self.tombstones),
+            "documents": self.documents.document_count,
+            "document_sections": self.documents.index.ntotal,
+        }
 
 VectorStore = VectorStoreService()
+
+registry.gauge("evidentia_index_vectors", "Vectors in the index, deleted ones included until purged", lambda: VectorStore.ntotal)
+registry.gauge("evidentia_index_delta_vectors", "Vectors not yet folded into the shared snapshot",
+               lambda: VectorStore.delta.ntotal if VectorStore.delta is not None else 0)
+registry.gauge("evidentia_index_tombstones", "Deleted vectors awaiting purge", lambda: len(VectorStore.tombstones))
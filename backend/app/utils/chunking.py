@@ -1,9 +1,23 @@
-from typing import List
+import re
+from bisect import bisect_right
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+TokenOffsets = Callable[[str], Sequence[Tuple[int, int]]]
+
+_ASCII_WORD = np.array([chr(c).isalnum() or chr(c) == "_" for c in range(128)])
+_ASCII_SPACE = np.array([chr(c).isspace() for c in range(128)])
+_LINE_BREAK = re.compile(r"\n")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+
 
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
     """
     Splits text into chunks of approximately `chunk_size` characters with `overlap`.
     Tries to break at paragraph or sentence boundaries.
+
+    Character-based; ingestion uses `chunk_tokens`. Kept for comparison (benchmarks/chunking.py).
     """
     if not text:
         return []
@@ -13,6 +27,7 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
     text_len = len(text)
     
     while start < text_len:
+        previous_start = start
         end = start + chunk_size
         
         # If we are at the end, just take the rest
@@ -53,6 +68,7 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
         # Ensure we always move forward to prevent infinite loops
         if start <= (break_point - chunk_size): # If overlap is too big relative to move
              start = break_point
+        start = max(start, previous_start + 1)
         
         # Correction to avoid getting stuck if overlap pushes us back too far
         # effectively we want next chunk to start at start + (chunk_size - overlap) relative to previous start? 
@@ -63,3 +79,112 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
         # So ensure `start` > previous `start`.
         
     return [c for c in chunks if c] # Filter empty
+
+
+def simple_token_offsets(text: str) -> np.ndarray:
+    """
+    Approximate tokenizer for when the model's isn't available: runs of word characters and
+    single other non-space characters, like `\\w+|[^\\w\\s]` (non-ASCII counts as a word
+    character). Vectorised, so it is not the bottleneck of `chunk_tokens`.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    ascii_codes = np.minimum(codes, 127)
+    is_word = np.where(codes < 128, _ASCII_WORD[ascii_codes], True)
+    is_space = np.where(codes < 128, _ASCII_SPACE[ascii_codes], False)
+
+    continues_word = np.zeros(len(codes), dtype=bool)
+    continues_word[1:] = is_word[1:] & is_word[:-1]
+    word_goes_on = np.zeros(len(codes), dtype=bool)
+    word_goes_on[:-1] = continues_word[1:]
+
+    starts = np.nonzero(~is_space & ~continues_word)[0]
+    ends = np.nonzero(~is_space & ~word_goes_on)[0] + 1
+    return np.stack([starts, ends], axis=1)
+
+
+def _token_indices(pattern: "re.Pattern", text: str, starts: np.ndarray) -> List[int]:
+    # Index of the first token starting at or after each match end
+    match_ends = np.fromiter((match.end() for match in pattern.finditer(text)), dtype=np.int64)
+    return np.unique(np.searchsorted(starts, match_ends)).tolist()
+
+
+def _last_between(candidates: List[int], low: int, high: int) -> int:
+    # Largest candidate in [low, high], or -1
+    i = bisect_right(candidates, high) - 1
+    return candidates[i] if i >= 0 and candidates[i] >= low else -1
+
+
+def chunk_tokens(text: str, chunk_size: int = 128, overlap: int = 16,
+                 token_offsets: TokenOffsets = simple_token_offsets) -> List[str]:
+    """
+    Splits text into chunks of at most `chunk_size` tokens, each starting about `overlap`
+    tokens before the previous one ended. Breaks at a line break, else a sentence end,
+    else a word boundary, looking no further back than half a chunk for the first two.
+
+    `token_offsets` returns the (start, end) character span of every token; pass the
+    embedding model's tokenizer so no chunk exceeds its window. The text is tokenized and
+    scanned for boundaries once, so cost is linear in its length, and every chunk advances
+    by at least one token.
+    """
+    offsets = np.asarray(token_offsets(text) if text else [], dtype=np.int64).reshape(-1, 2)
+    n = len(offsets)
+    if n == 0:
+        return []
+
+    starts, ends = offsets[:, 0], offsets[:, 1]
+    chunk_size = max(1, chunk_size)
+    overlap = min(max(0, overlap), chunk_size // 2)
+
+    # Candidate chunk ends, as token indices: a chunk [s, e) may stop right before token e
+    lines = _token_indices(_LINE_BREAK, text, starts)
+    sentences = _token_indices(_SENTENCE_END, text, starts)
+    words = (np.nonzero(starts[1:] > ends[:-1])[0] + 1).tolist() # Whitespace before the token
+
+    chunks = []
+    start = 0
+    while start < n:
+        limit = start + chunk_size
+        if limit >= n:
+            end = n
+        else:
+            half = start + chunk_size // 2
+            end = _last_between(lines, half, limit)
+            if end == -1:
+                end = _last_between(sentences, half, limit)
+            if end == -1:
+                end = _last_between(words, start + 1, limit)
+            if end == -1:
+                end = limit # One very long word: cut between tokens
+
+        chunk = text[int(starts[start]):int(ends[end - 1])].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= n:
+            break
+
+        # Back up `overlap` tokens to a word start, but always move forward
+        next_start = end
+        if overlap:
+            next_start = _last_between(words, start + 1, end - overlap)
+            if next_start == -1:
+                next_start = max(start + 1, end - overlap)
+        start = next_start
+
+    return chunks
+
+
+def chunk_stream(blocks: Iterable[str], chunk: Callable[[str], List[str]] = chunk_text,
+                 window_chars: int = 32_000) -> Iterator[str]:
+    """
+    Applies `chunk` to a stream of text blocks (e.g. paragraphs) joined by newlines, without
+    ever joining the whole stream. Blocks are buffered up to about `window_chars`; the last
+    chunk of each window is carried into the next so breaks stay at natural boundaries.
+    """
+    buffer = ""
+    for block in blocks:
+        buffer = f"{buffer}\n{block}" if buffer else block
+        if len(buffer) >= window_chars:
+            chunks = chunk(buffer)
+            yield from chunks[:-1]
+            buffer = chunks[-1] if chunks else ""
+    yield from chunk(buffer)
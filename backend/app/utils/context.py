@@ -0,0 +1,121 @@
+import re
+from typing import Callable, Dict, List, Sequence, Tuple
+
+_WORD = re.compile(r"\w+")
+
+
+def join_overlapping(first: str, second: str, window: int = 4000) -> str:
+    """
+    Joins two consecutive chunks, keeping text they share (the chunker's overlap) once. Only
+    the last `window` characters of `first` are searched.
+    """
+    probe = second[:32]
+    if probe:
+        start = first.find(probe, max(0, len(first) - window))
+        while start != -1:
+            if second.startswith(first[start:]):
+                return first + second[len(first) - start:]
+            start = first.find(probe, start + 1)
+    return f"{first}\n{second}"
+
+
+def _join_timestamps(first: str, second: str) -> str:
+    # "mm:ss-mm:ss" spans of adjacent transcript chunks become one span
+    if first and second and "-" in first and "-" in second:
+        return f"{first.split('-')[0]}-{second.split('-')[-1]}"
+    return first or second
+
+
+def merge_adjacent(docs: Sequence[Dict]) -> List[Dict]:
+    """
+    Merges retrieved chunks that are consecutive in the same document and page into one
+    passage, ranked by its best member. `docs` are in relevance order; so is the result.
+    """
+    passages = []
+    runs: Dict[tuple, List[tuple]] = {}
+    for rank, doc in enumerate(docs):
+        if doc.get("doc_id") is None or doc.get("chunk_id") is None:
+            passages.append((rank, dict(doc)))
+        else:
+            runs.setdefault((doc["doc_id"], doc.get("page")), []).append((doc["chunk_id"], rank, doc))
+
+    for members in runs.values():
+        members.sort(key=lambda member: member[0])
+        run = [members[0]]
+        for member in members[1:] + [None]:
+            if member is not None and member[0] == run[-1][0] + 1:
+                run.append(member)
+                continue
+            best_rank, best = min((rank, doc) for _, rank, doc in run)
+            passage = dict(best, content=run[0][2]["content"], timestamp=run[0][2].get("timestamp"))
+            for _, _, doc in run[1:]:
+                passage["content"] = join_overlapping(passage["content"], doc["content"])
+                passage["timestamp"] = _join_timestamps(passage["timestamp"], doc.get("timestamp"))
+            passages.append((best_rank, passage))
+            run = [member] if member is not None else []
+
+    passages.sort(key=lambda item: item[0])
+    return [passage for _, passage in passages]
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def drop_near_duplicates(passages: Sequence[Dict], threshold: float) -> Tuple[List[Dict], int]:
+    """
+    Drops a passage when at least `threshold` of its word 3-grams already appear in one kept
+    before it (so a passage contained in a better one goes too). Returns (kept, dropped count).
+    """
+    kept, seen = [], []
+    for passage in passages:
+        shingles = _shingles(passage["content"])
+        if any(len(shingles & other) >= threshold * len(shingles) for other in seen):
+            continue
+        kept.append(passage)
+        seen.append(shingles)
+    return kept, len(passages) - len(kept)
+
+
+def build_context(docs: Sequence[Dict], token_offsets: Callable[[str], Sequence], max_tokens: int,
+                  dedup_threshold: float = 0.8, min_passage_tokens: int = 32) -> Tuple[List[Dict], Dict]:
+    """
+    Turns retrieved chunks (relevance order) into prompt passages: adjacent chunks merged,
+    near-duplicates dropped, then passages taken in relevance order until `max_tokens` of
+    passage text (0 = no limit). A passage that doesn't fit is cut to the remaining budget
+    if at least `min_passage_tokens` remain, else skipped. `token_offsets` is the tokenizer's
+    (start, end) span per token, as for chunk_tokens.
+
+    Returns (passages, stats); stats compare the tokens sent with those of the raw chunks.
+    """
+    raw_tokens = sum(len(token_offsets(doc["content"])) for doc in docs)
+    merged = merge_adjacent(docs)
+    passages, duplicates = drop_near_duplicates(merged, dedup_threshold) if dedup_threshold > 0 else (merged, 0)
+
+    kept, used, over_budget = [], 0, 0
+    for passage in passages:
+        offsets = token_offsets(passage["content"])
+        remaining = max_tokens - used if max_tokens else len(offsets)
+        if len(offsets) > remaining:
+            over_budget += 1
+            # With no budget left there is nothing to cut to: offsets[-1] would keep the whole passage
+            if remaining <= 0 or remaining < min_passage_tokens and kept:
+                continue
+            passage = dict(passage, content=passage["content"][:offsets[remaining - 1][1]])
+            offsets = offsets[:remaining]
+        kept.append(passage)
+        used += len(offsets)
+
+    return kept, {
+        "chunks": len(docs),
+        "passages": len(kept),
+        "merged": len(docs) - len(merged),
+        "duplicates": duplicates,
+        "over_budget": over_budget,
+        "tokens": used,
+        "raw_tokens": raw_tokens,
+        "tokens_saved": raw_tokens - used,
+    }
@@ -0,0 +1,29 @@
+import zipfile
+from pathlib import Path
+from typing import Iterator
+from xml.etree import ElementTree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def iter_docx_paragraphs(file_path: Path) -> Iterator[str]:
+    """
+    Yields the text of every paragraph (body and table cells) in document order.
+
+    word/document.xml is parsed incrementally and each paragraph is cleared once read, so
+    memory stays flat however long the document is (python-docx builds the whole tree).
+    """
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        for _, element in ElementTree.iterparse(xml, events=("end",)):
+            if element.tag != W + "p":
+                continue
+            parts = []
+            for node in element.iter():
+                if node.tag == W + "t":
+                    parts.append(node.text or "")
+                elif node.tag == W + "tab":
+                    parts.append("\t")
+                elif node.tag in (W + "br", W + "cr"):
+                    parts.append("\n")
+            yield "".join(parts)
+            element.clear()
@@ -5,6 +5,13 @@ from app.models import DocumentInfo
 def generate_document_id() -> uuid.UUID:
     return uuid.uuid4()
 
+def upload_name(content_hash: str, filename: str) -> str:
+    """
+    Where a file is stored under UPLOAD_DIR, and the name its chunks cite: one directory per
+    content, so different files with the same name never overwrite each other's bytes.
+    """
+    return f"{content_hash[:16]}/{filename}"
+
 def create_metadata(doc_id: str, filename: str, content_type: str, page: int = None, timestamp: str = None, chunk_id: int = 0):
     return {
         "id": str(doc_id),
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, Sequence
+
+# Seconds; spans from sub-millisecond index searches to multi-minute transcriptions
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative on read, Prometheus-style upper bounds)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets + [float("inf")], self.counts):
+                running += count
+                cumulative.append((bound, running))
+            return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+
+def _labels(labels: Dict[str, str], **extra) -> str:
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in pairs.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(pairs, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Registry:
+    """
+    Process-wide metrics, rendered in the Prometheus text format by GET /metrics.
+
+    Histograms and counters are created on first use per (name, labels). Gauges are callbacks
+    read at scrape time, so values like index size cost nothing between scrapes.
+    """
+
+    def __init__(self):
+        self.help: Dict[str, tuple] = {} # name -> (type, help)
+        self.histograms: Dict[tuple, Histogram] = {}
+        self.counters: Dict[tuple, Counter] = {}
+        self.gauges: Dict[str, tuple] = {} # name -> (read, label)
+        self.lock = threading.Lock()
+
+    def _get(self, store: Dict, kind: str, name: str, help: str, labels: Dict, factory):
+        key = (name, tuple(sorted(labels.items())))
+        metric = store.get(key)
+        if metric is None:
+            with self.lock:
+                self.help.setdefault(name, (kind, help))
+                metric = store.setdefault(key, factory())
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> Histogram:
+        return self._get(self.histograms, "histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def counter(self, name: str, help: str, **labels) -> Counter:
+        return self._get(self.counters, "counter", name, help, labels, Counter)
+
+    def gauge(self, name: str, help: str, read: Callable[[], object], label: Optional[str] = None):
+        """`read` returns a number or, with `label`, a {label value: number} dict."""
+        with self.lock:
+            self.help[name] = ("gauge", help)
+            self.gauges[name] = (read, label)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        def header(name):
+            kind, help = self.help[name]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        previous = None
+        for (name, labels), histogram in histograms:
+            if name != previous:
+                header(name)
+                previous = name
+            labels = dict(labels)
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot["buckets"]:
+                lines.append(f"{name}_bucket{_labels(labels, le=_number(bound))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(snapshot['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+        for (name, labels), counter in counters:
+            if name != previous:
+                header(name)
+                previous = name
+            lines.append(f"{name}{_labels(dict(labels))} {_number(counter.value)}")
+
+        for name, (read, label) in gauges:
+            try:
+                value = read()
+            except Exception:
+                continue # A gauge whose source isn't ready yet is left out of this scrape
+            header(name)
+            if label:
+                for key, number in sorted(value.items()):
+                    lines.append(f"{name}{_labels({label: key})} {_number(number)}")
+            else:
+                lines.append(f"{name} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Per-request stage durations, set by collect_stages(); asyncio.to_thread carries it into worker threads
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+def stage_histogram(stage: str) -> Histogram:
+    return registry.histogram("evidentia_stage_seconds", "Wall time per pipeline stage", stage=stage)
+
+
+def _record(stage: str, histogram: Histogram, elapsed: float):
+    histogram.observe(elapsed)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+class span:
+    """
+    Times a block as `stage`: `with span("llm"): ...`. Costs two clock reads and one histogram
+    observe, 2-3 microseconds; the histogram is looked up once per span name, not per use.
+    """
+
+    __slots__ = ("stage", "histogram", "start")
+    _histograms: Dict[str, Histogram] = {}
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms.setdefault(stage, stage_histogram(stage))
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.stage, self.histogram, time.perf_counter() - self.start)
+
+
+def timed(stage: str):
+    """Decorator form of span() for functions and coroutine functions."""
+    histogram = stage_histogram(stage)
+
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _record(stage, histogram, time.perf_counter() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _record(stage, histogram, time.perf_counter() - start)
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """Collects the seconds spent per stage by everything timed inside the block (same task or its threads)."""
+    stages: Dict[str, float] = {}
+    token = _request_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _request_stages.reset(token)
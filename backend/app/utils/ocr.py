@@ -0,0 +1,101 @@
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pdfplumber
+import pytesseract
+
+# Kept free of app.services imports: this module is imported by every OCR worker process,
+# and on spawn-based platforms (Windows, macOS) that import must not load any models.
+
+_worker_pdf = None # (path, pdfplumber.PDF) cached per worker process
+
+
+def _open_in_worker(file_path: str):
+    global _worker_pdf
+    if _worker_pdf is None or _worker_pdf[0] != file_path:
+        if _worker_pdf is not None:
+            _worker_pdf[1].close()
+        _worker_pdf = (file_path, pdfplumber.open(file_path))
+    return _worker_pdf[1]
+
+
+def _ocr_page(page, dpi: int, lang: str) -> str:
+    image = page.to_image(resolution=dpi).original
+    text = pytesseract.image_to_string(image, lang=lang)
+    page.close() # Drop the page's cached layout objects between tasks
+    return text
+
+
+def ocr_pdf_page(file_path: str, page_index: int, dpi: int, lang: str) -> str:
+    """Renders one PDF page and OCRs it. Runs inside a worker process."""
+    return _ocr_page(_open_in_worker(file_path).pages[page_index], dpi, lang)
+
+
+def default_worker_count(worker_memory_mb: int) -> int:
+    """CPU count, capped so that every worker fits its `worker_memory_mb` budget in available memory."""
+    cpus = os.cpu_count() or 1
+    try:
+        available_mb = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return cpus # sysconf is unavailable on Windows; fall back to CPU count
+    return max(1, min(cpus, available_mb // max(1, worker_memory_mb)))
+
+
+def create_ocr_pool(workers: int, worker_memory_mb: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers or default_worker_count(worker_memory_mb))
+
+
+def iter_pdf_pages(file_path: Path, dpi: int = 300, lang: str = "eng",
+                   executor: Optional[Executor] = None,
+                   progress: Optional[Callable[[int, int], None]] = None,
+                   max_pending: int = 32) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) for every page, in page order, as pages become ready.
+
+    Text layers are read in-process (cheap); pages without one are rendered and OCR'd on
+    `executor` in parallel, at most `max_pending` pages ahead of the consumer. With no
+    executor, OCR runs inline. Only those pending pages are ever held, whatever the page count.
+    """
+    progress = progress or (lambda done, total: None)
+    pending = deque() # (page_number, text or Future), in page order
+
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+        done = 0
+        try:
+            for i, page in enumerate(pdf.pages):
+                text = page.extract_text() or ""
+                if text or executor is None:
+                    text = text or _ocr_page(page, dpi, lang)
+                else:
+                    text = executor.submit(ocr_pdf_page, str(file_path), i, dpi, lang)
+                page.close()
+                pending.append((i + 1, text))
+
+                # Hand over every finished page at the head; block on OCR only once too many are in flight
+                while pending and (len(pending) > max_pending or not isinstance(pending[0][1], Future)
+                                   or pending[0][1].done()):
+                    page_number, result = pending.popleft()
+                    done += 1
+                    progress(done, page_count)
+                    yield page_number, result.result() if isinstance(result, Future) else result
+
+            while pending:
+                page_number, result = pending.popleft()
+                done += 1
+                progress(done, page_count)
+                yield page_number, result.result() if isinstance(result, Future) else result
+        finally:
+            for _, result in pending:
+                if isinstance(result, Future):
+                    result.cancel()
+
+
+def extract_pdf_pages(file_path: Path, dpi: int = 300, lang: str = "eng",
+                      executor: Optional[Executor] = None,
+                      progress: Optional[Callable[[int, int], None]] = None) -> List[Tuple[int, str]]:
+    """Returns (page_number, text) for every page, in page order. See `iter_pdf_pages`."""
+    return list(iter_pdf_pages(file_path, dpi=dpi, lang=lang, executor=executor, progress=progress))
@@ -0,0 +1,66 @@
+import queue
+import threading
+from typing import Iterable, Iterator, List
+
+_END = object()
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    try:
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        if hasattr(items, "close"):
+            items.close()
+
+
+def pipelined(items: Iterable, maxsize: int, name: str = "pipeline") -> Iterator:
+    """
+    Iterates `items` on a background thread and hands the results over through a queue of
+    at most `maxsize` entries, so the producer runs ahead of the consumer but never by more
+    than that. Producer exceptions are re-raised in the consumer; closing the returned
+    generator stops the producer.
+    """
+    handoff = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_END, None))
+        except BaseException as e:
+            put((_END, e))
+        finally:
+            # Let a generator source run its own cleanup on the thread that iterated it
+            if hasattr(items, "close"):
+                items.close()
+
+    threading.Thread(target=produce, name=name, daemon=True).start()
+    try:
+        while True:
+            item, error = handoff.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
@@ -0,0 +1,92 @@
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Kept free of app.services imports, like app.utils.ocr: this module is imported by every
+# transcription worker process, and that import must not load any models.
+
+SAMPLE_RATE = 16000 # whisper.audio.SAMPLE_RATE; whisper.load_audio resamples to this
+
+_worker_model = None # Whisper model loaded once per worker process
+
+
+def init_worker(model_name: str, device: str, threads: int):
+    """Pool initializer: loads the model once per process instead of once per window."""
+    global _worker_model
+    import torch
+    import whisper
+    if threads:
+        torch.set_num_threads(threads) # Split the cores between workers instead of oversubscribing them
+    _worker_model = whisper.load_model(model_name, device=device or None)
+
+
+def transcribe_window(audio: np.ndarray, offset: float, options: Dict) -> List[Dict]:
+    """Transcribes one window of audio. Runs inside a worker process."""
+    return transcribe(_worker_model, audio, offset, options)
+
+
+def transcribe(model, audio: np.ndarray, offset: float, options: Dict) -> List[Dict]:
+    """Returns the non-empty segments as {text, start, end}, shifted by `offset` seconds."""
+    result = model.transcribe(audio, **options)
+    segments = []
+    for segment in result["segments"]:
+        text = segment["text"].strip()
+        if text:
+            segments.append({"text": text, "start": segment["start"] + offset, "end": segment["end"] + offset})
+    return segments
+
+
+def split_on_silence(audio: np.ndarray, window_seconds: float, search_seconds: float,
+                     sample_rate: int = SAMPLE_RATE, frame_seconds: float = 0.1) -> List[Tuple[int, int]]:
+    """
+    Splits `audio` into (start, end) sample ranges of about `window_seconds` each.
+
+    Every cut is placed at the quietest frame within `search_seconds` of its nominal position,
+    so windows start and end in pauses rather than mid-word. The last window absorbs any
+    remainder shorter than half a window.
+    """
+    frame = max(1, int(frame_seconds * sample_rate))
+    window_frames = max(1, int(window_seconds / frame_seconds))
+    search_frames = int(search_seconds / frame_seconds)
+    n_frames = len(audio) // frame
+    if n_frames <= window_frames * 1.5:
+        return [(0, len(audio))]
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy = np.einsum("ij,ij->i", frames, frames) # Per-frame energy without squaring a copy of the signal
+
+    cuts = [0]
+    while n_frames - cuts[-1] > window_frames * 1.5:
+        nominal = cuts[-1] + window_frames
+        lo = max(cuts[-1] + 1, nominal - search_frames)
+        hi = min(n_frames - 1, nominal + search_frames)
+        cuts.append(lo + int(np.argmin(energy[lo:hi + 1])))
+
+    bounds = [cut * frame for cut in cuts] + [len(audio)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def merge_segments(segments: Iterable[Dict], target_seconds: float, max_tokens: int,
+                   count_tokens: Callable[[str], int]) -> List[Dict]:
+    """
+    Merges adjacent segments into chunks of about `target_seconds`, never growing a chunk
+    past `max_tokens` (as counted by `count_tokens`). Each chunk keeps the start of its
+    first segment and the end of its last.
+    """
+    chunks = []
+    current, tokens = None, 0
+    for segment in segments:
+        segment_tokens = count_tokens(segment["text"])
+        if current is not None and (current["end"] - current["start"] >= target_seconds
+                                    or tokens + segment_tokens > max_tokens):
+            chunks.append(current)
+            current = None
+        if current is None:
+            current, tokens = dict(segment), segment_tokens
+        else:
+            current["text"] += " " + segment["text"]
+            current["end"] = segment["end"]
+            tokens += segment_tokens
+    if current is not None:
+        chunks.append(current)
+    return chunks
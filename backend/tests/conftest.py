@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so point every data directory at a throwaway one first
+_data_dir = tempfile.mkdtemp(prefix="evidentia-tests-")
+for name in ("FAISS_INDEX_DIR", "METADATA_DIR", "UPLOAD_DIR"):
+    os.environ.setdefault(name, os.path.join(_data_dir, name.lower()))
+os.environ.setdefault("GEMINI_API_KEY", "unused") # Nothing here calls the LLM
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
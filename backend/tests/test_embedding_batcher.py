@@ -0,0 +1,28 @@
+import asyncio
+import threading
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+def test_cancelled_caller_does_not_stop_the_batcher():
+    release = threading.Event()
+
+    def encode_batch(texts):
+        release.wait(5)
+        return [f"vec:{text}" for text in texts]
+
+    batcher = EmbeddingBatcher(encode_batch, max_batch_size=1, max_wait_ms=0)
+
+    async def scenario():
+        busy = asyncio.ensure_future(asyncio.wrap_future(batcher.submit("first")))
+        await asyncio.sleep(0.05) # The batcher thread is now blocked encoding "first"
+        abandoned = asyncio.ensure_future(asyncio.wrap_future(batcher.submit("gone")))
+        await asyncio.sleep(0.01)
+        abandoned.cancel() # What a client disconnect does to its query's embedding
+        await asyncio.sleep(0.01) # Let the cancellation reach the batcher's future
+        release.set()
+        assert await busy == "vec:first"
+        return await asyncio.wait_for(asyncio.wrap_future(batcher.submit("second")), 5)
+
+    assert asyncio.run(scenario()) == "vec:second"
+    assert batcher.thread.is_alive()
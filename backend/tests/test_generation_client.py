@@ -0,0 +1,56 @@
+import asyncio
+
+from app.config import settings
+from app.services.generation_client import GenerationClient
+
+
+class RateLimitedBackend:
+    """Streams "a b c", after failing the first `failures` attempts with a 429."""
+
+    def __init__(self, failures: int, fail_mid_stream: bool = False):
+        self.failures = failures
+        self.fail_mid_stream = fail_mid_stream
+        self.attempts = 0
+
+    def stream(self, prompt):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise RuntimeError("429 Resource has been exhausted")
+        yield "a "
+        if self.fail_mid_stream:
+            raise RuntimeError("429 Resource has been exhausted")
+        yield "b c"
+
+
+async def collect(client):
+    return [token async for token in client.stream("prompt")]
+
+
+def test_stream_retries_rate_limits_before_the_first_token(monkeypatch):
+    monkeypatch.setattr(settings, "GENERATION_BACKOFF_BASE", 0.001)
+    backend = RateLimitedBackend(failures=2)
+    client = GenerationClient(backend)
+
+    assert asyncio.run(collect(client)) == ["a ", "b c"]
+    assert backend.attempts == 3
+    assert client.counters["retries"] == 2
+
+
+def test_stream_does_not_retry_once_tokens_are_out(monkeypatch):
+    monkeypatch.setattr(settings, "GENERATION_BACKOFF_BASE", 0.001)
+    backend = RateLimitedBackend(failures=0, fail_mid_stream=True)
+    client = GenerationClient(backend)
+    received = []
+
+    async def scenario():
+        async for token in client.stream("prompt"):
+            received.append(token)
+
+    try:
+        asyncio.run(scenario())
+    except RuntimeError as e:
+        assert "429" in str(e)
+    else:
+        raise AssertionError("mid-stream error was swallowed")
+    assert received == ["a "]
+    assert backend.attempts == 1
@@ -0,0 +1,24 @@
+from app.services.metadata_store import MetadataStore
+from app.utils.metadata import create_metadata, upload_name
+
+
+def add_document(store, first_faiss_id, doc_id, filename):
+    meta = create_metadata(doc_id, filename, "application/pdf", page=1)
+    meta["text"] = "text"
+    store.add_chunks(first_faiss_id, [meta])
+
+
+def test_filename_filter_matches_nested_bulk_paths(tmp_path):
+    store = MetadataStore(tmp_path / "metadata.db")
+    add_document(store, 0, "upload", upload_name("a" * 64, "file.pdf"))
+    add_document(store, 1, "bulk", upload_name("b" * 64, "sub/dir/file.pdf"))
+    add_document(store, 2, "other", upload_name("c" * 64, "sub/dir/other.pdf"))
+
+    def matches(filename):
+        return store.filter_ids({"filename": filename}).tolist()
+
+    assert matches("file.pdf") == [0, 1]
+    assert matches("sub/dir/file.pdf") == [1]
+    assert matches(upload_name("b" * 64, "sub/dir/file.pdf")) == [1]
+    assert matches("dir/file.pdf") == []
+    assert matches("missing.pdf") == []
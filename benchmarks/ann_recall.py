@@ -0,0 +1,62 @@
+"""
+Recall-vs-latency report for the ANN index types against exact (flat) search.
+
+    python benchmarks/ann_recall.py                 # synthetic clustered corpus
+    python benchmarks/ann_recall.py --from-index    # vectors from backend/data/faiss_index
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.services.ann_index import recall_report
+
+
+def synthetic_corpus(n: int, dimension: int, seed: int = 0) -> np.ndarray:
+    # Clustered, unit-normalised vectors behave much more like sentence embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 200), dimension))
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype('float32')
+
+
+def load_corpus() -> np.ndarray:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env'))
+    from app.services.vector_store import VectorStore
+
+    VectorStore.load_index()
+    return VectorStore.segments.read_vectors(VectorStore.ntotal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-index", action="store_true", help="use the persisted corpus instead of synthetic data")
+    parser.add_argument("--size", type=int, default=100_000, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = load_corpus() if args.from_index else synthetic_corpus(args.size, 384)
+    if len(vectors) < args.queries:
+        sys.exit(f"Corpus has only {len(vectors)} vectors; need at least {args.queries}")
+
+    # Queries are perturbed corpus vectors so every query has true neighbours
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = (queries + 0.05 * rng.normal(size=queries.shape)).astype('float32')
+
+    print(f"Corpus: {len(vectors)} vectors, {args.queries} queries, k={args.k}\n")
+    print(f"{'index':<10} {'param':>6} {'recall@k':>9} {'ms/query':>9} {'build s':>8}")
+    for row in recall_report(vectors, queries, k=args.k):
+        param = "" if row["param"] is None else row["param"]
+        build = f"{row['build_s']:.1f}" if "build_s" in row else ""
+        print(f"{row['index_type']:<10} {param:>6} {row['recall']:>9.3f} {row['latency_ms']:>9.3f} {build:>8}")
+
+
+if __name__ == "__main__":
+    main()
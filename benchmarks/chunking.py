@@ -0,0 +1,139 @@
+"""
+Chunker throughput and truncation report: the character-based `chunk_text` against the
+token-aware `chunk_tokens`, on a synthetic corpus mixing prose with token-dense text
+(identifiers, numbers, URLs, code) where characters are a poor proxy for tokens.
+
+    python benchmarks/chunking.py
+    python benchmarks/chunking.py --size-mb 16 --tokenizer simple
+
+A chunk is truncated when its tokens plus [CLS]/[SEP] exceed the model's window; the
+embedding model silently drops the rest. `--tokenizer simple` uses the built-in
+approximation when `transformers` or the model files are unavailable.
+"""
+import argparse
+import functools
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.utils.chunking import chunk_text, chunk_tokens, simple_token_offsets
+
+WORDS = ("the of and to in is that for it as was with be by on not he this are or his from at which "
+         "but have an they you were her she there been one all we their has would when if so what "
+         "retrieval embedding index document answer vector query context source model").split()
+
+
+def _prose(rng: random.Random) -> str:
+    sentences = []
+    for _ in range(rng.randint(2, 8)):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 28))]
+        sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"]))
+    return " ".join(sentences)
+
+
+def _dense(rng: random.Random) -> str:
+    kind = rng.randrange(4)
+    if kind == 0: # Tables of identifiers and numbers
+        return "\n".join(
+            f"SKU-{rng.randint(10000, 99999)} {rng.random():.6f} 0x{rng.getrandbits(32):08x} {rng.randint(1, 10**9)}"
+            for _ in range(rng.randint(5, 30))
+        )
+    if kind == 1: # URLs
+        return " ".join(
+            f"https://example.com/{rng.getrandbits(40):x}/{rng.choice(WORDS)}?id={rng.randint(1, 10**6)}&ref=a{rng.randint(0, 999)}"
+            for _ in range(rng.randint(3, 12))
+        )
+    if kind == 2: # Code
+        return "\n".join(
+            f"    result_{i} = compute({rng.choice(WORDS)}_{i}, key='{rng.getrandbits(24):x}') + [{i}, {i * 7}]"
+            for i in range(rng.randint(5, 25))
+        )
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(rng.randint(200, 2000)))
+
+
+def synthetic_document(size_mb: float, dense_share: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < size_mb * 1e6:
+        part = _dense(rng) if rng.random() < dense_share else _prose(rng)
+        parts.append(part)
+        length += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def load_tokenizer(name: str, model: str):
+    """Returns (name, token_offsets, count_tokens) for the tokenizer actually used."""
+    if name == "hf":
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model)
+        except Exception as e:
+            print(f"Model tokenizer unavailable ({e.__class__.__name__}); falling back to --tokenizer simple\n")
+        else:
+            def token_offsets(text):
+                return tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)["offset_mapping"]
+
+            def count_tokens(texts):
+                return [len(ids) for ids in tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]]
+
+            return "hf", token_offsets, count_tokens
+    return "simple", simple_token_offsets, lambda texts: [len(simple_token_offsets(text)) for text in texts]
+
+
+def measure(name: str, chunker, text: str, count_tokens, window: int) -> dict:
+    start = time.perf_counter()
+    chunks = chunker(text)
+    seconds = time.perf_counter() - start
+
+    tokens = np.array(count_tokens(chunks)) if chunks else np.zeros(0)
+    truncated = tokens + 2 > window
+    return {
+        "chunker": name,
+        "mb_per_s": len(text) / 1e6 / seconds,
+        "chunks": len(chunks),
+        "mean_tokens": float(tokens.mean()) if len(tokens) else 0.0,
+        "max_tokens": int(tokens.max()) if len(tokens) else 0,
+        "truncated_share": float(truncated.mean()) if len(tokens) else 0.0,
+        "tokens_lost_share": float(np.clip(tokens + 2 - window, 0, None).sum() / max(1, tokens.sum())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=4.0, help="synthetic document size")
+    parser.add_argument("--dense-share", type=float, default=0.3, help="share of token-dense blocks")
+    parser.add_argument("--tokenizer", choices=("hf", "simple"), default="hf")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--max-seq-length", type=int, default=256, help="model input window, special tokens included")
+    parser.add_argument("--chunk-tokens", type=int, default=128)
+    parser.add_argument("--overlap-tokens", type=int, default=16)
+    args = parser.parse_args()
+
+    tokenizer, token_offsets, count_tokens = load_tokenizer(args.tokenizer, args.model)
+    text = synthetic_document(args.size_mb, args.dense_share)
+    chunk_size = min(args.chunk_tokens, args.max_seq_length - 2)
+
+    rows = [
+        measure("chunk_text (500 chars)", functools.partial(chunk_text, chunk_size=500, overlap=50),
+                text, count_tokens, args.max_seq_length),
+        measure(f"chunk_tokens ({chunk_size} tokens)",
+                functools.partial(chunk_tokens, chunk_size=chunk_size, overlap=args.overlap_tokens,
+                                  token_offsets=token_offsets),
+                text, count_tokens, args.max_seq_length),
+    ]
+
+    print(f"Corpus: {len(text) / 1e6:.1f} MB, {args.dense_share:.0%} token-dense, tokenizer={tokenizer}, "
+          f"window={args.max_seq_length}\n")
+    print(f"{'chunker':<28} {'MB/s':>7} {'chunks':>8} {'mean tok':>9} {'max tok':>8} {'truncated':>10} {'tok lost':>9}")
+    for row in rows:
+        print(f"{row['chunker']:<28} {row['mb_per_s']:>7.1f} {row['chunks']:>8} {row['mean_tokens']:>9.1f} "
+              f"{row['max_tokens']:>8} {row['truncated_share']:>10.2%} {row['tokens_lost_share']:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+"""
+End-to-end report: ingest throughput per stage and /query latency under concurrent load,
+on a synthetic corpus (text PDFs, scanned PDFs, DOCX, images, audio), with Gemini replaced
+by the deterministic in-process stub. No API key is needed.
+
+    python benchmarks/end_to_end.py --output results.json
+    python benchmarks/end_to_end.py --llm-latency 0.4 --concurrency 1 8 32 --queries 400
+    python benchmarks/end_to_end.py --output after.json --compare results.json
+
+Everything runs against a throwaway data directory. Stages (extract, ocr, transcribe, chunk,
+embed, index_write) are timed one after another over the corpus; "pipelined" then ingests the
+same files again through the upload job queue, where the stages overlap. Queries go through
+the real FastAPI app over an in-process ASGI client, and every query is unique so the
+retrieval caches never hit. Scanned pages and images need Tesseract, audio needs Whisper and
+ffmpeg; kinds whose tools are missing are skipped and listed in the output. The synthetic
+audio is tone bursts, not speech, so it measures transcription cost rather than quality.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import wave
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from chunking import synthetic_document
+from ocr_throughput import make_scanned_pdf
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+STAGE_UNITS = {
+    "extract": "pages",
+    "ocr": "pages",
+    "transcribe": "audio_s",
+    "chunk": "chunks",
+    "embed": "chunks",
+    "index_write": "chunks",
+}
+
+
+# Synthetic corpus
+
+def _lines(pages: int, seed: int, width: int = 90, per_page: int = 45):
+    text = synthetic_document(pages * width * per_page / 1e6, dense_share=0.1, seed=seed)
+    lines = [line for paragraph in text.split("\n") for line in textwrap.wrap(paragraph, width)]
+    return [lines[i:i + per_page] for i in range(0, per_page * pages, per_page)]
+
+
+def write_text_pdf(path: Path, pages):
+    """Minimal PDF with a real text layer (Helvetica), one content stream per page."""
+    def pdf_string(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"({pdf_string(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1", "replace")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+def write_docx(path: Path, paragraphs):
+    """Minimal DOCX: content types, package relationship and word/document.xml."""
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(p)}</w:t></w:r></w:p>' for p in paragraphs)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ))
+        archive.writestr("_rels/.rels", (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="word/document.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'
+        ))
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{w}"><w:body>{body}</w:body></w:document>')
+
+
+def write_image(path: Path, lines):
+    image = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((60, 60 + i * 28), line, fill="black")
+    image.save(path)
+
+
+def write_audio(path: Path, seconds: float, seed: int, rate: int = 16000):
+    """Tone bursts of 2-6 s separated by 0.3-1.5 s pauses, so silence splitting has real cuts."""
+    rng = np.random.default_rng(seed)
+    signal = np.zeros(int(seconds * rate), dtype=np.float32)
+    position = 0
+    while position < len(signal):
+        length = int(rng.uniform(2, 6) * rate)
+        t = np.arange(min(length, len(signal) - position)) / rate
+        burst = np.sin(2 * np.pi * rng.uniform(120, 300) * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+        signal[position:position + len(t)] = 0.3 * burst
+        position += length + int(rng.uniform(0.3, 1.5) * rate)
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes((signal * 32767).astype(np.int16).tobytes())
+
+
+def build_corpus(directory: Path, args) -> dict:
+    """Writes the corpus; returns its files as (path, content_type, kind), size, skipped kinds and text."""
+    files, skipped, text = [], [], []
+    has_tesseract = shutil.which("tesseract") is not None
+    has_whisper = importlib.util.find_spec("whisper") is not None and shutil.which("ffmpeg") is not None
+
+    for i in range(args.pdfs):
+        pages = _lines(args.pdf_pages, seed=i)
+        write_text_pdf(directory / f"text-{i}.pdf", pages)
+        files.append((directory / f"text-{i}.pdf", "application/pdf", "pdf"))
+        text.extend(line for page in pages for line in page)
+    for i in range(args.docx):
+        paragraphs = synthetic_document(args.docx_kb / 1000, dense_share=0.1, seed=1000 + i).split("\n\n")
+        write_docx(directory / f"doc-{i}.docx", paragraphs)
+        files.append((directory / f"doc-{i}.docx", DOCX_TYPE, "docx"))
+        text.extend(paragraphs)
+
+    if has_tesseract:
+        for i in range(args.scanned):
+            path = directory / f"scanned-{i}.pdf"
+            make_scanned_pdf(str(path), args.scanned_pages)
+            files.append((path, "application/pdf", "scanned_pdf"))
+        for i in range(args.images):
+            write_image(directory / f"image-{i}.png", _lines(1, seed=2000 + i, width=80, per_page=40)[0])
+            files.append((directory / f"image-{i}.png", "image/png", "image"))
+    elif args.scanned or args.images:
+        skipped.append("scanned_pdf/image: tesseract not found")
+
+    if has_whisper:
+        for i in range(args.audio):
+            write_audio(directory / f"audio-{i}.wav", args.audio_seconds, seed=3000 + i)
+            files.append((directory / f"audio-{i}.wav", "audio/wav", "audio"))
+    elif args.audio:
+        skipped.append("audio: whisper or ffmpeg not found")
+
+    size = sum(path.stat().st_size for path, _, _ in files)
+    return {"files": files, "bytes": size, "skipped": skipped, "text": text}
+
+
+def make_queries(text, count: int, seed: int):
+    # Short spans of corpus text, so every query has true neighbours
+    rng = random.Random(seed)
+    words = " ".join(text).split()
+    queries = []
+    for _ in range(count):
+        start = rng.randrange(max(1, len(words) - 8))
+        queries.append(" ".join(words[start:start + rng.randint(4, 8)]) + f" #{rng.getrandbits(32):x}")
+    return queries
+
+
+# Ingest
+
+class StageTimer:
+    """Accumulates wall time and item counts per ingest stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        row = self.stages.setdefault(name, {"seconds": 0.0, "items": 0, "unit": STAGE_UNITS[name]})
+        start = time.perf_counter()
+        try:
+            yield row
+        finally:
+            row["seconds"] += time.perf_counter() - start
+
+    def report(self) -> dict:
+        return {
+            name: {**row, "per_s": row["items"] / row["seconds"] if row["seconds"] else 0.0}
+            for name, row in self.stages.items()
+        }
+
+
+def _extract(path: Path, kind: str, timer: StageTimer):
+    """Returns [(page, text)] for a document, timing text extraction and OCR separately."""
+    import pdfplumber
+    import pytesseract
+
+    from app.config import settings
+    from app.utils.docx_text import iter_docx_paragraphs
+    from app.utils.ocr import ocr_pdf_page
+
+    if kind == "docx":
+        with timer.stage("extract") as row:
+            paragraphs = list(iter_docx_paragraphs(path))
+            row["items"] += 1 # One page, as the processor labels it
+        return [(1, "\n".join(paragraphs))]
+    if kind == "image":
+        with timer.stage("ocr") as row:
+            text = pytesseract.image_to_string(Image.open(path), lang=settings.OCR_LANG)
+            row["items"] += 1
+        return [(1, text)]
+
+    pages = []
+    with pdfplumber.open(path) as pdf:
+        for i, page in enumerate(pdf.pages):
+            with timer.stage("extract") as row:
+                text = page.extract_text() or ""
+                row["items"] += 1
+            if not text:
+                with timer.stage("ocr") as row:
+                    text = ocr_pdf_page(str(path), i, settings.OCR_DPI, settings.OCR_LANG)
+                    row["items"] += 1
+            pages.append((i + 1, text))
+    return pages
+
+
+def staged_ingest(files, timer: StageTimer) -> int:
+    """Runs each stage to completion before the next, per file; returns chunks indexed."""
+    from app.config import settings
+    from app.services.audio_processor import audio_processor
+    from app.services.document_processor import document_processor
+    from app.services.embeddings import embeddings_service
+    from app.services.vector_store import VectorStore
+    from app.utils.chunking import chunk_stream
+    from app.utils.metadata import create_metadata, generate_document_id
+    from app.utils.transcription import merge_segments
+
+    total = 0
+    for path, content_type, kind in files:
+        if kind == "audio":
+            with timer.stage("transcribe") as row:
+                segments = audio_processor.transcribe(path)
+                with wave.open(str(path)) as audio:
+                    row["items"] += audio.getnframes() / audio.getframerate()
+            with timer.stage("chunk") as row:
+                merged = merge_segments(
+                    segments, settings.AUDIO_CHUNK_SECONDS,
+                    min(settings.CHUNK_SIZE, embeddings_service.max_tokens),
+                    lambda text: len(embeddings_service.token_offsets(text)),
+                )
+                chunks = list(audio_processor._segment_chunks(merged))
+                row["items"] += len(chunks)
+        else:
+            pages = _extract(path, kind, timer)
+            with timer.stage("chunk") as row:
+                if kind == "docx":
+                    chunks = [{"text": c, "page": 1} for c in chunk_stream(pages[0][1].split("\n"), document_processor._chunk)]
+                else:
+                    chunks = [{"text": c, "page": page} for page, text in pages if text
+                              for c in document_processor._chunk(text)]
+                row["items"] += len(chunks)
+
+        doc_id = generate_document_id()
+        for start in range(0, len(chunks), settings.INGEST_BATCH_SIZE):
+            batch = chunks[start:start + settings.INGEST_BATCH_SIZE]
+            with timer.stage("embed") as row:
+                embeddings = embeddings_service.encode_documents([chunk["text"] for chunk in batch])
+                row["items"] += len(batch)
+            metas = []
+            for i, chunk in enumerate(batch, start):
+                meta = create_metadata(
+                    doc_id, path.name, "transcript" if kind == "audio" else "text",
+                    page=chunk.get("page"), timestamp=chunk.get("timestamp"), chunk_id=i
+                )
+                meta["text"] = chunk["text"]
+                metas.append(meta)
+            with timer.stage("index_write") as row:
+                VectorStore.add_texts(embeddings, metas)
+                row["items"] += len(batch)
+        total += len(chunks)
+    return total
+
+
+def pipelined_ingest(files) -> dict:
+    """Ingests through the upload job queue (overlapped stages, per-kind worker pools), then removes the copies."""
+    from app.services.ingestion import ingestion_queue
+    from app.services.vector_store import VectorStore
+
+    before = VectorStore.ntotal
+    start = time.perf_counter()
+    jobs = [ingestion_queue.submit(path, path.name, content_type) for path, content_type, _ in files]
+    while any(ingestion_queue.get(job.id).status in ("queued", "running") for job in jobs):
+        time.sleep(0.01)
+    seconds = time.perf_counter() - start
+
+    failed = [f"{job.filename}: {job.error}" for job in jobs if job.status == "failed"]
+    chunks = VectorStore.ntotal - before
+    for job in jobs:
+        VectorStore.delete_document(str(job.document_id))
+    if VectorStore._rebuild_thread:
+        VectorStore._rebuild_thread.join() # Don't let the purge overlap the query runs
+
+    return {
+        "seconds": seconds,
+        "files": len(files),
+        "chunks": chunks,
+        "files_per_s": len(files) / seconds,
+        "chunks_per_s": chunks / seconds,
+        "failed": failed,
+    }
+
+
+# Query load
+
+async def query_load(app, queries, concurrency: int, top_k: int) -> dict:
+    import httpx
+
+    from app.services.generation import NO_RESULTS_ANSWER
+
+    latencies, errors, no_context = [], 0, 0
+    prompt_tokens, tokens_saved = [], []
+    pending = iter(queries)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def user():
+            nonlocal errors, no_context
+            for query in pending: # Shared iterator: each query is sent once
+                start = time.perf_counter()
+                response = await client.post("/query/", json={"query": query, "top_k": top_k})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                body = response.json()
+                if body["answer"] == NO_RESULTS_ANSWER:
+                    no_context += 1 # Nothing relevant retrieved, so the LLM was never called
+                elif body.get("context"):
+                    prompt_tokens.append(body["context"]["tokens"])
+                    tokens_saved.append(body["context"]["tokens_saved"])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "no_context": no_context,
+        "qps": len(latencies) / wall,
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "context_tokens": float(np.mean(prompt_tokens)) if prompt_tokens else 0.0,
+        "context_tokens_saved": float(np.mean(tokens_saved)) if tokens_saved else 0.0,
+    }
+
+
+# Results
+
+def flatten(results: dict) -> dict:
+    """Headline numbers by name, for comparing runs."""
+    flat = {f"ingest.{name}.per_s": row["per_s"] for name, row in results["ingest"]["stages"].items()}
+    flat["ingest.pipelined.chunks_per_s"] = results["ingest"]["pipelined"]["chunks_per_s"]
+    for row in results["query"]:
+        for key in ("qps", "p50_ms", "p99_ms", "context_tokens"):
+            flat[f"query.c{row['concurrency']}.{key}"] = row[key]
+    return flat
+
+
+def compare(baseline: dict, current: dict):
+    before, after = flatten(baseline), flatten(current)
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'}:")
+    print(f"{'metric':<34} {'before':>10} {'after':>10} {'change':>8}")
+    for name in sorted(before.keys() & after.keys()):
+        change = (after[name] - before[name]) / before[name] * 100 if before[name] else 0.0
+        print(f"{name:<34} {before[name]:>10.2f} {after[name]:>10.2f} {change:>+7.1f}%")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", type=int, default=8, help="text-layer PDFs")
+    parser.add_argument("--pdf-pages", type=int, default=6)
+    parser.add_argument("--scanned", type=int, default=2, help="image-only PDFs (OCR)")
+    parser.add_argument("--scanned-pages", type=int, default=2)
+    parser.add_argument("--docx", type=int, default=8)
+    parser.add_argument("--docx-kb", type=float, default=40, help="text per DOCX")
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--audio", type=int, default=1)
+    parser.add_argument("--audio-seconds", type=float, default=60)
+    parser.add_argument("--whisper-model", help="overrides WHISPER_MODEL, e.g. tiny for a quick run")
+    parser.add_argument("--queries", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds before the stub's first token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="seconds between the stub's tokens")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="results JSON of an earlier run to diff against")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix="evidentia-bench-"))
+    os.environ.update(
+        FAISS_INDEX_DIR=str(data_dir / "faiss_index"),
+        METADATA_DIR=str(data_dir / "metadata"),
+        UPLOAD_DIR=str(data_dir / "uploads"),
+        GENERATION_BACKEND="fake",
+        FAKE_LLM_LATENCY=str(args.llm_latency),
+        FAKE_LLM_TOKEN_DELAY=str(args.llm_token_delay),
+    )
+    os.environ.setdefault("GEMINI_API_KEY", "unused") # The stub never calls Gemini
+    os.environ.setdefault("GENERATION_RATE_PER_MINUTE", "0") # Measure the pipeline, not the quota limiter
+    if args.whisper_model:
+        os.environ["WHISPER_MODEL"] = args.whisper_model
+
+    from app.config import settings
+    from app.main import app
+    logging.getLogger("httpx").setLevel(logging.WARNING) # One INFO line per request otherwise
+    from app.services.audio_processor import audio_processor
+    from app.services.document_processor import document_processor
+    from app.services.embeddings import embeddings_service
+    from app.services.ingestion import ingestion_queue
+    from app.services.vector_store import VectorStore
+
+    try:
+        corpus_dir = data_dir / "corpus"
+        corpus_dir.mkdir()
+        corpus = build_corpus(corpus_dir, args)
+        files = corpus["files"]
+        if not files:
+            sys.exit("Empty corpus: nothing to ingest")
+
+        VectorStore.load_index()
+        embeddings_service.encode_query("warm-up") # Model load is startup cost, not ingest cost
+        if any(kind == "audio" for _, _, kind in files):
+            audio_processor.load_model()
+
+        timer = StageTimer()
+        start = time.perf_counter()
+        staged_chunks = staged_ingest(files, timer)
+        staged_seconds = time.perf_counter() - start
+        pipelined = pipelined_ingest(files)
+
+        query_rows = []
+        for level, concurrency in enumerate(args.concurrency):
+            queries = make_queries(corpus["text"], args.queries, seed=level)
+            query_rows.append(asyncio.run(query_load(app, queries, concurrency, args.top_k)))
+    finally:
+        ingestion_queue.shutdown()
+        document_processor.shutdown()
+        audio_processor.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    kinds = {}
+    for path, _, kind in files:
+        kinds[kind] = kinds.get(kind, 0) + 1
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "settings": {key: getattr(settings, key) for key in (
+            "EMBEDDING_MODEL", "WHISPER_MODEL", "CHUNK_SIZE", "CHUNK_OVERLAP", "INGEST_BATCH_SIZE",
+            "DOCUMENT_INGEST_WORKERS", "AUDIO_INGEST_WORKERS", "INDEX_TYPE", "VECTOR_STORAGE",
+            "GENERATION_MAX_CONCURRENCY",
+        )},
+        "corpus": {
+            "files": kinds,
+            "bytes": corpus["bytes"],
+            "skipped": corpus["skipped"],
+        },
+        "ingest": {
+            "stages": timer.report(),
+            "staged": {"seconds": staged_seconds, "chunks": staged_chunks},
+            "pipelined": pipelined,
+        },
+        "query": query_rows,
+    }
+
+    print(f"Corpus: {', '.join(f'{n} {kind}' for kind, n in kinds.items())}; {staged_chunks} chunks"
+          + (f"; skipped {'; '.join(corpus['skipped'])}" if corpus["skipped"] else ""))
+    print(f"\n{'stage':<12} {'seconds':>8} {'items':>10} {'unit':>8} {'per s':>10}")
+    for name, row in results["ingest"]["stages"].items():
+        print(f"{name:<12} {row['seconds']:>8.2f} {row['items']:>10.0f} {row['unit']:>8} {row['per_s']:>10.1f}")
+    print(f"{'pipelined':<12} {pipelined['seconds']:>8.2f} {pipelined['chunks']:>10} {'chunks':>8} "
+          f"{pipelined['chunks_per_s']:>10.1f}   ({pipelined['files_per_s']:.2f} files/s)")
+    for failure in pipelined["failed"]:
+        print(f"  failed: {failure}")
+
+    print(f"\n/query, stub LLM latency {args.llm_latency:.2f} s")
+    print(f"{'conc':>5} {'req':>6} {'err':>4} {'no ctx':>6} {'qps':>8} {'mean ms':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'ctx tok':>8} {'saved':>6}")
+    for row in query_rows:
+        print(f"{row['concurrency']:>5} {row['requests']:>6} {row['errors']:>4} {row['no_context']:>6} {row['qps']:>8.1f} "
+              f"{row['mean_ms']:>9.1f} {row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['context_tokens']:>8.0f} {row['context_tokens_saved']:>6.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
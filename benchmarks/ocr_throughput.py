@@ -0,0 +1,64 @@
+"""
+Pages/second of scanned-PDF extraction, inline vs. the OCR process pool.
+
+    python benchmarks/ocr_throughput.py --pages 40 --workers 0 2 4
+
+Generates a synthetic image-only PDF (no text layer), so every page goes through
+render + Tesseract exactly as a scanned document would. Requires Tesseract on PATH.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.utils.ocr import extract_pdf_pages, create_ocr_pool
+
+LINE = "The quick brown fox jumps over the lazy dog while the scheduler preempts process {n}."
+
+
+def make_scanned_pdf(path: str, pages: int, dpi: int = 150):
+    width, height = int(8.27 * dpi), int(11.69 * dpi) # A4
+    images = []
+    for p in range(pages):
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(40):
+            draw.text((60, 60 + line * 28), LINE.format(n=p * 40 + line), fill="black")
+        images.append(image)
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--dpi", type=int, default=300, help="OCR render DPI")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4],
+                        help="pool sizes to compare; 0 = inline (no pool)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "scanned.pdf")
+        make_scanned_pdf(pdf_path, args.pages)
+
+        print(f"{args.pages} scanned pages @ {args.dpi} DPI\n")
+        print(f"{'workers':>8} {'seconds':>8} {'pages/s':>8}")
+        for workers in args.workers:
+            pool = create_ocr_pool(workers, worker_memory_mb=400) if workers else None
+            start = time.perf_counter()
+            pages = extract_pdf_pages(pdf_path, dpi=args.dpi, executor=pool)
+            elapsed = time.perf_counter() - start
+            if pool:
+                pool.shutdown()
+
+            assert [n for n, _ in pages] == list(range(1, args.pages + 1)), "page order not preserved"
+            label = workers if workers else "inline"
+            print(f"{label:>8} {elapsed:>8.2f} {args.pages / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold-start report: import time and resident memory per component, model load cost,
+and wall time from launching uvicorn to the first successful /health.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --skip-server
+
+Every measurement runs in a fresh interpreter so earlier imports don't hide later costs.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+COMPONENTS = [
+    "app.config",
+    "app.services.vector_store",
+    "app.services.embeddings",
+    "app.services.generation",
+    "app.services.document_processor",
+    "app.services.audio_processor",
+    "app.main",
+]
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = r"""
+import json, sys, time
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return 0.0
+
+base = rss_mb()
+start = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1])
+result = {"import_s": time.perf_counter() - start, "rss_mb": rss_mb() - base}
+if len(sys.argv) > 2:
+    from app.services.embeddings import embeddings_service
+    start = time.perf_counter()
+    embeddings_service.encode_query("warm-up")
+    result["first_encode_s"] = time.perf_counter() - start
+    result["rss_after_model_mb"] = rss_mb() - base
+print(json.dumps(result))
+"""
+
+
+def probe(module: str, load_model: bool = False) -> dict:
+    args = [sys.executable, "-c", PROBE, module] + (["load"] if load_model else [])
+    out = subprocess.run(args, cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def time_to_health(port: int, timeout: float = 120.0) -> float:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError("server did not become healthy")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-server", action="store_true", help="don't measure time to first /health")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    report = {"components": {module: probe(module) for module in COMPONENTS}}
+    report["embedding_model"] = probe("app.services.embeddings", load_model=True)
+    if not args.skip_server:
+        report["time_to_first_health_s"] = time_to_health(args.port)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'component':<36} {'import s':>9} {'RSS MB':>8}")
+    for module, row in report["components"].items():
+        print(f"{module:<36} {row['import_s']:>9.3f} {row['rss_mb']:>8.1f}")
+    model = report["embedding_model"]
+    print(f"\nFirst query encode (loads model): {model['first_encode_s']:.2f} s, "
+          f"RSS {model['rss_after_model_mb']:.0f} MB")
+    if "time_to_first_health_s" in report:
+        print(f"Cold start to first /health: {report['time_to_first_health_s']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Local stand-in for the Gemini API, for load-testing the generation client.
+
+    python benchmarks/stub_llm_server.py --latency 0.8 --rate-limit 0.1
+    # then run the backend with GENERATION_BACKEND=http
+
+Answers POST /generate {"prompt": ...} with {"text": ...} after `--latency` seconds,
+and returns HTTP 429 for a `--rate-limit` fraction of requests. GET /stats reports how
+many upstream calls actually arrived, which shows coalescing and retry behaviour.
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Stub LLM")
+config = {"latency": 0.5, "rate_limit": 0.0}
+stats = {"requests": 0, "rejected": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+@app.post("/generate")
+async def generate(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if random.random() < config["rate_limit"]:
+        stats["rejected"] += 1
+        return JSONResponse({"error": "ResourceExhausted"}, status_code=429)
+
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(config["latency"])
+    finally:
+        stats["in_flight"] -= 1
+    return {"text": f"Stub answer ({len(body.get('prompt', ''))} prompt chars) [1]."}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    config["latency"] = args.latency
+    config["rate_limit"] = args.rate_limit
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Transcription real-time factor (RTF = wall time / audio duration; below 1 is faster than
+real time) for a recording, across worker counts, plus how many chunks the merged
+transcript indexes compared with raw Whisper segments.
+
+    python benchmarks/transcription.py --audio talk.mp3
+    python benchmarks/transcription.py --audio talk.mp3 --workers 1 2 4 --model base --window 120
+
+Worker count 1 transcribes the windows one after another in-process; higher counts use the
+spawn-based pool. Model loading is reported separately and kept out of the RTF.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app.config import settings
+from app.services.audio_processor import AudioProcessor
+from app.services.embeddings import embeddings_service
+from app.utils.transcription import SAMPLE_RATE, merge_segments
+
+
+def run(audio_path: str, workers: int) -> dict:
+    settings.AUDIO_TRANSCRIBE_WORKERS = workers
+    processor = AudioProcessor()
+    try:
+        start = time.perf_counter()
+        if workers > 1:
+            # Spawn the workers (each loads the model in its initializer) before the timed run
+            list(processor.pool.map(abs, range(workers)))
+        else:
+            processor.load_model()
+        load_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segments = processor.transcribe(audio_path)
+        seconds = time.perf_counter() - start
+    finally:
+        processor.shutdown()
+
+    chunks = merge_segments(
+        segments, settings.AUDIO_CHUNK_SECONDS,
+        min(settings.CHUNK_SIZE, embeddings_service.max_tokens),
+        lambda text: len(embeddings_service.token_offsets(text)),
+    )
+    return {"workers": workers, "load_s": load_s, "seconds": seconds, "segments": len(segments), "chunks": len(chunks)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", required=True, help="recording to transcribe (any format ffmpeg reads)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--model", default=settings.WHISPER_MODEL)
+    parser.add_argument("--window", type=float, default=settings.AUDIO_WINDOW_SECONDS, help="window length in seconds")
+    args = parser.parse_args()
+
+    import whisper
+    settings.WHISPER_MODEL = args.model
+    settings.AUDIO_WINDOW_SECONDS = args.window
+    duration = len(whisper.load_audio(args.audio)) / SAMPLE_RATE
+
+    print(f"Audio: {duration:.0f} s, model={args.model}, window={args.window:.0f} s\n")
+    print(f"{'workers':>7} {'load s':>8} {'wall s':>8} {'RTF':>7} {'speedup':>8} {'segments':>9} {'chunks':>7}")
+    baseline = None
+    for workers in args.workers:
+        row = run(args.audio, workers)
+        baseline = baseline or row["seconds"]
+        print(f"{workers:>7} {row['load_s']:>8.1f} {row['seconds']:>8.1f} {row['seconds'] / duration:>7.3f} "
+              f"{baseline / row['seconds']:>7.2f}x {row['segments']:>9} {row['chunks']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Two-level retrieval report: latency and recall@k of searching only the chunks of the top-M
+documents (by section centroid) against searching every chunk.
+
+    python benchmarks/two_level.py
+    python benchmarks/two_level.py --documents 5000 --chunks-per-document 40 --top-documents 5 10 20 50
+
+Builds a synthetic corpus in a throwaway data directory: documents drawn around shared topics,
+chunks drawn around their document, so neighbouring documents genuinely compete. Queries are
+perturbed chunks; ground truth is the full search. "chunks" is the mean number of chunk
+vectors each query scored at the second level.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+
+def synthetic_documents(documents: int, chunks_per_document: int, dimension: int, seed: int = 0):
+    """Yields (doc_id, chunk vectors) with document lengths spread around `chunks_per_document`."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(1, documents // 20), dimension))
+    for doc in range(documents):
+        center = topics[rng.integers(len(topics))] + 0.3 * rng.normal(size=dimension)
+        n = max(1, int(rng.exponential(chunks_per_document)))
+        vectors = center + 1.2 * rng.normal(size=(n, dimension))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        yield f"doc-{doc}", vectors.astype('float32')
+
+
+def build(args):
+    from app.services.vector_store import VectorStore
+    from app.utils.metadata import create_metadata
+
+    VectorStore.load_index()
+    pending, metas = [], []
+    for doc_id, vectors in synthetic_documents(args.documents, args.chunks_per_document, VectorStore.dimension):
+        for chunk_id in range(len(vectors)):
+            meta = create_metadata(doc_id, f"{doc_id}.txt", "text", chunk_id=chunk_id)
+            meta["text"] = ""
+            metas.append(meta)
+        pending.append(vectors)
+        if len(metas) >= 10_000:
+            VectorStore.add_texts(np.concatenate(pending), metas)
+            pending, metas = [], []
+    if metas:
+        VectorStore.add_texts(np.concatenate(pending), metas)
+    return VectorStore
+
+
+def measure(store, queries: np.ndarray, k: int, top_documents: int, truth=None):
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.search(query, k, top_documents=top_documents)
+        latencies.append(time.perf_counter() - start)
+        found.append({meta["faiss_id"] for meta, _ in hits})
+
+    row = {
+        "top_documents": top_documents,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "found": found,
+    }
+    if truth is not None:
+        row["recall"] = float(np.mean([len(f & t) / max(1, len(t)) for f, t in zip(found, truth)]))
+    if top_documents:
+        chosen = store.documents.search(queries, top_documents)
+        row["chunks"] = float(np.mean([len(store.documents.chunk_ids(docs, store.metadata)) for docs in chosen]))
+    else:
+        row["chunks"] = float(store.ntotal)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--chunks-per-document", type=int, default=50, help="mean; lengths are exponentially spread")
+    parser.add_argument("--top-documents", type=int, nargs="+", default=[5, 10, 20, 50, 100])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="evidentia-two-level-")
+    os.environ.update(
+        FAISS_INDEX_DIR=os.path.join(data_dir, "faiss_index"),
+        METADATA_DIR=os.path.join(data_dir, "metadata"),
+        UPLOAD_DIR=os.path.join(data_dir, "uploads"),
+        INDEX_RELOAD_INTERVAL="0",
+        SNAPSHOT_DELTA_ROWS=str(10**9), # Keep every row in one flat tier for a like-for-like comparison
+    )
+    os.environ.setdefault("GEMINI_API_KEY", "unused") # Nothing here calls the LLM
+    try:
+        start = time.perf_counter()
+        store = build(args)
+        build_s = time.perf_counter() - start
+
+        # Queries are perturbed corpus chunks so every query has true neighbours
+        rng = np.random.default_rng(1)
+        _, vectors = store.segments.read_rows()
+        queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+        queries = (queries + 0.05 * rng.normal(size=queries.shape)).astype('float32')
+
+        full = measure(store, queries, args.k, 0)
+        rows = [full] + [measure(store, queries, args.k, m, truth=full["found"]) for m in args.top_documents]
+        full["recall"] = 1.0
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"Corpus: {store.documents.document_count} documents, {store.ntotal} chunks, "
+          f"{store.documents.index.ntotal} document sections; built in {build_s:.1f} s")
+    print(f"{args.queries} queries, k={args.k}\n")
+    print(f"{'M':>6} {'recall@k':>9} {'chunks':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in rows:
+        label = row["top_documents"] or "full"
+        print(f"{label:>6} {row['recall']:>9.3f} {row['chunks']:>9.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Memory-vs-recall report for the vector storage modes (float32, fp16, sq8, pq) under the L2
+and cosine metrics, each against exact float32 search with the same metric.
+
+    python benchmarks/vector_storage.py                 # synthetic clustered corpus
+    python benchmarks/vector_storage.py --from-index    # vectors from backend/data/faiss_index
+    python benchmarks/vector_storage.py --metric cosine --storage float32 sq8
+
+Sizes are of the serialised flat index, which is what the codes occupy in memory; an IVF or
+HNSW index over the same storage adds its lists or graph on top.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from ann_recall import load_corpus, synthetic_corpus
+from app.services.ann_index import METRICS, STORAGE_TYPES, storage_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-index", action="store_true", help="use the persisted corpus instead of synthetic data")
+    parser.add_argument("--size", type=int, default=100_000, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--storage", nargs="+", choices=STORAGE_TYPES, default=list(STORAGE_TYPES))
+    parser.add_argument("--metric", nargs="+", choices=METRICS, default=list(METRICS))
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ bytes per vector; must divide the dimension")
+    args = parser.parse_args()
+
+    vectors = load_corpus() if args.from_index else synthetic_corpus(args.size, 384)
+    if len(vectors) < args.queries:
+        sys.exit(f"Corpus has only {len(vectors)} vectors; need at least {args.queries}")
+
+    # Queries are perturbed corpus vectors so every query has true neighbours
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = (queries + 0.05 * rng.normal(size=queries.shape)).astype('float32')
+
+    print(f"Corpus: {len(vectors)} vectors, {args.queries} queries, k={args.k}\n")
+    print(f"{'metric':<7} {'storage':<8} {'B/vector':>9} {'MB':>8} {'recall@k':>9} {'ms/query':>9} {'build s':>8}")
+    rows = storage_report(vectors, queries, k=args.k, storages=args.storage, metrics=args.metric, pq_m=args.pq_m)
+    for row in rows:
+        print(f"{row['metric']:<7} {row['storage']:<8} {row['bytes_per_vector']:>9.1f} {row['size_mb']:>8.1f} "
+              f"{row['recall']:>9.3f} {row['latency_ms']:>9.3f} {row['build_s']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
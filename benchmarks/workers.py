@@ -0,0 +1,160 @@
+"""
+Multi-worker report: memory per worker process as worker count grows, and how long a
+document committed by one process takes to become searchable in the others.
+
+    python benchmarks/workers.py
+    python benchmarks/workers.py --rows 500000 --workers 1 2 4 8 --no-mmap
+
+Runs against a throwaway data directory. Memory is proportional set size (PSS), which
+splits pages shared through the memory-mapped snapshot between the processes mapping it;
+without --no-mmap the total should stay roughly flat as workers are added.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+COMMON = r"""
+import json, sys, time
+import numpy as np
+from app.services.vector_store import VectorStore
+from app.utils.metadata import create_metadata
+
+def pss_mb():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def add(rows, batch=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        metas = []
+        for i in range(n):
+            meta = create_metadata(f"doc-{seed}-{start}", "bench.txt", "text", chunk_id=i)
+            meta["text"] = f"chunk {start + i}"
+            metas.append(meta)
+        VectorStore.add_texts(rng.random((n, VectorStore.dimension), dtype="float32"), metas)
+
+VectorStore.load_index()
+"""
+
+# Builds the corpus and publishes it as one snapshot
+SEED = COMMON + r"""
+add(int(sys.argv[1]))
+if VectorStore._rebuild_thread:
+    VectorStore._rebuild_thread.join()
+VectorStore._rebuild()
+print(json.dumps({"ntotal": VectorStore.ntotal, "snapshot": VectorStore.index_info()["snapshot"]}))
+"""
+
+# Reports its memory once warm, then waits until the index holds the target row count
+READER = COMMON + r"""
+VectorStore.search(np.random.rand(VectorStore.dimension).astype("float32"), k=5) # Touch every page once
+print(json.dumps({"pss_mb": pss_mb(), "ntotal": VectorStore.ntotal}), flush=True)
+target = int(sys.stdin.readline())
+while VectorStore.ntotal < target:
+    time.sleep(0.01)
+print(json.dumps({"seen_at": time.time()}), flush=True)
+"""
+
+WRITER = COMMON + r"""
+add(int(sys.argv[1]), seed=int(time.time()))
+print(json.dumps({"committed_at": time.time()}), flush=True)
+"""
+
+
+def spawn(script: str, env: dict, *args, stdin=None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", script, *map(str, args)], cwd=BACKEND_DIR, env=env,
+        stdin=stdin, stdout=subprocess.PIPE, text=True,
+    )
+
+
+def read_json(process: subprocess.Popen) -> dict:
+    line = process.stdout.readline()
+    if not line:
+        raise RuntimeError(f"worker exited with {process.wait()}")
+    return json.loads(line)
+
+
+def measure(workers: int, new_rows: int, env: dict) -> dict:
+    readers = [spawn(READER, env, stdin=subprocess.PIPE) for _ in range(workers)]
+    try:
+        warm = [read_json(reader) for reader in readers]
+        target = max(row["ntotal"] for row in warm) + new_rows
+        for reader in readers:
+            reader.stdin.write(f"{target}\n")
+            reader.stdin.flush()
+
+        writer = spawn(WRITER, env, new_rows)
+        committed_at = read_json(writer)["committed_at"]
+        writer.wait()
+        seen = [read_json(reader)["seen_at"] for reader in readers]
+    finally:
+        for reader in readers:
+            reader.kill()
+            reader.wait()
+
+    pss = [row["pss_mb"] for row in warm]
+    return {
+        "workers": workers,
+        "total_pss_mb": sum(pss),
+        "pss_per_worker_mb": sum(pss) / workers,
+        "visible_after_s": max(0.0, max(seen) - committed_at),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="corpus size")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--new-rows", type=int, default=100, help="rows the writer commits per round")
+    parser.add_argument("--reload-interval", type=float, default=2.0)
+    parser.add_argument("--no-mmap", action="store_true", help="load snapshots into private memory instead")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="evidentia-workers-")
+    env = dict(
+        os.environ,
+        FAISS_INDEX_DIR=os.path.join(data_dir, "faiss_index"),
+        METADATA_DIR=os.path.join(data_dir, "metadata"),
+        UPLOAD_DIR=os.path.join(data_dir, "uploads"),
+        INDEX_RELOAD_INTERVAL=str(args.reload_interval),
+        INDEX_MMAP=str(not args.no_mmap),
+    )
+    env.setdefault("GEMINI_API_KEY", "unused") # Nothing here calls the LLM
+    try:
+        seed = spawn(SEED, env, args.rows)
+        corpus = read_json(seed)
+        seed.wait()
+        rows = [measure(workers, args.new_rows, env) for workers in args.workers]
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"corpus": corpus, "mmap": not args.no_mmap, "rows": rows}, indent=2))
+        return
+
+    print(f"Corpus: {corpus['ntotal']} vectors, mmap={'off' if args.no_mmap else 'on'}, "
+          f"reload interval {args.reload_interval:.1f} s\n")
+    print(f"{'workers':>7} {'total PSS MB':>13} {'PSS/worker MB':>14} {'visible after s':>16}")
+    for row in rows:
+        print(f"{row['workers']:>7} {row['total_pss_mb']:>13.0f} {row['pss_per_worker_mb']:>14.0f} "
+              f"{row['visible_after_s']:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Ingests every PDF, DOCX, image and audio file under a directory into the index.
+
+    python bulk_ingest.py /path/to/archive
+    python bulk_ingest.py /path/to/archive --workers 16 --batch-chunks 8192 --no-copy
+
+Extraction runs on all cores; embeddings are batched across files and the index is written
+once per batch. Progress is checkpointed, so re-running the same command after an
+interruption (or to pick up new files) skips everything already ingested. Stop the server
+first or run it alongside: other processes see the new documents on their next reload.
+"""
+import argparse
+import hashlib
+import os
+import signal
+import sys
+
+from dotenv import load_dotenv
+
+# Load env from backend/.env
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+load_dotenv(os.path.join(backend_dir, '.env'))
+
+# Add backend directory to sys.path
+sys.path.append(backend_dir)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def print_progress(stats):
+    print(f"[{stats['elapsed_s']:8.1f}s] {stats['files']} files, {stats['chunks']} chunks "
+          f"({stats['files_per_s']:.2f} files/s, {stats['chunks_per_s']:.1f} chunks/s), "
+          f"{stats['duplicates']} duplicates, {stats['failed']} failed", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=0, help="document extraction processes (0 = BULK_DOCUMENT_WORKERS)")
+    parser.add_argument("--audio-workers", type=int, default=0, help="transcription processes (0 = BULK_AUDIO_WORKERS)")
+    parser.add_argument("--batch-chunks", type=int, default=0, help="chunks per index write (0 = BULK_BATCH_CHUNKS)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: one per directory under METADATA_DIR)")
+    parser.add_argument("--no-copy", action="store_true", help="don't copy the files into UPLOAD_DIR")
+    args = parser.parse_args()
+
+    from app.config import settings
+    from app.services.bulk_ingest import BulkIngest
+
+    root = os.path.abspath(args.directory)
+    if not os.path.isdir(root):
+        parser.error(f"not a directory: {root}")
+    checkpoint = args.checkpoint or settings.METADATA_DIR / f"bulk-{hashlib.sha1(root.encode()).hexdigest()[:12]}.json"
+
+    ingest = BulkIngest(root, checkpoint, args.workers, args.audio_workers, args.batch_chunks, not args.no_copy)
+    print(f"Ingesting {root} with {ingest.workers['document']} document and {ingest.workers['audio']} audio "
+          f"workers, {ingest.batch_chunks} chunks per batch")
+    print(f"Checkpoint: {checkpoint}")
+    signal.signal(signal.SIGTERM, _interrupt) # Shut the pools down on `kill` too, not only on Ctrl-C
+    try:
+        stats = ingest.run(report=print_progress)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.")
+        sys.exit(130)
+
+    print(f"\nDone: {stats['files']} files ({stats['skipped']} already ingested by earlier runs), "
+          f"{stats['chunks']} chunks in {stats['elapsed_s']:.1f}s")
+    print(f"{stats['files_per_s']:.2f} files/s, {stats['chunks_per_s']:.1f} chunks/s")
+    for relative, error in ingest.failures.items():
+        print(f"[FAILED] {relative}: {error}")
+    sys.exit(1 if ingest.failures else 0)
+
+
+if __name__ == "__main__":
+    main()
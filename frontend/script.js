@@ -149,7 +149,16 @@ async function uploadFile(file, fromDocsPage = false) {
             const err = await res.json().catch(() => ({ detail: 'Unknown error' }));
             throw new Error(err.detail || 'Upload failed');
         }
-        showToast(`${file.name} uploaded ✓`, 'success');
+        const { job_id, duplicate } = await res.json();
+        if (duplicate) {
+            showToast(`${file.name} is already in the knowledge base`, 'info');
+            return;
+        }
+        showToast(`${file.name} uploaded, processing…`, 'info');
+
+        const job = await waitForJob(job_id);
+        if (job.status === 'failed') throw new Error(job.error || 'Processing failed');
+        showToast(`${file.name} processed ✓`, 'success');
         fetchDocuments();                    // refresh sidebar list
         if (fromDocsPage) fetchDocumentsPage(); // refresh docs grid
     } catch (err) {
@@ -158,6 +167,27 @@ async function uploadFile(file, fromDocsPage = false) {
     }
 }
 
+// Processing runs server-side in the background; poll the job until it settles
+async function waitForJob(jobId, intervalMs = 1000) {
+    while (true) {
+        const res = await fetch(`${API_URL}/upload/jobs/${jobId}`);
+        if (!res.ok) throw new Error('Lost track of upload job');
+        const job = await res.json();
+        if (job.status === 'completed' || job.status === 'failed') return job;
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
+// ─── Stored Files ─────────────────────────────────────────────────────────
+// Uploads are stored (and cited) as "<content hash>/<name>"; older ones as plain "<name>"
+function uploadUrl(filename) {
+    return `${API_URL}/uploads/${filename.split('/').map(encodeURIComponent).join('/')}`;
+}
+
+function displayName(filename) {
+    return filename.replace(/^[0-9a-f]{16}\//, '');
+}
+
 // ─── Sidebar Document List ────────────────────────────────────────────────
 let allDocs = [];
 
@@ -184,17 +214,17 @@ function renderSidebarDocs(docs) {
 
         const icon = getDocIcon(doc);
         const date = new Date(doc.upload_time).toLocaleDateString();
-        const fileUrl = `${API_URL}/uploads/${encodeURIComponent(doc.filename)}`;
+        const fileUrl = uploadUrl(doc.filename);
 
         div.innerHTML = `
             <div class="doc-icon">${icon}</div>
             <div class="doc-info">
-                <div class="doc-name" title="${doc.filename}">${doc.filename}</div>
+                <div class="doc-name" title="${displayName(doc.filename)}">${displayName(doc.filename)}</div>
                 <div class="doc-meta">${date}</div>
             </div>
             <div class="doc-actions">
                 <a href="${fileUrl}" target="_blank" class="mini-btn" title="View"><ion-icon name="eye-outline"></ion-icon></a>
-                <a href="${fileUrl}" download="${doc.filename}" class="mini-btn" title="Download"><ion-icon name="download-outline"></ion-icon></a>
+                <a href="${fileUrl}" download="${displayName(doc.filename)}" class="mini-btn" title="Download"><ion-icon name="download-outline"></ion-icon></a>
             </div>
         `;
         documentList.appendChild(div);
@@ -235,12 +265,12 @@ function renderDocsGrid(docs) {
         card.className = 'doc-card';
 
         const isImage = doc.filename.match(/\.(png|jpg|jpeg|gif|bmp|webp)$/i);
-        const fileUrl = `${API_URL}/uploads/${encodeURIComponent(doc.filename)}`;
+        const fileUrl = uploadUrl(doc.filename);
         const date = new Date(doc.upload_time).toLocaleDateString('en-GB', { day: '2-digit', month: 'short', year: 'numeric' });
 
         let previewHtml = '';
         if (isImage) {
-            previewHtml = `<div class="doc-card-preview img-preview"><img src="${fileUrl}" alt="${doc.filename}" onerror="this.parentElement.innerHTML='<ion-icon name=image-outline></ion-icon>'"></div>`;
+            previewHtml = `<div class="doc-card-preview img-preview"><img src="${fileUrl}" alt="${displayName(doc.filename)}" onerror="this.parentElement.innerHTML='<ion-icon name=image-outline></ion-icon>'"></div>`;
         } else {
             const bigIcon = getDocIconLarge(doc);
             previewHtml = `<div class="doc-card-preview icon-preview">${bigIcon}</div>`;
@@ -249,7 +279,7 @@ function renderDocsGrid(docs) {
         card.innerHTML = `
             ${previewHtml}
             <div class="doc-card-body">
-                <div class="doc-card-name" title="${doc.filename}">${doc.filename}</div>
+                <div class="doc-card-name" title="${displayName(doc.filename)}">${displayName(doc.filename)}</div>
                 <div class="doc-card-meta">
                     <span class="doc-type-badge">${getFileTypeLabel(doc)}</span>
                     <span>${doc.chunk_count} chunk${doc.chunk_count !== 1 ? 's' : ''}</span>
@@ -259,7 +289,7 @@ function renderDocsGrid(docs) {
                     <a href="${fileUrl}" target="_blank" class="btn-card-action view">
                         <ion-icon name="eye-outline"></ion-icon> View
                     </a>
-                    <a href="${fileUrl}" download="${doc.filename}" class="btn-card-action download">
+                    <a href="${fileUrl}" download="${displayName(doc.filename)}" class="btn-card-action download">
                         <ion-icon name="download-outline"></ion-icon> Download
                     </a>
                 </div>
@@ -343,33 +373,72 @@ async function sendMessage() {
     userInput.value = '';
 
     const loadingId = addMessage('Thinking…', 'ai', true);
+    let answerId = null;
+    let answer = '';
 
     try {
-        const res = await fetch(`${API_URL}/query/`, {
+        const res = await fetch(`${API_URL}/query/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ query: text })
         });
 
-        if (!res.ok) throw new Error('Server error');
-
-        const data = await res.json();
-        removeMessage(loadingId);
-        addMessage(data.answer, 'ai', false, data.citations, data.image_results);
+        if (!res.ok || !res.body) throw new Error('Server error');
+
+        await readEventStream(res.body, (event, data) => {
+            if (event === 'citations') {
+                // Sources are known before the answer, so show them straight away
+                removeMessage(loadingId);
+                answerId = addMessage('', 'ai', false, data);
+            } else if (event === 'token') {
+                answer += data;
+                const content = document.querySelector(`.message[data-id="${answerId}"] .message-content`);
+                if (content) content.innerHTML = answer.replace(/\n/g, '<br>');
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            }
+        });
 
     } catch (err) {
         removeMessage(loadingId);
+        if (!answer) removeMessage(answerId);
         addMessage(`Error: ${err.message}`, 'ai');
         console.error(err);
     }
 }
 
+// Minimal Server-Sent Events reader for a fetch() body (EventSource cannot POST)
+async function readEventStream(body, onEvent) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            onEvent(event, data ? JSON.parse(data) : null);
+        }
+    }
+}
+
 function addMessage(text, sender, isLoading = false, citations = [], imageResults = []) {
     const msgDiv = document.createElement('div');
     msgDiv.className = `message ${sender}-message`;
     if (isLoading) msgDiv.classList.add('loading');
 
-    const id = Date.now();
+    const id = `${Date.now()}-${Math.random().toString(36).slice(2, 8)}`;
     msgDiv.dataset.id = id;
 
     let contentHtml = `<div class="message-content">${text.replace(/\n/g, '<br>')}</div>`;
@@ -378,11 +447,11 @@ function addMessage(text, sender, isLoading = false, citations = [], imageResult
     if (imageResults && imageResults.length > 0) {
         let imgHtml = '<div class="image-results-row"><div class="image-results-label"><ion-icon name="images-outline"></ion-icon> Matched Images</div><div class="image-thumbs">';
         imageResults.forEach(img => {
-            const url = `${API_URL}/uploads/${encodeURIComponent(img.filename)}`;
+            const url = uploadUrl(img.filename);
             imgHtml += `
-                <a href="${url}" target="_blank" class="image-thumb-card" title="${img.filename}">
-                    <img src="${url}" alt="${img.filename}" onerror="this.src=''">
-                    <span>${img.filename}</span>
+                <a href="${url}" target="_blank" class="image-thumb-card" title="${displayName(img.filename)}">
+                    <img src="${url}" alt="${displayName(img.filename)}" onerror="this.src=''">
+                    <span>${displayName(img.filename)}</span>
                 </a>`;
         });
         imgHtml += '</div></div>';
@@ -393,8 +462,8 @@ function addMessage(text, sender, isLoading = false, citations = [], imageResult
     if (citations && citations.length > 0) {
         let citationsHtml = '<div class="citations-area"><div class="citation-header">SOURCES</div>';
         citations.forEach(cit => {
-            const fileUrl = `${API_URL}/uploads/${encodeURIComponent(cit.source_file)}`;
-            let refText = cit.source_file;
+            const fileUrl = uploadUrl(cit.source_file);
+            let refText = displayName(cit.source_file);
             if (cit.page) refText += ` (Pg ${cit.page})`;
 
             citationsHtml += `